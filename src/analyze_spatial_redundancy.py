@@ -1,38 +1,176 @@
 import numpy as np
 import os
-import sys
 import matplotlib.pyplot as plt
+from matplotlib.colors import LogNorm
 from PIL import Image
 
-def analyze_spatial_redundancy(image_path):
+import apercu
+from apercu import BUDGET_APERCU
+from image_stats import obtenir_stats
+
+
+def _tracer_densite(conjoint):
+    """
+    Carte de densité des paires de pixels adjacents, à partir de leur histogramme
+    conjoint 256 x 256 (échelle logarithmique, cases vides en blanc). Le coût du rendu
+    ne dépend pas du nombre de pixels, contrairement à un nuage d'un point par paire.
+    """
+    densite = np.ma.masked_equal(conjoint, 0)
+    vmax = max(1, int(conjoint.max()))
+    # Ligne = Pixel[i] (axe x), colonne = Pixel[i+1] (axe y): on trace la transposée
+    image = plt.imshow(densite.T, origin='lower', extent=(0, 256, 0, 256), cmap='viridis',
+                       norm=LogNorm(vmin=1, vmax=vmax), interpolation='nearest', aspect='equal')
+    plt.colorbar(image, label="Nombre de paires")
+
+
+def _intervalle(estimation):
+    """Texte 'valeur [basse, haute]' d'une estimation de l'aperçu."""
+    valeur, basse, haute = estimation
+    return f"{valeur:.4f} [{basse:.4f}, {haute:.4f}]"
+
+
+def _analyser_apercu(image_path, rgb, budget_echantillons, echantillonnage):
+    """
+    Aperçu d'une image: entropie et corrélation estimées sur un échantillon de paires de
+    pixels (module apercu), graphiques sur l'image réduite par blocs.
+
+    Returns:
+        dict: {'nb_pixels', 'nb_echantillons', 'echantillonnage', 'canaux': {canal: estimations}}
+              (estimations: voir apercu.estimer; canaux R, G, B et luminance, ou luminance seule)
+    """
+    # Sans obtenir_stats: l'aperçu ne garde pas les pixels de l'image dans son cache
+    try:
+        image = Image.open(image_path)
+        image.load()
+    except Exception as e:
+        print(f"Error loading image: {e}")
+        return
+    if image.mode not in ('L', 'RGB', 'RGBA'):
+        image = image.convert('RGB' if rgb else 'L')
+    # np.asarray ne recopie pas les octets fournis par PIL, et [:, :, :3] est une vue
+    pixels = np.asarray(image)
+    if pixels.ndim == 3:
+        pixels = pixels[:, :, :3]
+
+    # Seuls les pixels échantillonnés sont lus (et convertis en luminance)
+    gauche, droite = apercu.echantillonner_paires(pixels, budget_echantillons, echantillonnage)
+    canaux = {}
+    if gauche.ndim == 2:
+        if rgb:
+            for i, nom in enumerate(('R', 'G', 'B')):
+                canaux[nom] = apercu.estimer(gauche[:, i], droite[:, i])
+        gauche, droite = apercu.luminance(gauche), apercu.luminance(droite)
+    canaux['luminance'] = apercu.estimer(gauche, droite)
+    if rgb and 'R' not in canaux:
+        # Image en niveaux de gris: R = G = B = luminance
+        canaux.update({nom: canaux['luminance'] for nom in ('R', 'G', 'B')})
+
+    hauteur, largeur = pixels.shape[:2]
+    nb_echantillons = canaux['luminance']['nb_echantillons']
+    print(f"Aperçu ({echantillonnage}) pour l'image: {os.path.basename(image_path)}")
+    print(f"  - {nb_echantillons} paires échantillonnées sur {hauteur * largeur} pixels "
+          f"(intervalles à {apercu.NIVEAU_CONFIANCE:.0%})")
+    for nom, estimations in canaux.items():
+        print(f"  - {nom}: Entropy={_intervalle(estimations['entropie'])} bits/pixel, "
+              f"Correlation={_intervalle(estimations['correlation'])}")
+
+    # Graphiques sur l'image réduite par moyenne de blocs
+    reduite = apercu.reduire(image)
+    # Luminance calculée depuis les canaux RGB de l'image réduite, sans convert('L')
+    reduite_pixels = np.array(reduite)
+    if reduite_pixels.ndim == 3:
+        reduite_pixels = apercu.luminance(reduite_pixels[:, :, :3])
+    reduite_grise = reduite_pixels.astype(float)
+    complexity_map = np.zeros(reduite_grise.shape)
+    complexity_map[:-1, :] += np.abs(np.diff(reduite_grise, axis=0))
+    complexity_map[:, :-1] += np.abs(np.diff(reduite_grise, axis=1))
+
+    plt.figure(figsize=(12, 10))
+
+    # Graph 1: Histogramme(s) de l'échantillon
+    plt.subplot(2, 2, 1)
+    if rgb:
+        for nom, couleur in (('R', 'red'), ('G', 'green'), ('B', 'blue')):
+            plt.stairs(canaux[nom]['histogramme'], np.arange(257), fill=True, color=couleur, alpha=0.3, label=nom)
+        plt.legend()
+        plt.title("Histogrammes RGB (échantillon)")
+    else:
+        entropie = canaux['luminance']['entropie'][0]
+        plt.stairs(canaux['luminance']['histogramme'], np.arange(257), fill=True, color='gray', alpha=0.7)
+        plt.title(f"Histogramme (échantillon, entropie ≈ {entropie:.2f} bits)")
+    plt.xlabel("Valeur du pixel")
+    plt.ylabel("Fréquence (échantillon)")
+
+    # Graph 2: Densité des paires échantillonnées
+    plt.subplot(2, 2, 2)
+    _tracer_densite(canaux['luminance']['histogramme_conjoint'])
+    correlation, basse, haute = canaux['luminance']['correlation']
+    plt.title(f"Corrélation Spatiale (échantillon) r={correlation:.2f} [{basse:.2f}, {haute:.2f}]")
+    plt.xlabel("Pixel[i]")
+    plt.ylabel("Pixel[i+1]")
+
+    # Graph 3: Image réduite
+    plt.subplot(2, 2, 3)
+    plt.imshow(reduite, cmap=None if rgb else 'gray')
+    plt.title(f"Image réduite ({reduite.size[0]}x{reduite.size[1]})")
+    plt.axis('off')
+
+    # Graph 4: Complexity Map de l'image réduite
+    plt.subplot(2, 2, 4)
+    plt.imshow(complexity_map, cmap='hot')
+    plt.title("Zones de Complexité (Gradients, image réduite)")
+    plt.axis('off')
+
+    output_dir = "output"
+    os.makedirs(output_dir, exist_ok=True)
+    plt.tight_layout()
+    prefixe = "apercu_rgb_" if rgb else "apercu_"
+    plt.savefig(os.path.join(output_dir, f"{prefixe}{os.path.basename(image_path)}"))
+
+    return {
+        'nb_pixels': hauteur * largeur,
+        'nb_echantillons': nb_echantillons,
+        'echantillonnage': echantillonnage,
+        'canaux': canaux,
+    }
+
+def analyze_spatial_redundancy(image_path, mode_apercu=False, budget_echantillons=BUDGET_APERCU,
+                               echantillonnage='aleatoire'):
     """
     Analyse de la redondance spatiale d'une image pour décrire ses caractéristiques principales.
     Visualisation de la distribution des pixels pour évaluer les zones de haute ou basse complexité.
+
+    Args:
+        image_path: Chemin de l'image
+        mode_apercu: Si True, estime entropie et corrélation (avec intervalles de confiance)
+                     sur budget_echantillons paires de pixels, graphiques sur l'image réduite
+        budget_echantillons: Nombre de paires échantillonnées en aperçu
+        echantillonnage: 'aleatoire' (intervalles fiables) ou 'pas' (grille régulière)
+
+    Returns:
+        dict: Estimations de l'aperçu (None hors aperçu)
     """
     if not os.path.exists(image_path):
         print(f"Error: Image not found at {image_path}")
         return
+    if mode_apercu:
+        return _analyser_apercu(image_path, False, budget_echantillons, echantillonnage)
 
+    # Image décodée une seule fois par exécution (partagée avec huffman() et les histogrammes)
     try:
-        img = Image.open(image_path).convert('L')
+        stats = obtenir_stats(image_path)
+        pixels = stats.pixels_gris
     except Exception as e:
         print(f"Error loading image: {e}")
         return
 
-    pixels = np.array(img)
-
     print("Image size")
     print(" - Height:", len(pixels), "pixels")
     print(" - Width:", len(pixels[0]), "pixels")
     
-    # On applati l'array en 1D
-    flat_pixels = pixels.flatten()
-    
-    # Calcule de l'entropie
-    hist_counts, _ = np.histogram(flat_pixels, bins=256, range=(0, 256))
-    probabilities = hist_counts / np.sum(hist_counts)
-    probabilities = probabilities[probabilities > 0] # Eviter log(0)
-    entropy = -np.sum(probabilities * np.log2(probabilities))
+    # Calcule de l'entropie (histogramme calculé une seule fois dans ImageStats)
+    hist_counts = stats.histogramme_gris
+    entropy = stats.entropie_gris
 
     # print("hist_counts:", hist_counts)
     print("hist_counts lenght:", len(hist_counts))
@@ -40,44 +178,43 @@ def analyze_spatial_redundancy(image_path):
     # print("probabilities:", probabilities)
     print("entropy:", entropy)
 
-    # On creer 2 array décalés de 1 pour les comparer Pixel[i] with Pixel[i+1]
-    # ça nous permet d'analyser la correlation entre les pixels adjescents
-    x = flat_pixels[:-1]
-    y = flat_pixels[1:]
-    
-    # Calcule le coéfficient de corrélation
-    # On prends l'élément de la rangé 0, colomne 1 (ou )
-    correlation = np.corrcoef(x, y)[0, 1] if len(x) > 0 else 0
-    print("correlation matrix:", np.corrcoef(x, y))
+    # Corrélation entre Pixel[i] et son voisin Pixel[i+1] (même ligne), sur la luminance,
+    # et dans les autres directions pour comparaison
+    correlations = stats.correlations()
+    correlation = correlations['directions']['horizontale']['luminance'][0]
+    for direction, par_canal in correlations['directions'].items():
+        print(f"correlation {direction}: {par_canal['luminance'][0]:.4f}")
 
     print(f"Analysis for image: {os.path.basename(image_path)}")
     print(f"  - Entropy: {entropy:.4f} bits/pixel")
+    print(f"  - Conditional Entropy H(Pixel[i+1]|Pixel[i]): {stats.entropie_conditionnelle_gris:.4f} bits/pixel")
     print(f"  - Spatial Correlation: {correlation:.4f}")
 
     # On génère une 'Complexity Map' à partir des gradients
     # On calcule la difference absolue entre les pixels adjescents pour trouver les bords des transitions
-    pixels_float = pixels.astype(float)
-    grad_y = np.abs(pixels_float[1:, :] - pixels_float[:-1, :])
-    grad_x = np.abs(pixels_float[:, 1:] - pixels_float[:, :-1])
-    
-    complexity_map = np.zeros_like(pixels_float)
-    complexity_map[:-1, :] += grad_y
-    complexity_map[:, :-1] += grad_x
+    complexity_map = stats.carte_complexite
+
+    # Zones les plus chargées et les plus plates, depuis l'index de complexité (tuiles de 64 pixels)
+    tuiles = stats.index_complexite.carte_tuiles(64)
+    for libelle, (ligne, colonne) in (("Busiest", tuiles['ordre'][0]), ("Flattest", tuiles['ordre'][-1])):
+        i, j = ligne // 64, colonne // 64
+        print(f"  - {libelle} 64px tile at (row={ligne}, col={colonne}): "
+              f"complexity={tuiles['complexite'][i, j]:.2f}, variance={tuiles['variance'][i, j]:.2f}")
 
     # Visualisation
     plt.figure(figsize=(12, 10))
     
     # Graph 1: Histogramme des valeurs des pixels
     plt.subplot(2, 2, 1)
-    plt.hist(flat_pixels, bins=256, range=(0, 256), color='gray', alpha=0.7)
+    plt.stairs(hist_counts, np.arange(257), fill=True, color='gray', alpha=0.7)
     plt.title(f"Histogram (Entropy: {entropy:.2f} bits)")
     plt.xlabel("Valeur du pixel")
     plt.ylabel("Fréquence")
 
 
-    # Graph 2: 'Scatter plot' des pixels adjescents (Visualisation de la redondance spatiale)
+    # Graph 2: Densité des paires de pixels adjescents (Visualisation de la redondance spatiale)
     plt.subplot(2, 2, 2)
-    plt.scatter(x, y, s=0.5, alpha=0.5)
+    _tracer_densite(stats.histogramme_conjoint_gris)
     plt.title(f"Corrélation Spatiale(r={correlation:.2f})")
     plt.xlabel("Pixel[i]")
     plt.ylabel("Pixel[i+1]")
@@ -101,25 +238,29 @@ def analyze_spatial_redundancy(image_path):
     
     # plt.show()
 
-def analyze_spatial_redundancy_rgb(image_path):
+def analyze_spatial_redundancy_rgb(image_path, mode_apercu=False, budget_echantillons=BUDGET_APERCU,
+                                   echantillonnage='aleatoire'):
     """
     Analyse la redondance spatiale d'une image pour chacun des cannaux RGB.
+
+    Args: voir analyze_spatial_redundancy (mode_apercu, budget_echantillons, echantillonnage)
+
+    Returns:
+        dict: Estimations de l'aperçu (None hors aperçu)
     """
     if not os.path.exists(image_path):
         print(f"Error: Image not found at {image_path}")
         return
+    if mode_apercu:
+        return _analyser_apercu(image_path, True, budget_echantillons, echantillonnage)
 
     try:
-        img = Image.open(image_path)
-        img_rgb = img.convert('RGB')
-        img_gray = img.convert('L')
+        stats = obtenir_stats(image_path)
+        pixels_rgb = stats.pixels_rgb
     except Exception as e:
         print(f"Error loading image: {e}")
         return
 
-    pixels_rgb = np.array(img_rgb)
-    pixels_gray = np.array(img_gray)
-
     print("pixels_rgb dimensions: ", pixels_rgb.ndim)
     print("dim 1:", len(pixels_rgb))
     print("dim 2:", len(pixels_rgb[0]))
@@ -134,23 +275,22 @@ def analyze_spatial_redundancy_rgb(image_path):
 
     # Graph 1: RGB Histogrammes
     plt.subplot(2, 2, 1)
+    # Corrélations de tous les canaux et de la luminance, en une passe sur l'image
+    correlations = stats.correlations()['directions']['horizontale']
     for i in range(3):
-        chan_pixels = pixels_rgb[:, :, i].flatten()
-        
         # Entropie
-        counts, _ = np.histogram(chan_pixels, bins=256, range=(0, 256))
+        counts = stats.histogrammes_rgb[i]
         probs = counts / np.sum(counts)
         probs = probs[probs > 0]
         entropy = -np.sum(probs * np.log2(probs))
         
         # Correlation
-        x = chan_pixels[:-1]
-        y = chan_pixels[1:]
-        corr = np.corrcoef(x, y)[0, 1] if len(x) > 0 else 0
-        
+        # (image en niveaux de gris: R = G = B = luminance)
+        corr = correlations.get(colors[i][0], correlations['luminance'])[0]
+
         print(f"  - {colors[i]} Channel: Entropy={entropy:.4f} bits/pixel, Correlation={corr:.4f}")
         
-        plt.hist(chan_pixels, bins=256, range=(0, 256), color=plot_colors[i], alpha=0.3, label=colors[i])
+        plt.stairs(counts, np.arange(257), fill=True, color=plot_colors[i], alpha=0.3, label=colors[i])
 
     plt.title("Histogrammes RGB")
     plt.xlabel("Valeur du pixel")
@@ -158,13 +298,10 @@ def analyze_spatial_redundancy_rgb(image_path):
     plt.legend()
 
     # Graph 2: Corrélation Spatiale (Luminance)
-    flat_gray = pixels_gray.flatten()
-    x = flat_gray[:-1]
-    y = flat_gray[1:]
-    corr_gray = np.corrcoef(x, y)[0, 1] if len(x) > 0 else 0
-    
+    corr_gray = correlations['luminance'][0]
+
     plt.subplot(2, 2, 2)
-    plt.scatter(x, y, s=0.5, alpha=0.5, c='black')
+    _tracer_densite(stats.histogramme_conjoint_gris)
     plt.title(f"Corrélation Spatiale (Luminance)r={corr_gray:.2f}")
     plt.xlabel("Pixel[i]")
     plt.ylabel("Pixel[i+1]")
@@ -175,18 +312,12 @@ def analyze_spatial_redundancy_rgb(image_path):
     plt.title("Image Originale (RGB)")
     plt.axis('off')
 
-    # Graph 4: Complexity Map (Gradients sur Grayscale)
-    pixels_float = pixels_gray.astype(float)
-    grad_y = np.abs(pixels_float[1:, :] - pixels_float[:-1, :])
-    grad_x = np.abs(pixels_float[:, 1:] - pixels_float[:, :-1])
-    
-    complexity_map = np.zeros_like(pixels_float)
-    complexity_map[:-1, :] += grad_y
-    complexity_map[:, :-1] += grad_x
+    # Graph 4: Complexity Map (gradients de la luminance, calculée depuis les canaux RGB)
+    complexity_map = stats.carte_complexite
     
     plt.subplot(2, 2, 4)
     plt.imshow(complexity_map, cmap='hot')
-    plt.title("Zones de Complexité (Gradients sur Grayscale)")
+    plt.title("Zones de Complexité (Gradients de la luminance)")
     plt.axis('off')
 
     output_dir = "output"
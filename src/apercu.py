@@ -0,0 +1,141 @@
+"""
+Aperçu d'une image par échantillonnage: estimations avec intervalles de confiance
+
+Sur de très grandes images, l'analyse complète parcourt chaque pixel. L'aperçu n'en
+lit qu'un échantillon de taille bornée (budget_echantillons), quelle que soit la
+taille de l'image:
+
+- 'aleatoire': positions tirées uniformément (avec remise), échantillons
+  indépendants: les intervalles ont leur sens statistique.
+- 'pas': une grille régulière (un pixel toutes les pas lignes et colonnes), lue par
+  tranches de l'image sans copie. Les échantillons voisins sont corrélés et une
+  structure périodique (texte, trame) peut se replier sur la grille: les
+  intervalles ne sont alors qu'indicatifs.
+
+Chaque échantillon est une paire (Pixel[i, j], Pixel[i, j+1]), ce qui donne à la
+fois l'histogramme (entropie) et la corrélation horizontale, sur la luminance
+calculée comme PIL (convert('L')) pour les seuls pixels échantillonnés.
+
+Intervalles de confiance (niveau NIVEAU_CONFIANCE):
+- entropie: estimateur de Miller-Madow (biais de l'estimation directe corrigé de
+  (K - 1) / 2n, K valeurs observées), intervalle par la méthode delta;
+- corrélation: transformation de Fisher, z = atanh(r) d'écart-type 1 / sqrt(n - 3).
+"""
+
+import math
+
+import numpy as np
+
+from image_stats import histogramme_conjoint, luminance
+
+# Nombre de paires de pixels échantillonnées par défaut
+BUDGET_APERCU = 1 << 18
+ECHANTILLONNAGES = ('aleatoire', 'pas')
+
+# Quantile de la loi normale pour un intervalle à 95 %
+NIVEAU_CONFIANCE = 0.95
+Z_CONFIANCE = 1.959963984540054
+
+# Plus grand côté (pixels) des images réduites affichées dans les graphiques
+TAILLE_PANNEAU = 1024
+
+
+def echantillonner_paires(pixels, budget=BUDGET_APERCU, echantillonnage='aleatoire', graine=0):
+    """
+    Échantillonne des paires de pixels horizontalement voisins.
+
+    Args:
+        pixels: Image (hauteur x largeur) ou (hauteur x largeur x canaux)
+        budget: Nombre de paires visé (au plus)
+        echantillonnage: 'aleatoire' ou 'pas' (grille régulière)
+        graine: Graine du tirage aléatoire (résultats reproductibles)
+
+    Returns:
+        tuple: (gauche, droite), pixels échantillonnés et leurs voisins de droite,
+               de forme (n,) ou (n, canaux)
+    """
+    if echantillonnage not in ECHANTILLONNAGES:
+        raise ValueError(f"Échantillonnage inconnu: {echantillonnage} (attendu: {', '.join(ECHANTILLONNAGES)})")
+    if budget < 1:
+        raise ValueError(f"Budget d'échantillons invalide: {budget}")
+    hauteur, largeur = pixels.shape[:2]
+    if largeur < 2:
+        vide = pixels[:0, 0]
+        return vide, vide
+
+    if echantillonnage == 'aleatoire':
+        generateur = np.random.default_rng(graine)
+        lignes = generateur.integers(0, hauteur, budget)
+        colonnes = generateur.integers(0, largeur - 1, budget)
+        return pixels[lignes, colonnes], pixels[lignes, colonnes + 1]
+
+    # Même pas en lignes et en colonnes: la grille couvre toute l'image
+    pas = max(1, math.ceil(math.sqrt(hauteur * (largeur - 1) / budget)))
+    gauche = pixels[::pas, :largeur - 1:pas]
+    droite = pixels[::pas, 1::pas][:, :gauche.shape[1]]
+    forme = (-1,) + pixels.shape[2:]
+    return gauche.reshape(forme), droite.reshape(forme)
+
+
+def estimer_entropie(counts):
+    """
+    Entropie (bits par symbole) estimée depuis les occurrences d'un échantillon.
+
+    Returns:
+        tuple: (estimation, borne basse, borne haute)
+    """
+    n = int(np.sum(counts))
+    if n == 0:
+        return float('nan'), float('nan'), float('nan')
+    probabilites = counts[counts > 0] / n
+    log_p = np.log2(probabilites)
+    entropie = float(-np.sum(probabilites * log_p))
+    # Correction de Miller-Madow: l'estimation directe sous-estime l'entropie
+    estimation = entropie + (len(probabilites) - 1) / (2 * n * math.log(2))
+    variance = max(0.0, float(np.sum(probabilites * log_p * log_p)) - entropie * entropie) / n
+    marge = Z_CONFIANCE * math.sqrt(variance)
+    return estimation, max(0.0, estimation - marge), estimation + marge
+
+
+def estimer_correlation(x, y):
+    """
+    Corrélation de Pearson d'un échantillon de paires, avec son intervalle de Fisher.
+
+    Returns:
+        tuple: (estimation, borne basse, borne haute); nan si indéfinie
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n < 2 or x.std() == 0 or y.std() == 0:
+        return float('nan'), float('nan'), float('nan')
+    correlation = float(np.corrcoef(x, y)[0, 1])
+    if n <= 3 or abs(correlation) >= 1:
+        return correlation, correlation, correlation
+    z = math.atanh(correlation)
+    marge = Z_CONFIANCE / math.sqrt(n - 3)
+    return correlation, math.tanh(z - marge), math.tanh(z + marge)
+
+
+def estimer(gauche, droite):
+    """
+    Estimations d'un canal depuis ses paires échantillonnées (entiers 0..255).
+
+    Returns:
+        dict: {'nb_echantillons', 'histogramme', 'histogramme_conjoint',
+               'entropie': (estimation, basse, haute), 'correlation': (estimation, basse, haute)}
+    """
+    histogramme = np.bincount(gauche, minlength=256)
+    return {
+        'nb_echantillons': len(gauche),
+        'histogramme': histogramme,
+        'histogramme_conjoint': histogramme_conjoint(gauche, droite),
+        'entropie': estimer_entropie(histogramme),
+        'correlation': estimer_correlation(gauche, droite),
+    }
+
+
+def reduire(image, taille=TAILLE_PANNEAU):
+    """Image PIL réduite par moyenne de blocs, son plus grand côté ramené à taille au plus."""
+    facteur = math.ceil(max(image.size) / taille)
+    return image.reduce(facteur) if facteur > 1 else image
@@ -0,0 +1,423 @@
+"""
+Banc d'essai: images synthétiques, mesures de performance et suivi des régressions
+
+Chaque scénario génère une image synthétique (taille en mégapixels, mode 'L', 'RGB'
+ou '1', structure), puis mesure:
+
+    huffman     compression complète (avec vérification): débit (Mo/s), ratio,
+                pic de mémoire allouée
+    analyse     analyze_spatial_redundancy (ou sa variante RGB): débit, pic de mémoire
+    graphiques  CompressionAnalyzer.generate_histograms sur le résultat: durée
+
+Le temps et la mémoire sont mesurés dans des exécutions séparées: tracemalloc
+ralentit fortement les allocations et fausserait les débits. La durée retenue est
+la meilleure de plusieurs répétitions, moins sensible au bruit de la machine.
+
+Structures:
+    bruit       échantillons uniformes sur 2^entropie valeurs (entropie en bits)
+    degrade     dégradé diagonal avec un léger bruit (très corrélé)
+    texte       image binaire imitant du texte: lignes de glyphes noirs sur fond blanc
+
+Les résultats sont écrits en JSON (par défaut dans .cache/bench/, ignoré par git).
+Avec une référence (JSON d'une exécution précédente), toute mesure qui se dégrade
+de plus du seuil est signalée et le code de sortie est 1.
+
+Utilisation:
+    python src/bench.py --tailles 1 4 --sortie bench.json --reference bench_reference.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import matplotlib
+matplotlib.use('Agg')
+
+import matplotlib.pyplot as plt
+import numpy as np
+from PIL import Image
+
+import huffman_coding
+import image_stats
+from analyze_spatial_redundancy import analyze_spatial_redundancy, analyze_spatial_redundancy_rgb
+from generate_histograms import CompressionAnalyzer
+
+# À incrémenter quand le format des résultats change (2: dispersion)
+VERSION_BENCH = 2
+
+# Fichier des résultats par défaut, hors des fichiers suivis par git (comme le cache)
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+SORTIE_DEFAUT = os.path.join(os.path.dirname(SCRIPT_DIR), ".cache", "bench", "bench.json")
+
+STRUCTURES = ('bruit', 'degrade', 'texte')
+MODES = ('L', 'RGB', '1')
+MESURES = ('huffman', 'analyse', 'graphiques')
+
+# Tailles par défaut (mégapixels); le banc complet va jusqu'à 100 MP
+TAILLES_DEFAUT = (1,)
+TAILLES_COMPLET = (1, 10, 100)
+
+# Entropies (bits par échantillon) des scénarios de bruit
+ENTROPIES_BRUIT = (2, 7)
+
+# Dégradation tolérée avant de signaler une régression (fraction de la référence)
+SEUIL_DEFAUT = 0.10
+
+# Nombre d'exécutions chronométrées par mesure (la meilleure est retenue)
+REPETITIONS_DEFAUT = 3
+
+# Répétitions imposées pour comparer à une référence: avec une seule exécution, le bruit
+# de la machine dépasse souvent le seuil et signale de fausses régressions
+REPETITIONS_MIN_COMPARAISON = 5
+
+# Un écart de temps n'est une régression que s'il dépasse aussi FACTEUR_DISPERSION fois
+# la dispersion mesurée des répétitions (voir comparer)
+FACTEUR_DISPERSION = 2
+
+# Sens de chaque indicateur: +1 si plus grand est meilleur, -1 si plus petit est meilleur
+SENS_INDICATEURS = {
+    'debit': 1,
+    'ratio': 1,
+    'duree': -1,
+    'pic_memoire': -1,
+}
+
+
+def generer_pixels(structure, largeur, hauteur, entropie=8, graine=0):
+    """
+    Génère les pixels (uint8, hauteur x largeur) d'une image synthétique en niveaux de gris.
+
+    Args:
+        structure: Une des STRUCTURES
+        largeur, hauteur: Dimensions en pixels
+        entropie: Bits d'entropie par pixel pour la structure 'bruit' (1 à 8)
+        graine: Graine du générateur aléatoire
+
+    Returns:
+        np.ndarray: Pixels uint8
+    """
+    rng = np.random.default_rng(graine)
+    if structure == 'bruit':
+        return rng.integers(0, 1 << entropie, (hauteur, largeur), dtype=np.uint16).astype(np.uint8)
+    if structure == 'degrade':
+        pixels = (np.arange(hauteur, dtype=np.uint32)[:, None] * 255 // max(hauteur - 1, 1)
+                  + np.arange(largeur, dtype=np.uint32)[None, :] * 255 // max(largeur - 1, 1)) // 2
+        pixels += rng.integers(0, 4, (hauteur, largeur), dtype=np.uint32)
+        return np.minimum(pixels, 255).astype(np.uint8)
+    if structure == 'texte':
+        # Lignes de 16 pixels de haut (12 de glyphes, 4 d'interligne), glyphes de 8 pixels
+        # de large dont environ un tiers des pixels sont noirs, et des espaces entre les mots
+        glyphes = rng.random((-(-hauteur // 16), -(-largeur // 8), 12, 8)) < 0.33
+        glyphes &= rng.random(glyphes.shape[:2])[:, :, None, None] > 0.15
+        lignes = np.zeros(glyphes.shape[:2] + (16, 8), dtype=bool)
+        lignes[:, :, :12] = glyphes
+        noirs = lignes.transpose(0, 2, 1, 3).reshape(glyphes.shape[0] * 16, glyphes.shape[1] * 8)
+        return np.where(noirs[:hauteur, :largeur], 0, 255).astype(np.uint8)
+    raise ValueError(f"Structure inconnue: {structure} (choix: {', '.join(STRUCTURES)})")
+
+
+def generer_image(chemin, structure, mode, megapixels, entropie=8, graine=0):
+    """
+    Écrit une image synthétique PNG (carrée, megapixels millions de pixels).
+
+    Les canaux d'une image 'RGB' sont générés avec des graines différentes; une image
+    '1' est le seuillage à 128 de l'image en niveaux de gris.
+
+    Returns:
+        str: chemin
+    """
+    cote = max(1, int(round((megapixels * 1e6) ** 0.5)))
+    if mode == 'RGB':
+        canaux = [generer_pixels(structure, cote, cote, entropie, graine + i) for i in range(3)]
+        image = Image.fromarray(np.stack(canaux, axis=2), 'RGB')
+    elif mode == 'L':
+        image = Image.fromarray(generer_pixels(structure, cote, cote, entropie, graine), 'L')
+    elif mode == '1':
+        image = Image.fromarray(generer_pixels(structure, cote, cote, entropie, graine) >= 128)
+    else:
+        raise ValueError(f"Mode inconnu: {mode} (choix: {', '.join(MODES)})")
+    # Compression PNG minimale: la génération ne doit pas dominer le banc
+    image.save(chemin, compress_level=1)
+    return chemin
+
+
+def scenarios(tailles=TAILLES_DEFAUT, modes=MODES, structures=STRUCTURES):
+    """
+    Liste des scénarios: dicts avec 'nom', 'structure', 'mode', 'megapixels' et 'entropie'.
+    """
+    liste = []
+    for megapixels in tailles:
+        for structure in structures:
+            entropies = ENTROPIES_BRUIT if structure == 'bruit' else (8,)
+            for mode in modes:
+                for entropie in entropies:
+                    nom = f"{structure}{entropie if structure == 'bruit' else ''}/{mode}/{megapixels}MP"
+                    liste.append({'nom': nom, 'structure': structure, 'mode': mode,
+                                  'megapixels': megapixels, 'entropie': entropie})
+    return liste
+
+
+def _mesurer(fonction, memoire=True, repetitions=REPETITIONS_DEFAUT):
+    """
+    Exécute fonction() (sortie standard masquée) repetitions fois pour le temps, puis une
+    fois sous tracemalloc pour le pic de mémoire allouée (si memoire est True).
+
+    Returns:
+        tuple: (résultat de la première exécution, meilleure durée en secondes,
+                dispersion relative des durées (médiane / meilleure - 1, None avec une
+                seule répétition), pic en octets ou None)
+    """
+    durees = []
+    for repetition in range(max(1, repetitions)):
+        image_stats.vider_cache()
+        with contextlib.redirect_stdout(io.StringIO()):
+            debut = time.perf_counter()
+            resultat_repetition = fonction()
+            durees.append(time.perf_counter() - debut)
+        if repetition == 0:
+            resultat = resultat_repetition
+    duree = min(durees)
+    dispersion = float(np.median(durees)) / duree - 1 if len(durees) > 1 and duree > 0 else None
+
+    pic = None
+    if memoire:
+        image_stats.vider_cache()
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                fonction()
+            pic = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return resultat, duree, dispersion, pic
+
+
+@contextlib.contextmanager
+def _repertoire_courant(repertoire):
+    """Change de répertoire courant le temps du bloc (les analyses écrivent dans ./output)."""
+    precedent = os.getcwd()
+    os.chdir(repertoire)
+    try:
+        yield
+    finally:
+        os.chdir(precedent)
+
+
+def executer_scenario(scenario, repertoire, mesures=MESURES, memoire=True, repetitions=REPETITIONS_DEFAUT):
+    """
+    Génère l'image d'un scénario et effectue les mesures demandées.
+
+    Args:
+        scenario: Élément de scenarios()
+        repertoire: Répertoire de travail (image générée, fichiers produits)
+        mesures: Sous-ensemble de MESURES
+        memoire: Si True, mesure aussi le pic de mémoire allouée (exécution supplémentaire)
+        repetitions: Nombre d'exécutions chronométrées par mesure
+
+    Returns:
+        list: Résultats, un dict par mesure ('nom', 'mesure', 'duree', 'dispersion' (voir
+              _mesurer), 'debit' en Mo/s, 'ratio', 'pic_memoire' en octets; None quand
+              l'indicateur ne s'applique pas)
+    """
+    nom_fichier = scenario['nom'].replace('/', '_') + ".png"
+    chemin = generer_image(os.path.join(repertoire, nom_fichier), scenario['structure'], scenario['mode'],
+                           scenario['megapixels'], scenario['entropie'])
+    with Image.open(chemin) as image:
+        taille_brute = huffman_coding._taille_brute(image)
+        rgb = image.mode == 'RGB'
+
+    resultats = []
+
+    def ajouter(mesure, duree, dispersion, pic, ratio=None, debit=True):
+        resultats.append({
+            'nom': f"{mesure}/{scenario['nom']}",
+            'mesure': mesure,
+            'duree': duree,
+            'dispersion': dispersion,
+            'debit': taille_brute / duree / 1e6 if debit and duree > 0 else None,
+            'ratio': ratio,
+            'pic_memoire': pic,
+        })
+
+    metrics = None
+    if 'huffman' in mesures or 'graphiques' in mesures:
+        sortie_precedente = huffman_coding.OUTPUT_DIR
+        huffman_coding.OUTPUT_DIR = repertoire
+        try:
+            metrics, duree, dispersion, pic = _mesurer(lambda: huffman_coding.huffman(chemin), memoire,
+                                                       repetitions)
+        finally:
+            huffman_coding.OUTPUT_DIR = sortie_precedente
+        if 'huffman' in mesures:
+            ajouter('huffman', duree, dispersion, pic, metrics['ratio_compression'])
+
+    if 'analyse' in mesures:
+        fonction_analyse = analyze_spatial_redundancy_rgb if rgb else analyze_spatial_redundancy
+
+        def analyse():
+            # Les analyses laissent leur figure ouverte
+            fonction_analyse(chemin)
+            plt.close('all')
+
+        with _repertoire_courant(repertoire):
+            _, duree, dispersion, pic = _mesurer(analyse, memoire, repetitions)
+        ajouter('analyse', duree, dispersion, pic)
+
+    if 'graphiques' in mesures:
+        analyseur = CompressionAnalyzer()
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyseur.ajouter_resultat(chemin, metrics, None)
+        _, duree, dispersion, pic = _mesurer(lambda: analyseur.generate_histograms(output_dir=repertoire),
+                                             memoire, repetitions)
+        ajouter('graphiques', duree, dispersion, pic, debit=False)
+
+    return resultats
+
+
+def executer_banc(tailles=TAILLES_DEFAUT, modes=MODES, structures=STRUCTURES, mesures=MESURES, memoire=True,
+                  repetitions=REPETITIONS_DEFAUT):
+    """
+    Exécute tous les scénarios dans un répertoire temporaire.
+
+    Returns:
+        dict: 'version', 'plateforme' (Python, NumPy, machine) et 'resultats'
+    """
+    resultats = []
+    with tempfile.TemporaryDirectory(prefix="bench_huffman_") as repertoire:
+        for scenario in scenarios(tailles, modes, structures):
+            print(f"Scénario {scenario['nom']}...", flush=True)
+            for resultat in executer_scenario(scenario, repertoire, mesures, memoire, repetitions):
+                resultats.append(resultat)
+                print("  " + _ligne_resultat(resultat), flush=True)
+    return {
+        'version': VERSION_BENCH,
+        'plateforme': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processeurs': os.cpu_count(),
+        },
+        'resultats': resultats,
+    }
+
+
+def _ligne_resultat(resultat):
+    """Résumé d'un résultat sur une ligne."""
+    ligne = f"{resultat['nom']:<36} {resultat['duree'] * 1000:10.1f} ms"
+    if resultat['debit'] is not None:
+        ligne += f"  {resultat['debit']:8.2f} Mo/s"
+    if resultat['ratio'] is not None:
+        ligne += f"  ratio {resultat['ratio']:7.3f}"
+    if resultat['pic_memoire'] is not None:
+        ligne += f"  pic {resultat['pic_memoire'] / 1e6:8.1f} Mo"
+    return ligne
+
+
+def comparer(banc, reference, seuil=SEUIL_DEFAUT):
+    """
+    Compare un banc à une référence, scénario par scénario.
+
+    Les durées ne sont pas comparées quand le débit l'est (c'est la même mesure). Pour
+    ces deux indicateurs, le seuil est relevé à FACTEUR_DISPERSION fois la plus grande
+    dispersion des répétitions des deux exécutions: sur une machine bruitée, un écart
+    de l'ordre du bruit n'est pas une régression.
+
+    Args:
+        banc: Résultat de executer_banc()
+        reference: Résultat d'une exécution précédente (même format)
+        seuil: Dégradation relative tolérée (0.10 = 10 %)
+
+    Returns:
+        list: Régressions, un dict par indicateur dégradé ('nom', 'indicateur',
+              'reference', 'valeur', 'ecart' relatif, positif = dégradation)
+    """
+    references = {resultat['nom']: resultat for resultat in reference['resultats']}
+    regressions = []
+    for resultat in banc['resultats']:
+        precedent = references.get(resultat['nom'])
+        if precedent is None:
+            continue
+        for indicateur, sens in SENS_INDICATEURS.items():
+            if indicateur == 'duree' and resultat['debit'] is not None:
+                continue
+            valeur, valeur_reference = resultat.get(indicateur), precedent.get(indicateur)
+            if valeur is None or valeur_reference is None or valeur_reference == 0:
+                continue
+            ecart = sens * (valeur_reference - valeur) / valeur_reference
+            seuil_indicateur = seuil
+            if indicateur in ('debit', 'duree'):
+                dispersions = [d for d in (resultat.get('dispersion'), precedent.get('dispersion')) if d is not None]
+                seuil_indicateur = max([seuil] + [FACTEUR_DISPERSION * d for d in dispersions])
+            if ecart > seuil_indicateur:
+                regressions.append({'nom': resultat['nom'], 'indicateur': indicateur,
+                                    'reference': valeur_reference, 'valeur': valeur, 'ecart': ecart})
+    return regressions
+
+
+def main(arguments=None):
+    """
+    Point d'entrée CLI: exécute le banc, écrit le JSON et compare à la référence.
+
+    Returns:
+        int: Code de sortie (1 si une régression est détectée)
+    """
+    parseur = argparse.ArgumentParser(description="Banc d'essai de la compression Huffman")
+    parseur.add_argument('--tailles', type=float, nargs='+', default=None,
+                         help="Tailles des images, en mégapixels (défaut: 1)")
+    parseur.add_argument('--complet', action='store_true',
+                         help=f"Tailles {', '.join(map(str, TAILLES_COMPLET))} MP")
+    parseur.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parseur.add_argument('--structures', nargs='+', choices=STRUCTURES, default=list(STRUCTURES))
+    parseur.add_argument('--mesures', nargs='+', choices=MESURES, default=list(MESURES))
+    parseur.add_argument('--sans-memoire', action='store_true',
+                         help="Ne pas mesurer le pic de mémoire (deux fois plus rapide)")
+    parseur.add_argument('--repetitions', type=int, default=REPETITIONS_DEFAUT,
+                         help="Exécutions chronométrées par mesure (la meilleure est retenue; "
+                              f"au moins {REPETITIONS_MIN_COMPARAISON} avec --reference)")
+    parseur.add_argument('--sortie', default=SORTIE_DEFAUT,
+                         help="Fichier JSON des résultats")
+    parseur.add_argument('--reference', help="JSON d'une exécution précédente à comparer")
+    parseur.add_argument('--seuil', type=float, default=SEUIL_DEFAUT,
+                         help="Dégradation relative tolérée avant de signaler une régression")
+    options = parseur.parse_args(arguments)
+
+    repetitions = options.repetitions
+    if options.reference is not None and repetitions < REPETITIONS_MIN_COMPARAISON:
+        print(f"Comparaison à une référence: {REPETITIONS_MIN_COMPARAISON} répétitions au lieu de {repetitions}")
+        repetitions = REPETITIONS_MIN_COMPARAISON
+
+    tailles = options.tailles or (TAILLES_COMPLET if options.complet else TAILLES_DEFAUT)
+    tailles = [int(taille) if float(taille).is_integer() else taille for taille in tailles]
+    banc = executer_banc(tailles, options.modes, options.structures, options.mesures, not options.sans_memoire,
+                         repetitions)
+
+    os.makedirs(os.path.dirname(os.path.abspath(options.sortie)), exist_ok=True)
+    with open(options.sortie, 'w', encoding='utf-8') as f:
+        json.dump(banc, f, indent=2)
+    print(f"\nRésultats écrits: {options.sortie}")
+
+    if options.reference is None:
+        return 0
+    with open(options.reference, encoding='utf-8') as f:
+        reference = json.load(f)
+    regressions = comparer(banc, reference, options.seuil)
+    if not regressions:
+        print(f"Aucune régression au-delà de {options.seuil:.0%} par rapport à {options.reference}")
+        return 0
+
+    print(f"\n{len(regressions)} RÉGRESSION(S) au-delà de {options.seuil:.0%}:")
+    for regression in regressions:
+        print(f"  {regression['nom']:<36} {regression['indicateur']:<12} "
+              f"{regression['reference']:.4g} -> {regression['valeur']:.4g} ({regression['ecart']:+.1%})")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
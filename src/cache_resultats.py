@@ -0,0 +1,152 @@
+"""
+Cache disque des résultats de compression, adressé par le contenu
+
+La clé d'une entrée est un hash des pixels décodés, des métadonnées de l'image
+et de la configuration de l'encodeur: une image inchangée, compressée avec les
+mêmes options, ne coûte qu'un hash au lieu d'un encodage complet.
+
+Chaque entrée est un répertoire <clé>/ contenant:
+    metrics.json  le dict retourné par huffman()
+    metrics.txt   le fichier *_metrics.txt
+    flux.huf      le fichier compressé (optionnel)
+
+La taille totale est bornée: les entrées les moins récemment utilisées sont
+retirées en premier (la date de modification de metrics.json sert d'horodatage).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+# À incrémenter quand l'encodeur change de façon à modifier les résultats, ou quand
+# les métriques gagnent des champs (2: etapes, nb_echantillons et memoire)
+VERSION_CACHE = 2
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPERTOIRE_CACHE = os.path.join(os.path.dirname(SCRIPT_DIR), ".cache", "huffman")
+
+
+class CacheResultats:
+    """
+    Cache disque des métriques (et optionnellement des fichiers .huf) produits par huffman().
+
+    Args:
+        repertoire: Répertoire du cache
+        taille_max: Taille maximale du cache, en octets
+        garder_flux: Si True, conserve aussi le fichier .huf de chaque entrée
+    """
+
+    def __init__(self, repertoire=REPERTOIRE_CACHE, taille_max=256 * 1024 * 1024, garder_flux=True):
+        self.repertoire = repertoire
+        self.taille_max = taille_max
+        self.garder_flux = garder_flux
+        os.makedirs(repertoire, exist_ok=True)
+
+    def cle(self, bandes, image_metadata, configuration):
+        """
+        Calcule la clé d'une image: hash des pixels (lus bande par bande),
+        des métadonnées et de la configuration de l'encodeur.
+
+        Args:
+            bandes: Itérable de tableaux numpy (les pixels de l'image)
+            image_metadata: dict avec 'size' et 'mode'
+            configuration: dict des options de l'encodeur qui influencent le résultat
+
+        Returns:
+            str: Clé hexadécimale
+        """
+        h = hashlib.blake2b(digest_size=20)
+        description = {'version': VERSION_CACHE, 'metadata': image_metadata, 'configuration': configuration}
+        h.update(json.dumps(description, sort_keys=True, default=str).encode('utf-8'))
+        for bande in bandes:
+            h.update(np.ascontiguousarray(bande).data)
+        return h.hexdigest()
+
+    def _chemin(self, cle):
+        return os.path.join(self.repertoire, cle)
+
+    def lire(self, cle):
+        """
+        Retourne l'entrée (dict avec 'metrics', 'metrics_txt' et 'flux') ou None.
+        'metrics_txt' et 'flux' sont des chemins dans le cache ('flux' peut être None).
+        """
+        chemin = self._chemin(cle)
+        chemin_json = os.path.join(chemin, "metrics.json")
+        try:
+            with open(chemin_json, encoding='utf-8') as f:
+                metrics = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        # Horodatage LRU
+        os.utime(chemin_json)
+        chemin_flux = os.path.join(chemin, "flux.huf")
+        return {
+            'metrics': metrics,
+            'metrics_txt': os.path.join(chemin, "metrics.txt"),
+            'flux': chemin_flux if os.path.exists(chemin_flux) else None,
+        }
+
+    def ecrire(self, cle, metrics, fichier_metrics, fichier_compresse=None):
+        """
+        Ajoute une entrée au cache puis retire les plus anciennes si la taille maximale est dépassée.
+
+        Args:
+            cle: Clé calculée par cle()
+            metrics: dict retourné par huffman()
+            fichier_metrics: Chemin du fichier *_metrics.txt
+            fichier_compresse: Chemin du fichier .huf (ignoré si garder_flux est False)
+        """
+        # Écriture dans un répertoire temporaire puis renommage: une entrée est complète ou absente
+        temporaire = tempfile.mkdtemp(dir=self.repertoire, prefix=".tmp_")
+        try:
+            with open(os.path.join(temporaire, "metrics.json"), "w", encoding='utf-8') as f:
+                json.dump(metrics, f, default=_json_defaut)
+            shutil.copyfile(fichier_metrics, os.path.join(temporaire, "metrics.txt"))
+            if self.garder_flux and fichier_compresse is not None:
+                shutil.copyfile(fichier_compresse, os.path.join(temporaire, "flux.huf"))
+
+            chemin = self._chemin(cle)
+            if os.path.exists(chemin):
+                shutil.rmtree(chemin)
+            os.replace(temporaire, chemin)
+        except Exception:
+            shutil.rmtree(temporaire, ignore_errors=True)
+            raise
+
+        self._evincer()
+
+    def _evincer(self):
+        """Retire les entrées les moins récemment utilisées jusqu'à respecter taille_max."""
+        entrees = []
+        total = 0
+        for nom in os.listdir(self.repertoire):
+            chemin = self._chemin(nom)
+            chemin_json = os.path.join(chemin, "metrics.json")
+            if nom.startswith(".tmp_") or not os.path.exists(chemin_json):
+                continue
+            taille = sum(entree.stat().st_size for entree in os.scandir(chemin))
+            entrees.append((os.stat(chemin_json).st_mtime, taille, chemin))
+            total += taille
+
+        for _, taille, chemin in sorted(entrees):
+            if total <= self.taille_max:
+                break
+            shutil.rmtree(chemin, ignore_errors=True)
+            total -= taille
+
+    def vider(self):
+        """Retire toutes les entrées du cache."""
+        shutil.rmtree(self.repertoire, ignore_errors=True)
+        os.makedirs(self.repertoire, exist_ok=True)
+
+
+def _json_defaut(valeur):
+    """Conversion des types numpy pour json.dump."""
+    if isinstance(valeur, np.generic):
+        return valeur.item()
+    raise TypeError(f"Type non sérialisable: {type(valeur)}")
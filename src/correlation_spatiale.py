@@ -0,0 +1,188 @@
+"""
+Corrélation spatiale d'une image: plusieurs directions, plusieurs décalages, en une passe
+
+Pour chaque direction (horizontale, verticale, diagonale, antidiagonale) et chaque
+décalage k de 1 à decalage_max, on mesure la corrélation de Pearson entre chaque
+pixel et son voisin à k pas dans cette direction, sans jamais apparier la fin d'une
+ligne avec le début de la suivante. Le calcul est fait pour chaque canal et pour la
+luminance (ITU-R 601, sans arrondi), dérivée des canaux R, G et B: l'image n'est
+pas convertie.
+
+Toutes les corrélations se déduisent de sommes entières exactes:
+- sommes et produits croisés canal x canal de toute l'image, dont on retranche les
+  bandes de bord exclues par chaque décalage (quelques lignes ou colonnes);
+- produits croisés entre un pixel et son voisin. Sur une bande de lignes contiguë et
+  aplatie, le voisin à (dy, dx) est à un décalage constant dy * largeur + dx: c'est un
+  seul produit matriciel sur deux vues de la bande. Les paires qui enjambent une fin
+  de ligne (dx != 0) sont ensuite retranchées.
+
+L'image est parcourue une fois, par bandes converties en float64 (produits exacts
+tant qu'une bande compte moins de ECHANTILLONS_PAR_BANDE échantillons).
+"""
+
+import numpy as np
+
+# Directions mesurées: (dy, dx) pour un décalage de 1
+DIRECTIONS = {
+    'horizontale': (0, 1),
+    'verticale': (1, 0),
+    'diagonale': (1, 1),
+    'antidiagonale': (1, -1),
+}
+
+# Poids de la luminance (ITU-R 601, ceux de PIL pour convert('L'))
+POIDS_LUMINANCE = (0.299, 0.587, 0.114)
+
+# Échantillons par bande convertie en float64: borne la mémoire, et garde les produits
+# croisés d'une bande exacts (65535^2 * 2^18 < 2^53)
+ECHANTILLONS_PAR_BANDE = 1 << 18
+
+
+def _moments(bloc):
+    """Somme par canal et produits croisés canal x canal (entiers exacts) d'un bloc (h, l, c)."""
+    sommes = bloc.sum(axis=(0, 1), dtype=np.int64)
+    produits = np.einsum('ijc,ijd->cd', bloc, bloc, dtype=np.int64, casting='safe')
+    return sommes, produits
+
+
+def _moments_fenetre(pixels, totaux, ligne_debut, ligne_fin, colonne_debut, colonne_fin):
+    """Moments de la fenêtre [ligne_debut, ligne_fin) x [colonne_debut, colonne_fin): totaux moins les bords."""
+    sommes, produits = totaux[0].copy(), totaux[1].copy()
+    for bord in (pixels[:ligne_debut], pixels[ligne_fin:],
+                 pixels[ligne_debut:ligne_fin, :colonne_debut], pixels[ligne_debut:ligne_fin, colonne_fin:]):
+        if bord.size:
+            sommes_bord, produits_bord = _moments(bord)
+            sommes -= sommes_bord
+            produits -= produits_bord
+    return sommes, produits
+
+
+def _fenetres(hauteur, largeur, dy, dx):
+    """Fenêtres (lignes, colonnes) des pixels et de leurs voisins à (dy, dx), dy >= 0."""
+    depart = (0, hauteur - dy, max(0, -dx), largeur - max(0, dx))
+    voisin = (dy, hauteur, max(0, dx), largeur + min(0, dx))
+    return depart, voisin
+
+
+def _correlation(n, somme_a, somme_b, produits_aa, produits_bb, produits_ab, poids):
+    """Corrélation de la combinaison linéaire poids des canaux (entiers Python: pas de débordement)."""
+    if n < 2:
+        return float('nan')
+    covariance = n * produits_ab - np.outer(somme_a, somme_b)
+    variance_a = n * produits_aa - np.outer(somme_a, somme_a)
+    variance_b = n * produits_bb - np.outer(somme_b, somme_b)
+    numerateur = float(poids @ covariance.astype(float) @ poids)
+    denominateur = float(poids @ variance_a.astype(float) @ poids) * float(poids @ variance_b.astype(float) @ poids)
+    # Variance nulle (image ou canal constant): corrélation indéfinie
+    if denominateur <= 0:
+        return float('nan')
+    return numerateur / float(np.sqrt(denominateur))
+
+
+def correlations_spatiales(pixels, decalage_max=1, canaux=None, directions=DIRECTIONS):
+    """
+    Corrélations spatiales d'une image, par direction, décalage et canal.
+
+    Args:
+        pixels: Image (hauteur x largeur) ou (hauteur x largeur x canaux), entiers non signés
+        decalage_max: Plus grand décalage mesuré (décalages 1 à decalage_max)
+        canaux: Noms des canaux (par défaut 'L' pour une image 2D, sinon R, G, B, A...)
+        directions: Directions mesurées, {nom: (dy, dx)} avec dy >= 0
+
+    Returns:
+        dict: {'canaux': noms, 'decalages': [1..decalage_max],
+               'directions': {direction: {'nb_paires': [...], canal: [...], 'luminance': [...]}}}.
+              Chaque liste a une valeur par décalage; une corrélation indéfinie (variance nulle,
+              pas de paires) vaut nan. 'luminance' est absente si l'image n'a ni 1 ni au moins
+              3 canaux R, G, B.
+    """
+    if decalage_max < 1:
+        raise ValueError(f"decalage_max doit être au moins 1: {decalage_max}")
+    pixels = np.asarray(pixels)
+    if pixels.dtype == bool:
+        pixels = pixels.view(np.uint8)
+    if not np.issubdtype(pixels.dtype, np.unsignedinteger) or pixels.itemsize > 2:
+        raise ValueError(f"Type de pixels non pris en charge: {pixels.dtype}")
+    if pixels.ndim == 2:
+        pixels = pixels[:, :, np.newaxis]
+    hauteur, largeur, nb_canaux = pixels.shape
+
+    if canaux is None:
+        if nb_canaux == 1:
+            canaux = ('L',)
+        elif nb_canaux <= 4:
+            canaux = ('R', 'G', 'B', 'A')[:nb_canaux]
+        else:
+            canaux = tuple(f"canal{c}" for c in range(nb_canaux))
+    if len(canaux) != nb_canaux:
+        raise ValueError(f"{len(canaux)} noms pour {nb_canaux} canaux")
+    mesures = [(nom, np.eye(nb_canaux)[c]) for c, nom in enumerate(canaux)]
+    if nb_canaux == 1:
+        mesures.append(('luminance', np.ones(1)))
+    elif tuple(canaux[:3]) == ('R', 'G', 'B'):
+        mesures.append(('luminance', np.concatenate((POIDS_LUMINANCE, np.zeros(nb_canaux - 3)))))
+
+    decalages = list(range(1, decalage_max + 1))
+    # (direction, décalage) -> (dy, dx)
+    paires = {(direction, k): (dy * k, dx * k) for direction, (dy, dx) in directions.items() for k in decalages}
+    if any(dy < 0 for dy, _ in paires.values()):
+        raise ValueError("Les directions doivent avoir dy >= 0")
+    marge = max((dy + (1 if dx else 0) for dy, dx in paires.values()), default=0)
+
+    # Passe unique sur l'image: moments de toute l'image et produits croisés entre
+    # chaque pixel et ses voisins
+    sommes = np.zeros(nb_canaux, dtype=np.int64)
+    produits = np.zeros((nb_canaux, nb_canaux), dtype=np.int64)
+    croises = {cle: np.zeros((nb_canaux, nb_canaux), dtype=np.int64) for cle in paires}
+    lignes_par_bande = max(1, ECHANTILLONS_PAR_BANDE // max(1, largeur * nb_canaux))
+    # Bande + marge de lignes suivantes, complétée de zéros sous la dernière ligne
+    bande = np.zeros((lignes_par_bande + marge, largeur, nb_canaux), dtype=np.float64)
+    plate = bande.reshape(-1, nb_canaux)
+    for debut in range(0, hauteur, lignes_par_bande):
+        fin = min(hauteur, debut + lignes_par_bande + marge)
+        bande[:fin - debut] = pixels[debut:fin]
+        bande[fin - debut:] = 0
+        propres = min(lignes_par_bande, hauteur - debut) * largeur
+        sommes += np.rint(plate[:propres].sum(axis=0)).astype(np.int64)
+        produits += np.rint(plate[:propres].T @ plate[:propres]).astype(np.int64)
+        for cle, (dy, dx) in paires.items():
+            # Pixels de départ de cette bande dont le voisin est dans l'image
+            nb_lignes = min(lignes_par_bande, hauteur - dy - debut)
+            if nb_lignes <= 0 or abs(dx) >= largeur:
+                continue
+            n = nb_lignes * largeur
+            saut = dy * largeur + dx
+            produit = plate[:n].T @ plate[saut:saut + n]
+            # Paires qui enjambent une fin de ligne: voisin sur la ligne dy + 1 (dx > 0) ou dy - 1 (dx < 0)
+            if dx > 0:
+                produit -= np.einsum('ijc,ijd->cd', bande[:nb_lignes, largeur - dx:],
+                                     bande[dy + 1:dy + 1 + nb_lignes, :dx])
+            elif dx < 0:
+                produit -= np.einsum('ijc,ijd->cd', bande[:nb_lignes, :-dx],
+                                     bande[dy - 1:dy - 1 + nb_lignes, largeur + dx:])
+            croises[cle] += np.rint(produit).astype(np.int64)
+
+    # Sommes et carrés de chaque fenêtre, depuis les totaux de l'image
+    totaux = (sommes, produits)
+    resultat = {'canaux': tuple(canaux), 'decalages': decalages, 'directions': {}}
+    for direction in directions:
+        par_canal = {'nb_paires': []}
+        par_canal.update({nom: [] for nom, _ in mesures})
+        for k in decalages:
+            dy, dx = paires[(direction, k)]
+            depart, voisin = _fenetres(hauteur, largeur, dy, dx)
+            n = max(0, depart[1] - depart[0]) * max(0, depart[3] - depart[2])
+            par_canal['nb_paires'].append(n)
+            if n:
+                somme_a, produits_aa = _moments_fenetre(pixels, totaux, *depart)
+                somme_b, produits_bb = _moments_fenetre(pixels, totaux, *voisin)
+            for nom, poids in mesures:
+                if not n:
+                    par_canal[nom].append(float('nan'))
+                    continue
+                # Entiers Python: n * produits dépasse int64 sur les grandes images
+                par_canal[nom].append(_correlation(
+                    n, somme_a.astype(object), somme_b.astype(object), produits_aa.astype(object),
+                    produits_bb.astype(object), croises[(direction, k)].astype(object), poids))
+        resultat['directions'][direction] = par_canal
+    return resultat
@@ -4,9 +4,47 @@ Génération d'histogrammes pour les métriques de compression Huffman
 
 import matplotlib.pyplot as plt
 import numpy as np
-from huffman_coding import huffman
+from huffman_coding import huffman, entrainer_table
+from tables_partagees import RegistreTables
+from image_stats import obtenir_stats
+from cache_resultats import CacheResultats
 import os
 import glob
+from concurrent.futures import ProcessPoolExecutor
+
+
+def _compresser_image(image_path, cache=None, codeur='huffman', table_partagee=None):
+    """
+    Compresse une image et calcule la distribution de ses symboles.
+
+    Fonction de module (et non méthode) pour pouvoir être exécutée dans un
+    processus séparé par CompressionAnalyzer.analyze_images.
+
+    Args:
+        image_path: Chemin de l'image
+        cache: CacheResultats optionnel, transmis à huffman()
+        codeur: Codeur entropique des blocs ('huffman' ou 'rans'), transmis à huffman()
+        table_partagee: Identifiant d'une table pré-entraînée, transmis à huffman()
+
+    Returns:
+        tuple: (métriques de huffman(), occurrences des symboles 0-255 ou None)
+    """
+    metrics = huffman(image_path, cache=cache, codeur=codeur, table_partagee=table_partagee)
+
+    # NOUVEAU: Calculer la distribution des symboles
+    # L'histogramme vient des statistiques déjà calculées par huffman() (image chargée une seule fois)
+    try:
+        histogramme = obtenir_stats(image_path).histogramme
+        if histogramme is None:
+            raise ValueError("les symboles ne sont pas des entiers non négatifs")
+        # minlength=256 assure qu'on a bien tous les symboles possibles
+        counts = np.zeros(max(256, len(histogramme)), dtype=np.int64)
+        counts[:len(histogramme)] = histogramme
+    except Exception as e:
+        print(f"  Warning: Impossible de calculer la distribution des symboles: {e}")
+        counts = None
+
+    return metrics, counts
 
 
 class CompressionAnalyzer:
@@ -16,60 +54,131 @@ class CompressionAnalyzer:
     
     def __init__(self):
         self.results = []
+        self.echecs = []
+        # Histogrammes des images analysées, pour entraîner une table partagée
+        self.histogrammes = []
     
-    def analyze_images(self, image_paths):
+    def analyze_images(self, image_paths, jobs=1, cache=None, codeurs=('huffman',), table_partagee=None):
         """
         Analyse plusieurs images et collecte les métriques
+
+        Args:
+            image_paths: Liste de chemins d'images
+            jobs: Nombre de processus. Avec jobs > 1, les images sont compressées en
+                  parallèle; les résultats restent dans l'ordre de image_paths et
+                  l'échec d'une image n'arrête pas le lot.
+            cache: CacheResultats optionnel: les images déjà compressées ne sont pas réencodées
+            codeurs: Codeurs entropiques à comparer: chaque image est compressée avec chacun,
+                     et les résultats sont rangés côte à côte (image par image)
+            table_partagee: Identifiant d'une table pré-entraînée (voir entrainer_table),
+                            utilisée par le codeur Huffman à la place des tables propres
         """
+        chemins = []
         for image_path in image_paths:
             if not os.path.exists(image_path):
                 print(f"Avertissement: '{image_path}' n'existe pas, ignoré.")
                 continue
-            
-            try:
-                print(f"Analyse de: {image_path}")
-                metrics = huffman(image_path)
-                
-                result = {
-                    'filename': os.path.basename(image_path),
-                    'original_size': metrics['taille_originale'],
-                    'compressed_size': metrics['taille_compressee'],
-                    'compression_ratio': metrics['ratio_compression'],
-                    'compression_percentage': metrics['pourcentage_reduction']
-                }
-                
-                self.results.append(result)
-                print(f"  ✓ Traité avec succès\n")
-                
-                # NOUVEAU: Calculer la distribution des symboles
+            chemins.append(image_path)
+
+        # Une tâche par couple (image, codeur); la distribution des symboles ne dépend
+        # pas du codeur et n'est tracée qu'une fois par image
+        taches = [(image_path, codeur) for image_path in chemins for codeur in codeurs]
+        etiqueter = len(codeurs) > 1
+
+        if jobs > 1 and len(taches) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as executeur:
+                futures = [executeur.submit(_compresser_image, image_path, cache, codeur,
+                                            table_partagee if codeur == 'huffman' else None)
+                           for image_path, codeur in taches]
+                # On récupère les résultats dans l'ordre des tâches, pas dans l'ordre de fin
+                for (image_path, codeur), future in zip(taches, futures):
+                    try:
+                        metrics, counts = future.result()
+                    except Exception as e:
+                        self._ajouter_echec(image_path, e, codeur if etiqueter else None)
+                        continue
+                    self.ajouter_resultat(image_path, metrics, counts if codeur == codeurs[0] else None,
+                                           etiqueter)
+        else:
+            for image_path, codeur in taches:
                 try:
-                    from PIL import Image
-                    img = Image.open(image_path)
-                    # Convertir en array numpy et aplatir
-                    data = np.array(img).flatten()
-                    
-                    # Convertir en int si nécessaire pour éviter les problèmes de type
-                    if np.issubdtype(data.dtype, np.integer):
-                         data = data.astype(int)
-                         
-                    # Compter les occurrences (0-255)
-                    # On utilise np.bincount car c'est plus rapide pour des entiers non-négatifs
-                    # minlength=256 assure qu'on a bien tous les symboles possibles
-                    counts = np.bincount(data, minlength=256)
-                    
-                    # Stocker la distribution pour l'histogramme
-                    # Utiliser le dossier output absolu
-                    script_dir = os.path.dirname(os.path.abspath(__file__))
-                    output_dir = os.path.join(os.path.dirname(script_dir), "output")
-                    
-                    self._create_symbol_distribution_histogram(os.path.basename(image_path), counts, output_dir=output_dir)
-                    
+                    print(f"Analyse de: {image_path}" + (f" [{codeur}]" if etiqueter else ""))
+                    metrics, counts = _compresser_image(image_path, cache, codeur,
+                                                        table_partagee if codeur == 'huffman' else None)
                 except Exception as e:
-                    print(f"  Warning: Impossible de calculer la distribution des symboles: {e}")
+                    self._ajouter_echec(image_path, e, codeur if etiqueter else None)
+                    continue
+                self.ajouter_resultat(image_path, metrics, counts if codeur == codeurs[0] else None,
+                                       etiqueter)
+
+    def ajouter_resultat(self, image_path, metrics, counts, etiqueter=False):
+        """
+        Enregistre les métriques d'une image et trace la distribution de ses symboles
+        (counts, ou None pour ne rien tracer). Sert aussi à ajouter les métriques d'un
+        appel direct à huffman(), par exemple depuis le banc d'essai.
+
+        Avec etiqueter=True (plusieurs codeurs comparés), le nom du fichier est suivi
+        du codeur entre crochets pour distinguer les barres des graphiques.
+        """
+        codeur = metrics.get('codeur', 'huffman')
+        result = {
+            'filename': os.path.basename(image_path) + (f" [{codeur}]" if etiqueter else ""),
+            'codeur': codeur,
+            'original_size': metrics['taille_originale'],
+            'compressed_size': metrics['taille_compressee'],
+            'compression_ratio': metrics['ratio_compression'],
+            'compression_percentage': metrics['pourcentage_reduction'],
+            'debit_encodage': metrics.get('debit_encodage'),
+            'debit_decodage': metrics.get('debit_decodage'),
+            'table_partagee': metrics.get('table_partagee'),
+            'nb_echantillons': metrics.get('nb_echantillons'),
+            'etapes': metrics.get('etapes'),
+            'memoire': metrics.get('memoire'),
+        }
+        
+        self.results.append(result)
+        print(f"  ✓ {result['filename']} traité avec succès\n")
 
-                
-            except Exception as e:
-                print(f"Erreur lors de l'analyse de {image_path}: {e}")
+        if counts is None:
+            return
+        self.histogrammes.append(counts)
+
+        try:
+            # Utiliser le dossier output absolu
+            script_dir = os.path.dirname(os.path.abspath(__file__))
+            output_dir = os.path.join(os.path.dirname(script_dir), "output")
+            
+            self._create_symbol_distribution_histogram(os.path.basename(image_path), counts, output_dir=output_dir)
+            
+        except Exception as e:
+            print(f"  Warning: Impossible de tracer la distribution des symboles: {e}")
+
+    def entrainer_table(self, registre=None, longueur_max=None):
+        """
+        Entraîne une table de codes sur l'histogramme cumulé des images analysées
+        et la range dans le registre des tables partagées.
+
+        Args:
+            registre: RegistreTables (par défaut, celui de REPERTOIRE_TABLES)
+            longueur_max: Longueur maximale des codes (None: sans limite)
+
+        Returns:
+            str: Identifiant de la table, à passer à huffman(table_partagee=...)
+        """
+        if not self.histogrammes:
+            raise ValueError("Aucun histogramme: analyser des images avant d'entraîner une table")
+        registre = registre if registre is not None else RegistreTables()
+        identifiant = registre.enregistrer(entrainer_table(self.histogrammes, longueur_max))
+        print(f"Table partagée entraînée sur {len(self.histogrammes)} images: {identifiant}")
+        return identifiant
+
+    def _ajouter_echec(self, image_path, erreur, codeur=None):
+        """
+        Enregistre l'échec d'une image sans interrompre le lot
+        """
+        filename = os.path.basename(image_path) + (f" [{codeur}]" if codeur else "")
+        self.echecs.append({'filename': filename, 'error': str(erreur)})
+        print(f"Erreur lors de l'analyse de {image_path}: {erreur}")
     
     def _create_symbol_distribution_histogram(self, filename, counts, output_dir):
         """
@@ -338,6 +447,13 @@ class CompressionAnalyzer:
         """
         Affiche un résumé textuel des résultats
         """
+        if self.echecs:
+            print("\n" + "="*70)
+            print(f"ÉCHECS ({len(self.echecs)})")
+            print("="*70)
+            for echec in self.echecs:
+                print(f"  {echec['filename']}: {echec['error']}")
+
         if not self.results:
             print("Aucun résultat disponible.")
             return
@@ -352,6 +468,34 @@ class CompressionAnalyzer:
             print(f"  Taille compressée:     {result['compressed_size']:,} octets")
             print(f"  Ratio de compression:  {result['compression_ratio']:.2f}x")
             print(f"  Réduction:             {result['compression_percentage']:.2f}%")
+            if result.get('table_partagee'):
+                print(f"  Table partagée:        {result['table_partagee']}")
+            memoire = result.get('memoire') or {}
+            if memoire.get('pic_alloue') is not None:
+                print(f"  Pic alloué:            {memoire['pic_alloue'] / 1e6:.1f} Mo")
+            if memoire.get('pic_rss') is not None:
+                print(f"  Pic RSS:               {memoire['pic_rss'] / 1e6:.1f} Mo")
+
+        # Comparaison des codeurs: taux de compression et débits, image par image
+        codeurs = list(dict.fromkeys(r['codeur'] for r in self.results))
+        if len(codeurs) > 1:
+            print("\n" + "-"*70)
+            print("COMPARAISON DES CODEURS (ratio / débit d'encodage / débit de décodage)")
+            print("-"*70)
+            par_image = {}
+            for result in self.results:
+                image = result['filename'].rsplit(' [', 1)[0]
+                par_image.setdefault(image, {})[result['codeur']] = result
+            for image, resultats in par_image.items():
+                print(f"  {image}")
+                for codeur in codeurs:
+                    if codeur not in resultats:
+                        continue
+                    r = resultats[codeur]
+                    debit_decodage = (f"{r['debit_decodage']:.1f} Mo/s" if r['debit_decodage'] is not None
+                                      else "-")
+                    print(f"    {codeur:<10} {r['compression_ratio']:6.3f}x  "
+                          f"{r['debit_encodage']:8.1f} Mo/s  {debit_decodage:>12}")
         
         # Calculer les moyennes
         avg_ratio = np.mean([r['compression_ratio'] for r in self.results])
@@ -362,15 +506,39 @@ class CompressionAnalyzer:
         print("-"*70)
         print(f"  Ratio moyen:           {avg_ratio:.2f}x")
         print(f"  Réduction moyenne:     {avg_percentage:.2f}%")
+
+        # Temps par étape de huffman(), cumulés sur les résultats qui les mesurent (un
+        # résultat ajouté par ajouter_resultat peut n'avoir ni étapes ni échantillons)
+        durees = {}
+        echantillons = {}
+        mesures = [r for r in self.results if r.get('etapes') and r.get('nb_echantillons') is not None]
+        for result in mesures:
+            for etape, mesure in result['etapes'].items():
+                durees[etape] = durees.get(etape, 0.0) + mesure['duree']
+                echantillons[etape] = echantillons.get(etape, 0) + result['nb_echantillons']
+        total = sum(durees.values())
+        if mesures:
+            print("\n" + "-"*70)
+            print(f"TEMPS PAR ÉTAPE (cumul sur {len(mesures)} compressions)")
+            print("-"*70)
+            for etape, duree in sorted(durees.items(), key=lambda element: -element[1]):
+                debit = echantillons[etape] / duree / 1e6 if duree > 0 else float('inf')
+                part = duree / total * 100 if total > 0 else 0.0
+                print(f"  {etape:<14} {duree * 1000:10.2f} ms  {part:5.1f}%  "
+                      f"{debit:10.2f} M éch./s")
+            print(f"  {'total':<14} {total * 1000:10.2f} ms")
         print("="*70 + "\n")
 
 
-def generate_compression_histograms(image_paths):
+def generate_compression_histograms(image_paths, jobs=1, cache=None, codeurs=('huffman',)):
     """
     Génère les histogrammes de compression pour les images spécifiées.
     
     Args:
         image_paths: Liste de chemins d'images ou chemin unique (string)
+        jobs: Nombre de processus utilisés pour compresser les images
+        cache: CacheResultats optionnel pour ne pas recompresser les images inchangées
+        codeurs: Codeurs entropiques comparés côte à côte ('huffman', 'rans')
     """
     # Permettre un seul chemin ou une liste de chemins
     if isinstance(image_paths, str):
@@ -384,7 +552,7 @@ def generate_compression_histograms(image_paths):
     
     # Analyser les images
     print("Début de l'analyse des images...\n")
-    analyzer.analyze_images(image_paths)
+    analyzer.analyze_images(image_paths, jobs=jobs, cache=cache, codeurs=codeurs)
     
     # Afficher le résumé
     analyzer.print_summary()
@@ -410,7 +578,8 @@ def main():
         print("Veuillez ajouter des images PNG dans le répertoire images/")
         return
     
-    generate_compression_histograms(image_paths)
+    generate_compression_histograms(image_paths, jobs=os.cpu_count() or 1, cache=CacheResultats(),
+                                    codeurs=('huffman', 'rans'))
 
 
 if __name__ == "__main__":
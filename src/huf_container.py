@@ -0,0 +1,190 @@
+"""
+Format de conteneur binaire .huf pour les images compressées
+
+Structure d'un fichier (version 1):
+
+    'HUF' + version (1 octet)
+    sections d'en-tête: [type (1 octet), taille (varint), contenu] ..., terminées par le type 0
+    blocs compressés, concaténés (chacun aligné sur un octet)
+    index: nombre de blocs (varint), puis pour chaque bloc
+           position relative au premier bloc, nombre de bits et nombre de symboles (varints)
+    pied: position de l'index (8 octets, little-endian) + 'HUFI'
+
+Le conteneur ne connaît pas le contenu des sections ni des blocs: c'est huffman_coding
+qui les interprète. L'écrivain écrit les blocs au fur et à mesure (l'index est écrit à
+la fin), et le lecteur utilise mmap pour donner accès aux blocs sans copier le fichier.
+"""
+
+import mmap
+import struct
+
+MAGIE = b'HUF'
+MAGIE_INDEX = b'HUFI'
+VERSION = 1
+
+# Types de sections d'en-tête
+SECTION_FIN = 0
+SECTION_ENTETE = 1  # métadonnées de l'image + table des longueurs (huffman_coding.serialiser_entete)
+SECTION_TUILES = 2  # découpage en tuiles et tables locales (huffman_coding.serialiser_tuiles)
+SECTION_PREDICTION = 3  # prédicteurs de la transformée prédictive (prediction.serialiser_choix)
+SECTION_PLAGES = 4  # codage par plages (huffman_coding.serialiser_plages)
+SECTION_TUPLES = 5  # symboles étendus: taille des tuples et valeurs présentes (huffman_coding.serialiser_tuples)
+SECTION_RANS = 6  # blocs codés par rANS: table des fréquences (rans.serialiser_frequences)
+SECTION_TABLE_PARTAGEE = 7  # identifiant d'une table pré-entraînée (tables_partagees.serialiser_identifiant)
+
+
+def ecrire_varint(valeur, sortie):
+    """Ajoute un entier non négatif en varint (7 bits par octet) à un bytearray."""
+    valeur = int(valeur)
+    while valeur >= 0x80:
+        sortie.append((valeur & 0x7F) | 0x80)
+        valeur >>= 7
+    sortie.append(valeur)
+
+
+def lire_varint(donnees, position):
+    """Lit un varint à partir de position. Retourne (valeur, nouvelle position)."""
+    valeur = 0
+    decalage = 0
+    while True:
+        octet = donnees[position]
+        position += 1
+        valeur |= (octet & 0x7F) << decalage
+        if octet < 0x80:
+            return valeur, position
+        decalage += 7
+
+
+class EcrivainHuf:
+    """
+    Écrit un fichier .huf en continu: les sections d'en-tête à l'ouverture,
+    puis chaque bloc dès qu'il est prêt, et l'index à la fermeture.
+
+    Utilisation:
+        with EcrivainHuf(chemin, {SECTION_ENTETE: entete}) as ecrivain:
+            ecrivain.ecrire_bloc(flux, nb_bits, nb_symboles)
+    """
+
+    def __init__(self, chemin, sections):
+        self.chemin = chemin
+        self.index = []
+        self._fichier = open(chemin, 'wb')
+
+        entete = bytearray(MAGIE)
+        entete.append(VERSION)
+        for type_section, contenu in sections.items():
+            entete.append(type_section)
+            ecrire_varint(len(contenu), entete)
+            entete += contenu
+        entete.append(SECTION_FIN)
+        self._fichier.write(entete)
+
+        self.taille_entete = len(entete)
+        self.taille_blocs = 0
+
+    def ecrire_bloc(self, flux, nb_bits, nb_symboles):
+        """
+        Ajoute un bloc compressé au fichier.
+
+        Args:
+            flux: Octets du bloc (bytes ou np.ndarray de np.uint8)
+            nb_bits: Nombre de bits utiles dans le bloc
+            nb_symboles: Nombre de symboles encodés dans le bloc
+        """
+        donnees = memoryview(flux).cast('B')
+        self.index.append((self.taille_blocs, int(nb_bits), int(nb_symboles)))
+        self._fichier.write(donnees)
+        self.taille_blocs += len(donnees)
+
+    def fermer(self):
+        """Écrit l'index et le pied, puis ferme le fichier. Retourne la taille totale."""
+        if self._fichier.closed:
+            return self.taille_totale
+        index = bytearray()
+        ecrire_varint(len(self.index), index)
+        for position, nb_bits, nb_symboles in self.index:
+            ecrire_varint(position, index)
+            ecrire_varint(nb_bits, index)
+            ecrire_varint(nb_symboles, index)
+        index += struct.pack('<Q', self.taille_entete + self.taille_blocs)
+        index += MAGIE_INDEX
+        self._fichier.write(index)
+        self._fichier.close()
+        self.taille_totale = self.taille_entete + self.taille_blocs + len(index)
+        return self.taille_totale
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
+
+
+class LecteurHuf:
+    """
+    Lit un fichier .huf projeté en mémoire (mmap).
+
+    Attributs:
+        sections: dict {type de section: contenu (bytes)}
+        index: liste de (position, nb_bits, nb_symboles) pour chaque bloc
+    """
+
+    def __init__(self, chemin):
+        self.chemin = chemin
+        with open(chemin, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            self._lire_structure()
+        except Exception:
+            self._mmap.close()
+            raise
+
+    def _lire_structure(self):
+        donnees = self._mmap
+        if donnees[:3] != MAGIE or donnees[-4:] != MAGIE_INDEX:
+            raise ValueError(f"Fichier .huf invalide: {self.chemin}")
+        self.version = donnees[3]
+        if self.version > VERSION:
+            raise ValueError(f"Version .huf non supportée: {self.version}")
+
+        self.sections = {}
+        position = 4
+        while donnees[position] != SECTION_FIN:
+            type_section = donnees[position]
+            taille, position = lire_varint(donnees, position + 1)
+            self.sections[type_section] = donnees[position:position + taille]
+            position += taille
+        self.debut_blocs = position + 1
+
+        position_index = struct.unpack('<Q', donnees[-12:-4])[0]
+        nb_blocs, position = lire_varint(donnees, position_index)
+        self.index = []
+        for _ in range(nb_blocs):
+            debut, position = lire_varint(donnees, position)
+            nb_bits, position = lire_varint(donnees, position)
+            nb_symboles, position = lire_varint(donnees, position)
+            self.index.append((debut, nb_bits, nb_symboles))
+        self.fin_blocs = position_index
+
+    def __len__(self):
+        return len(self.index)
+
+    def bloc(self, i):
+        """
+        Retourne (octets du bloc, nb_bits, nb_symboles). Les octets sont une vue
+        (memoryview) sur le fichier projeté: aucune copie n'est faite.
+        """
+        debut, nb_bits, nb_symboles = self.index[i]
+        fin = self.index[i + 1][0] if i + 1 < len(self.index) else self.fin_blocs - self.debut_blocs
+        vue = memoryview(self._mmap)[self.debut_blocs + debut:self.debut_blocs + fin]
+        return vue, nb_bits, nb_symboles
+
+    def fermer(self):
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.fermer()
@@ -1,9 +1,32 @@
 import numpy as np
 import math
-from anytree import Node, RenderTree, PreOrderIter, AsciiStyle
-from PIL import Image
+import time
+from anytree import Node, RenderTree, AsciiStyle
+from PIL import Image, ImageMode
 import pickle
 import os
+import shutil
+import sys
+import tracemalloc
+from collections import deque
+from functools import wraps
+from itertools import chain
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from image_stats import obtenir_stats, _entropie
+from huf_container import (EcrivainHuf, LecteurHuf, SECTION_ENTETE, SECTION_TUILES, SECTION_PREDICTION,
+                           SECTION_PLAGES, SECTION_TUPLES, SECTION_RANS, SECTION_TABLE_PARTAGEE,
+                           ecrire_varint, lire_varint)
+from prediction import TAILLE_TUILE_PREDICTION, transformer, inverser, serialiser_choix, lire_choix, resume_choix
+from rle import LONGUEUR_MOYENNE_MIN, longueur_moyenne_plages, encoder_plages, developper_plages
+from rans import (normaliser_frequences, serialiser_frequences, lire_frequences, encoder_rans,
+                  preparer_decodage_rans, decoder_rans)
+from tables_partagees import TAILLE_IDENTIFIANT, RegistreTables, serialiser_identifiant, lire_identifiant
+
+try:
+    import resource
+except ImportError:  # Windows: pas de pic de RSS
+    resource = None
 
 # Définir le répertoire de sortie relatif à ce fichier
 # Le script est dans src/, donc output est dans le répertoire parent
@@ -13,19 +36,1646 @@ OUTPUT_DIR = os.path.join(os.path.dirname(SCRIPT_DIR), "output")
 # Créer le répertoire output s'il n'existe pas
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Codeurs entropiques disponibles pour les blocs du fichier .huf
+CODEURS = ('huffman', 'rans')
+
+# Taille maximale de l'alphabet étendu (nombre de valeurs présentes ^ taille_tuple) pour le
+# codage par tuples
+ALPHABET_MAX_TUPLES = 1 << 22
+
+# Mémoire de travail de huffman(), en octets par échantillon de l'image (pic mesuré avec
+# tracemalloc, arrondi au-dessus) selon la transformée, plus OCTETS_PAR_SYMBOLE_BLOC par
+# symbole des blocs en cours d'encodage ou de vérification: l'encodeur et le décodeur
+# travaillent par morceaux, seuls les MORCEAU_BLOC premiers symboles d'un bloc comptent.
+# En mode flux, seule la bande courante compte (OCTETS_PAR_ECHANTILLON_BANDE par
+# échantillon de la bande), et un bloc ne dépasse jamais une bande.
+# tracemalloc ne voit pas le tampon de l'image décodée par PIL: il s'ajoute à ces coûts,
+# en mode flux aussi (crop() décode toute l'image).
+OCTETS_PAR_ECHANTILLON = {
+    'image': 10,
+    'prediction': 30,
+    'tuples': 14,
+    'tuiles': 19,
+    'plages': 72,
+}
+OCTETS_PAR_ECHANTILLON_BANDE = 48
+OCTETS_PAR_SYMBOLE_BLOC = 240
+MORCEAU_BLOC = 1 << 16
+
+# Largeur (bits) des fenêtres de la table de décodage: BITS_TABLE au moins, élargie
+# jusqu'à BITS_TABLE_MAX pour contenir deux des codes les plus courts (voir
+# preparer_decodage). Une table de BITS_TABLE_MAX bits coûte jusqu'à ~20 ms à construire.
+BITS_TABLE = 12
+BITS_TABLE_MAX = 16
+
+# Fichiers de débogage écrits par huffman() selon le niveau d'artefacts demandé
+NIVEAUX_ARTEFACTS = {
+    'aucun': (),
+    'resume': ("occurences.txt", "dictionnaire.txt"),
+    'complet': ("occurences.txt", "occurences_triees.txt", "occurences_triees_fusion.txt",
+                "dictionnaire.txt", "arbre_codes.txt", "arbre_symboles.txt"),
+}
+
+def construire_arbre_huffman(counts):
+    """
+    Construit l'arbre de Huffman à partir des occurrences seulement, avec deux files.
+
+    Les feuilles sont triées une fois (np.argsort); les noeuds internes sont créés
+    avec des poids croissants et forment donc une seconde file déjà triée. Chaque
+    fusion prend les deux plus petits en tête des deux files, en O(1): après le tri,
+    la construction est linéaire, ce qui suffit pour des alphabets de 2^16 symboles
+    et plus (paires de pixels). En cas d'égalité, une feuille passe avant un noeud
+    interne et la plus petite feuille (indice) d'abord, comme avec une file de priorité
+    sur (poids, indice).
+
+    Les feuilles sont les indices 0..n-1 (même ordre que counts) et chaque
+    noeud interne reçoit l'indice suivant au moment de sa création; la racine
+    est donc le dernier noeud (2n-2).
+
+    Args:
+        counts: Occurrences de chaque symbole (ex.: sortie de np.unique)
+
+    Returns:
+        tuple: (parents, bits) où parents[i] est l'indice du parent du noeud i
+               (-1 pour la racine) et bits[i] le bit (0 ou 1) de la branche qui y mène
+    """
+    n = len(counts)
+    if n == 0:
+        raise ValueError("Aucun symbole à coder")
+
+    nb_noeuds = max(2 * n - 1, 2)
+    parents = np.full(nb_noeuds, -1, dtype=np.int64)
+    bits = np.zeros(nb_noeuds, dtype=np.uint8)
+
+    if n == 1:
+        # Un seul symbole: on lui donne tout de même un code de 1 bit
+        parents[0] = 1
+        return parents, bits
+
+    # Tri stable: à poids égal, l'indice sert de départage pour un résultat déterministe
+    counts = np.asarray(counts)
+    ordre = np.argsort(counts, kind='stable')
+    feuilles = ordre.tolist()
+    poids_feuilles = counts[ordre].tolist()
+    poids_internes = []
+    parents_l = [-1] * nb_noeuds
+    bits_l = [0] * nb_noeuds
+
+    i = j = 0
+    for prochain in range(n, 2 * n - 1):
+        #Fusion des deux noeuds de poids plus faibles
+        poids = 0
+        for bit in (0, 1):
+            if j == len(poids_internes) or (i < n and poids_feuilles[i] <= poids_internes[j]):
+                noeud, poids_noeud = feuilles[i], poids_feuilles[i]
+                i += 1
+            else:
+                noeud, poids_noeud = n + j, poids_internes[j]
+                j += 1
+            parents_l[noeud] = prochain
+            bits_l[noeud] = bit
+            poids += poids_noeud
+        poids_internes.append(poids)
+
+    parents[:] = parents_l
+    bits[:] = bits_l
+    return parents, bits
+
+
+def _profondeurs(parents):
+    """
+    Profondeur de chaque noeud (nombre d'ancêtres), par sauts de pointeurs vectorisés:
+    après k itérations, chaque noeud connaît son ancêtre à distance 2^k.
+    """
+    racine = len(parents) - 1
+    ancetres = np.where(parents < 0, racine, parents)
+    profondeurs = (parents >= 0).astype(np.int64)
+    while (ancetres != racine).any():
+        profondeurs += profondeurs[ancetres] * (ancetres != racine)
+        ancetres = ancetres[ancetres]
+    return profondeurs
+
+
+def codes_arbre(parents, bits, nbsymboles):
+    """
+    Calcule le code (entier) et sa longueur pour chaque feuille de l'arbre.
+
+    Args:
+        parents, bits: Arbre retourné par construire_arbre_huffman
+        nbsymboles: Nombre de feuilles
+
+    Returns:
+        tuple: (codes, longueurs) en np.ndarray, indexés comme les symboles
+    """
+    nb_noeuds = len(parents)
+    codes = np.zeros(nb_noeuds, dtype=np.uint64)
+    longueurs = np.zeros(nb_noeuds, dtype=np.int64)
+
+    # Un parent a toujours un indice plus grand que ses enfants: on descend depuis la racine
+    parents_l = parents.tolist()
+    bits_l = bits.tolist()
+    codes_l = [0] * nb_noeuds
+    longueurs_l = [0] * nb_noeuds
+    for noeud in range(nb_noeuds - 2, -1, -1):
+        parent = parents_l[noeud]
+        codes_l[noeud] = (codes_l[parent] << 1) | bits_l[noeud]
+        longueurs_l[noeud] = longueurs_l[parent] + 1
+
+    codes[:] = codes_l
+    longueurs[:] = longueurs_l
+    return codes[:nbsymboles], longueurs[:nbsymboles]
+
+
+def longueurs_codes(counts):
+    """
+    Retourne la longueur du code de Huffman de chaque symbole en O(n log n)
+    (tri des occurrences, puis construction et profondeurs en temps linéaire).
+
+    Args:
+        counts: Occurrences de chaque symbole
+
+    Returns:
+        np.ndarray: Longueur (en bits) du code de chaque symbole, dans l'ordre de counts
+    """
+    parents, _ = construire_arbre_huffman(counts)
+    return _profondeurs(parents)[:len(counts)]
+
+
+def longueurs_limitees(counts, longueur_max):
+    """
+    Longueurs d'un code préfixe optimal parmi ceux dont aucun code ne dépasse
+    longueur_max bits (algorithme package-merge de Larmore et Hirschberg).
+
+    Chaque niveau, du plus profond au moins profond, fusionne (tri stable) les
+    feuilles triées et les « paquets » formés par paires consécutives du niveau
+    précédent. Les 2n - 2 premiers éléments du dernier niveau forment la solution;
+    en redescendant, les feuilles retenues à chaque niveau sont toujours les plus
+    légères, et la longueur d'un symbole est le nombre de niveaux où il est retenu.
+    Chaque niveau est vectorisé: O(L n log n) pour L = longueur_max.
+
+    Args:
+        counts: Occurrences de chaque symbole
+        longueur_max: Longueur maximale d'un code, en bits (2^longueur_max >= n)
+
+    Returns:
+        np.ndarray: Longueur (en bits) du code de chaque symbole, dans l'ordre de counts
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    n = len(counts)
+    if n == 0:
+        raise ValueError("Aucun symbole à coder")
+    if n == 1:
+        return np.ones(1, dtype=np.int64)
+    if n > 1 << longueur_max:
+        raise ValueError(f"{n} symboles ne peuvent pas être codés sur {longueur_max} bits au plus")
+
+    ordre = np.argsort(counts, kind='stable')
+    poids_feuilles = counts[ordre]
+
+    # Du niveau le plus profond (feuilles seules) au niveau 1: pour chaque niveau,
+    # on garde seulement quels éléments de la liste triée sont des feuilles
+    niveaux = [np.ones(n, dtype=bool)]
+    poids = poids_feuilles
+    for _ in range(longueur_max - 1):
+        nb_paquets = len(poids) // 2
+        paquets = poids[0:2 * nb_paquets:2] + poids[1:2 * nb_paquets:2]
+        # Les feuilles passent avant les paquets de même poids (tri stable)
+        fusion = np.concatenate((poids_feuilles, paquets))
+        tri = np.argsort(fusion, kind='stable')
+        poids = fusion[tri]
+        niveaux.append(tri < n)
+
+    # Sélection: 2n - 2 éléments au niveau 1; chaque paquet retenu entraîne ses deux
+    # éléments du niveau plus profond
+    longueurs_triees = np.zeros(n, dtype=np.int64)
+    nb_retenus = 2 * n - 2
+    for est_feuille in reversed(niveaux):
+        nb_feuilles = int(est_feuille[:nb_retenus].sum())
+        longueurs_triees[:nb_feuilles] += 1
+        nb_retenus = 2 * (nb_retenus - nb_feuilles)
+
+    longueurs = np.empty(n, dtype=np.int64)
+    longueurs[ordre] = longueurs_triees
+    return longueurs
+
+
+def _longueurs_huffman(counts, longueur_max=None):
+    """Longueurs de Huffman, limitées à longueur_max bits si le code optimal dépasse cette limite."""
+    longueurs = longueurs_codes(counts)
+    if longueur_max is not None and longueurs.max() > longueur_max:
+        longueurs = longueurs_limitees(counts, longueur_max)
+    return longueurs
+
+
+def entrainer_table(histogrammes, longueur_max=None, nb_valeurs=256, lissage=1):
+    """
+    Entraîne une table de longueurs commune à un corpus d'images semblables.
+
+    La table est construite sur l'histogramme cumulé du corpus, auquel chaque valeur
+    0..nb_valeurs-1 ajoute lissage occurrences: une valeur absente du corpus reste
+    codable (avec un code long) par les images qui la contiennent.
+
+    Args:
+        histogrammes: Itérable d'histogrammes (occurrences par valeur de symbole)
+        longueur_max: Longueur maximale des codes (None: sans limite)
+        nb_valeurs: Nombre minimal de valeurs couvertes par la table
+        lissage: Occurrences ajoutées à chaque valeur
+
+    Returns:
+        np.ndarray: Table des longueurs (à ranger avec tables_partagees.RegistreTables)
+    """
+    cumul = np.zeros(nb_valeurs, dtype=np.int64)
+    for histogramme in histogrammes:
+        histogramme = np.asarray(histogramme, dtype=np.int64)
+        if len(histogramme) > len(cumul):
+            cumul = np.pad(cumul, (0, len(histogramme) - len(cumul)))
+        cumul[:len(histogramme)] += histogramme
+    return _longueurs_huffman(cumul + lissage, longueur_max)
+
+
+def _code_str(code, longueur):
+    """Représentation textuelle d'un code ('0101...')."""
+    return format(int(code), f'0{int(longueur)}b')
+
+
+def _fusions(parents, counts):
+    """
+    Liste des fusions effectuées, dans l'ordre: [noeud0, noeud1, poids du nouveau noeud].
+    """
+    n = len(counts)
+    poids = np.zeros(len(parents), dtype=np.int64)
+    poids[:n] = counts
+    enfants = {}
+    for noeud, parent in enumerate(parents.tolist()):
+        if parent >= 0:
+            enfants.setdefault(parent, []).append(noeud)
+
+    fusions = []
+    for parent in sorted(enfants):
+        poids[parent] = poids[enfants[parent]].sum()
+        fusions.append(enfants[parent] + [int(poids[parent])])
+    return fusions
+
+
+def _arbre_symboles(parents, symboles, counts):
+    """
+    Construit l'arbre anytree des symboles, utilisé seulement pour les fichiers de sortie.
+    Les noeuds internes portent le poids de leur sous-arbre.
+    """
+    n = len(symboles)
+    nb_noeuds = len(parents)
+    poids = np.zeros(nb_noeuds, dtype=np.int64)
+    poids[:n] = counts
+    # Les enfants ont toujours un indice plus petit que leur parent
+    for noeud in range(nb_noeuds - 1):
+        poids[parents[noeud]] += poids[noeud]
+
+    noeuds = [Node(symboles[i]) if i < n else Node(int(poids[i])) for i in range(nb_noeuds)]
+    for noeud in range(nb_noeuds - 1):
+        noeuds[noeud].parent = noeuds[parents[noeud]]
+    return noeuds[-1]
+
+
+def _arbre_codes(dictionnaire):
+    """
+    Construit l'arbre anytree des codes (un noeud par préfixe), utilisé seulement pour les fichiers de sortie.
+    """
+    racine = Node('')
+    prefixes = {'': racine}
+    for code in sorted(entry[1] for entry in dictionnaire):
+        for i in range(1, len(code) + 1):
+            if code[:i] not in prefixes:
+                prefixes[code[:i]] = Node(code[:i], parent=prefixes[code[:i - 1]])
+    return racine
+
+
+def codes_canoniques(longueurs):
+    """
+    Assigne les codes de Huffman canoniques à partir des longueurs seulement.
+
+    Les symboles sont triés par (longueur, indice) et reçoivent des codes consécutifs,
+    comme dans DEFLATE. Le décodeur peut donc reconstruire les codes à partir de la
+    seule table des longueurs. Les symboles de longueur 0 (absents) reçoivent le code 0.
+
+    Args:
+        longueurs: Longueur du code de chaque symbole (0 = symbole absent)
+
+    Returns:
+        np.ndarray: Code (entier, bit de poids fort en premier) de chaque symbole
+    """
+    longueurs = np.asarray(longueurs, dtype=np.int64)
+    codes = np.zeros(len(longueurs), dtype=np.uint64)
+    presents = np.flatnonzero(longueurs)
+    if len(presents) == 0:
+        return codes
+
+    ordre = presents[np.argsort(longueurs[presents], kind='stable')]
+    l_tri = longueurs[ordre]
+    l_max = int(l_tri[-1])
+    if l_max > 63:
+        raise ValueError(f"Longueur de code trop grande: {l_max} bits")
+
+    # Le code du k-ième symbole est la somme (inégalité de Kraft) des 2^(l_max - l_j)
+    # des symboles précédents, ramenée à sa propre longueur.
+    poids = np.left_shift(np.uint64(1), (l_max - l_tri).astype(np.uint64))
+    cumul = np.concatenate(([np.uint64(0)], np.cumsum(poids, dtype=np.uint64)[:-1]))
+    codes[ordre] = np.right_shift(cumul, (l_max - l_tri).astype(np.uint64))
+    return codes
+
+
+def serialiser_longueurs(table_longueurs):
+    """
+    Sérialise une table de longueurs de codes (indexée par la valeur du symbole).
+
+    Format: taille de l'alphabet (varint), puis une suite de jetons d'un octet.
+    Le quartet haut est la différence (zigzag) avec la longueur précédente, ou 15
+    suivi d'un octet de longueur absolue. Le quartet bas est la répétition - 1,
+    ou 15 suivi d'un varint (répétition - 16). Les longues plages de symboles
+    absents (longueur 0) coûtent donc quelques octets seulement.
+
+    Args:
+        table_longueurs: Longueur du code pour chaque valeur 0..N-1 (0 = absent)
+
+    Returns:
+        bytes: Table sérialisée
+    """
+    table = np.asarray(table_longueurs, dtype=np.int64)
+    sortie = bytearray()
+    ecrire_varint(len(table), sortie)
+    if len(table) == 0:
+        return bytes(sortie)
+
+    # Détection vectorisée des plages de longueurs identiques
+    debuts = np.concatenate(([0], np.flatnonzero(np.diff(table)) + 1))
+    repetitions = np.diff(np.append(debuts, len(table)))
+
+    precedente = 0
+    for longueur, repetition in zip(table[debuts].tolist(), repetitions.tolist()):
+        delta = longueur - precedente
+        zigzag = (delta << 1) if delta >= 0 else ((-delta << 1) - 1)
+        haut = zigzag if zigzag < 15 else 15
+        bas = repetition - 1 if repetition <= 15 else 15
+        sortie.append((haut << 4) | bas)
+        if haut == 15:
+            sortie.append(longueur)
+        if bas == 15:
+            ecrire_varint(repetition - 16, sortie)
+        precedente = longueur
+
+    return bytes(sortie)
+
+
+def lire_longueurs(donnees, position=0):
+    """
+    Relit une table produite par serialiser_longueurs.
+
+    Returns:
+        tuple: (table des longueurs en np.ndarray, position après la table)
+    """
+    taille, position = lire_varint(donnees, position)
+    table = np.zeros(taille, dtype=np.int64)
+    indice = 0
+    precedente = 0
+    while indice < taille:
+        jeton = donnees[position]
+        position += 1
+        haut, bas = jeton >> 4, jeton & 0x0F
+        if haut == 15:
+            longueur = donnees[position]
+            position += 1
+        else:
+            longueur = precedente + ((haut >> 1) if haut % 2 == 0 else -((haut + 1) >> 1))
+        if bas == 15:
+            repetition, position = lire_varint(donnees, position)
+            repetition += 16
+        else:
+            repetition = bas + 1
+        table[indice:indice + repetition] = longueur
+        indice += repetition
+        precedente = longueur
+    return table, position
+
+
+def encoder_bits(indices, table_codes, table_longueurs, taille_bloc=1 << 18):
+    """
+    Encode une suite de symboles en un flux de bits compacté (bit de poids fort en premier).
+
+    Les codes et longueurs sont pris dans des tables NumPy indexées par symbole.
+    Chaque bloc de symboles est converti en bits d'un seul coup: les codes sont
+    alignés à gauche dans un mot de W bits, déballés avec np.unpackbits, puis on
+    ne garde que les `longueur` premiers bits de chaque mot avant de les recompacter
+    avec np.packbits. Aucune boucle Python par symbole.
+
+    Args:
+        indices: Indices des symboles dans les tables (tableau d'entiers non négatifs)
+        table_codes: Code de chaque symbole (entiers)
+        table_longueurs: Longueur en bits du code de chaque symbole
+        taille_bloc: Nombre de symboles traités à la fois (borne la mémoire temporaire)
+
+    Returns:
+        tuple: (flux compacté en np.ndarray de np.uint8, nombre de bits utiles)
+    """
+    indices = np.asarray(indices).ravel()
+    table_codes = np.asarray(table_codes, dtype=np.uint64)
+    table_longueurs = np.asarray(table_longueurs, dtype=np.int64)
+
+    l_max = int(table_longueurs.max()) if len(table_longueurs) else 0
+    if l_max > 64:
+        raise ValueError(f"Longueur de code trop grande: {l_max} bits")
+    # Plus petit mot qui contient le code le plus long
+    largeur = next(w for w in (8, 16, 32, 64) if w >= l_max)
+    type_mot = np.dtype(f'>u{largeur // 8}')
+
+    # Codes pré-alignés à gauche dans leur mot, pour éviter un décalage par symbole
+    decalages = (largeur - table_longueurs).clip(0, 63).astype(np.uint64)
+    table_alignee = np.left_shift(table_codes, decalages).astype(type_mot)
+    colonnes = np.arange(largeur, dtype=np.uint8)
+
+    morceaux = []
+    reste = np.zeros(0, dtype=np.uint8)
+    nb_bits = 0
+    for debut in range(0, len(indices), taille_bloc):
+        bloc = indices[debut:debut + taille_bloc]
+        longueurs = table_longueurs[bloc]
+        mots = table_alignee[bloc]
+        bits = np.unpackbits(mots.view(np.uint8)).reshape(len(bloc), largeur)
+        bits = bits[colonnes < longueurs[:, None].astype(np.uint8)]
+        nb_bits += len(bits)
+
+        # Les bits qui ne remplissent pas un octet complet passent au bloc suivant
+        if len(reste):
+            bits = np.concatenate((reste, bits))
+        complet = len(bits) - len(bits) % 8
+        morceaux.append(np.packbits(bits[:complet]))
+        reste = bits[complet:]
+
+    if len(reste):
+        morceaux.append(np.packbits(reste))
+    flux = np.concatenate(morceaux) if morceaux else np.zeros(0, dtype=np.uint8)
+    return flux, nb_bits
+
+
+def _table_decodage(table_longueurs, table_codes, bits_table):
+    """
+    Construit la table de décodage à une seule sonde pour les codes d'au plus bits_table bits.
+
+    Chaque entrée (indexée par les bits_table prochains bits du flux) donne le symbole
+    et la longueur de son code. Une longueur 0 signale un code plus long que la table.
+    """
+    presents = np.flatnonzero(table_longueurs)
+    courts = presents[table_longueurs[presents] <= bits_table]
+    longueurs = table_longueurs[courts]
+    etendues = np.left_shift(1, bits_table - longueurs)
+    debuts = np.left_shift(table_codes[courts].astype(np.int64), bits_table - longueurs)
+
+    # Un code de l bits occupe 2^(bits_table - l) entrées consécutives
+    total = int(etendues.sum())
+    premiers = np.repeat(np.cumsum(etendues) - etendues, etendues)
+    entrees = np.repeat(debuts, etendues) + (np.arange(total) - premiers)
+
+    table_symboles = np.zeros(1 << bits_table, dtype=np.int64)
+    table_long = np.zeros(1 << bits_table, dtype=np.uint8)
+    table_symboles[entrees] = np.repeat(courts, etendues)
+    table_long[entrees] = np.repeat(longueurs, etendues)
+    return table_symboles, table_long
+
+
+def _table_multi(table_symboles, table_long, bits_table):
+    """
+    Table de décodage à plusieurs symboles: pour chaque fenêtre de bits_table bits, tous
+    les codes qu'elle contient en entier, décodés à la suite.
+
+    Returns:
+        tuple: (table_nb, table_bits, table_multi): nombre de symboles de chaque fenêtre
+               (0 si son premier code est plus long que la table), bits consommés, et
+               symboles (fenêtres x plus grand nombre de symboles par fenêtre)
+    """
+    taille = 1 << bits_table
+    fenetres = np.arange(taille, dtype=np.int64)
+    consommes = np.zeros(taille, dtype=np.int64)
+    table_nb = np.zeros(taille, dtype=np.uint8)
+    colonnes = []
+    actifs = np.ones(taille, dtype=bool)
+    while True:
+        # Bits restants de la fenêtre en tête, complétés de zéros: la table donne le bon
+        # code tant qu'il tient dans les bits connus
+        suite = (fenetres << consommes) & (taille - 1)
+        longueurs = table_long[suite].astype(np.int64)
+        entiers = actifs & (longueurs > 0) & (consommes + longueurs <= bits_table)
+        if not entiers.any():
+            break
+        colonnes.append(np.where(entiers, table_symboles[suite], 0))
+        consommes += np.where(entiers, longueurs, 0)
+        table_nb += entiers
+        actifs = entiers
+    type_symboles = np.min_scalar_type(int(table_symboles.max()))
+    table_multi = (np.stack(colonnes, axis=1) if colonnes else np.zeros((taille, 1))).astype(type_symboles)
+    return table_nb, consommes.astype(np.uint8), table_multi
+
+
+def _fenetres(octets, nb_octets, largeur):
+    """
+    Retourne, pour chaque position de bit des nb_octets premiers octets, les `largeur`
+    bits suivants du flux (largeur <= 25). Calculé par décalage pour chacune des 8
+    positions de bit possibles dans un octet, puis entrelacé.
+    """
+    mots = ((octets[:nb_octets].astype(np.uint32) << 24)
+            | (octets[1:nb_octets + 1].astype(np.uint32) << 16)
+            | (octets[2:nb_octets + 2].astype(np.uint32) << 8)
+            | octets[3:nb_octets + 3].astype(np.uint32))
+    masque = np.uint32((1 << largeur) - 1)
+    fenetres = np.empty((nb_octets, 8), dtype=np.uint32)
+    for decalage in range(8):
+        fenetres[:, decalage] = (mots >> np.uint32(32 - largeur - decalage)) & masque
+    return fenetres.ravel()
+
+
+def _fenetres_longues(octets, positions, largeur):
+    """Les `largeur` bits (<= 57) qui suivent chacune des positions données."""
+    mots = np.zeros(len(positions), dtype=np.uint64)
+    premiers = positions >> 3
+    for i in range(8):
+        mots = (mots << np.uint64(8)) | octets[premiers + i].astype(np.uint64)
+    decalages = (64 - largeur - (positions & 7)).astype(np.uint64)
+    return (mots >> decalages) & np.uint64((1 << largeur) - 1)
+
+
+def preparer_decodage(table_longueurs, bits_table=None):
+    """
+    Prépare les tables de décodage d'une table de longueurs canonique.
+    Le résultat peut être réutilisé pour décoder plusieurs blocs avec huffman_decode.
+
+    Args:
+        table_longueurs: Longueur du code pour chaque valeur de symbole
+        bits_table: Nombre de bits lus par sonde de table (par défaut, de quoi lire deux
+                    des codes les plus courts en une sonde, entre BITS_TABLE et BITS_TABLE_MAX)
+
+    Returns:
+        dict: Tables de décodage
+    """
+    table_longueurs = np.asarray(table_longueurs, dtype=np.int64)
+    table_codes = codes_canoniques(table_longueurs)
+    l_max = int(table_longueurs.max())
+    if l_max > 57:
+        raise ValueError(f"Longueur de code trop grande pour le décodeur: {l_max} bits")
+    if bits_table is None:
+        l_min = int(table_longueurs[table_longueurs > 0].min())
+        bits_table = min(max(BITS_TABLE, 2 * l_min), BITS_TABLE_MAX)
+    # La fenêtre n'est pas limitée à l_max: avec des codes courts, elle en contient plusieurs
+    bits_table = max(1, min(bits_table, 25))
+    table_symboles, table_long = _table_decodage(table_longueurs, table_codes, bits_table)
+    table_nb, table_bits, table_multi = _table_multi(table_symboles, table_long, bits_table)
+
+    # Forme canonique des codes longs: codes consécutifs par longueur
+    presents = np.flatnonzero(table_longueurs > bits_table)
+    longs = presents[np.argsort(table_longueurs[presents], kind='stable')]
+    return {
+        'bits_table': bits_table,
+        'table_nb': table_nb,
+        'table_bits': table_bits,
+        'table_multi': table_multi,
+        'table_codes': table_codes,
+        'longs': longs,
+        'longueurs_longs': table_longueurs[longs],
+    }
+
+
+def huffman_decode(flux, nb_symboles, table_longueurs, bits_table=None, taille_bloc=1 << 16, decodeur=None):
+    """
+    Décode un flux produit par encoder_bits avec des codes canoniques.
+
+    Le décodage est piloté par une table: pour chaque position de bit, les bits_table
+    bits suivants donnent directement tous les codes qu'ils contiennent en entier
+    (symboles et bits consommés, calculé en bloc avec NumPy). Les codes plus longs que
+    la table sont résolus en une passe vectorisée avec la forme canonique (premier code
+    de chaque longueur). Il ne reste en Python qu'un parcours de la chaîne des positions
+    de sonde, une par fenêtre décodée et non une par symbole: avec des codes courts
+    (images binaires, synthétiques), chaque pas décode plusieurs symboles.
+
+    Le flux n'est jamais copié en entier: seuls taille_bloc octets à la fois le sont,
+    ce qui permet de décoder directement une vue sur un fichier projeté en mémoire.
+
+    Args:
+        flux: Octets du flux (bytes, memoryview ou np.ndarray de np.uint8)
+        nb_symboles: Nombre de symboles à décoder
+        table_longueurs: Longueur du code pour chaque valeur de symbole
+        bits_table: Nombre de bits lus par sonde de table (voir preparer_decodage)
+        taille_bloc: Nombre d'octets du flux traités à la fois
+        decodeur: Tables déjà préparées par preparer_decodage (optionnel)
+
+    Returns:
+        np.ndarray: Valeurs des symboles décodés
+    """
+    if decodeur is None:
+        decodeur = preparer_decodage(table_longueurs, bits_table)
+    bits_table = decodeur['bits_table']
+    table_nb = decodeur['table_nb']
+    table_bits = decodeur['table_bits']
+    table_multi = decodeur['table_multi']
+    table_codes = decodeur['table_codes']
+    longs = decodeur['longs']
+    longueurs_longs = decodeur['longueurs_longs']
+    colonnes = np.arange(table_multi.shape[1])
+
+    flux = np.frombuffer(flux, dtype=np.uint8)
+    nb_octets = len(flux)
+
+    resultat = np.empty(nb_symboles, dtype=np.int64)
+    nb_decodes = 0
+    position = 0
+    while nb_decodes < nb_symboles and position < nb_octets * 8:
+        debut = position >> 3
+        fin = min(debut + taille_bloc, nb_octets)
+        # Copie du morceau seulement, avec rembourrage pour lire une fenêtre complète à la fin
+        octets = np.zeros(fin - debut + 8, dtype=np.uint8)
+        morceau = flux[debut:fin + 8]
+        octets[:len(morceau)] = morceau
+
+        fenetres = _fenetres(octets, fin - debut, bits_table)
+        pas = table_bits[fenetres]
+
+        # Premier code plus long que la table: un seul symbole à cette position
+        a_resoudre = np.flatnonzero(pas == 0)
+        symboles_longs = np.zeros(len(a_resoudre), dtype=np.int64)
+        if len(a_resoudre):
+            l_max = int(longueurs_longs[-1])
+            valeurs = _fenetres_longues(octets, a_resoudre, l_max)
+            longueurs = np.zeros(len(a_resoudre), dtype=np.uint8)
+            for longueur in np.unique(longueurs_longs).tolist():
+                candidats = longs[longueurs_longs == longueur]
+                premier = int(table_codes[candidats[0]])
+                rang = (valeurs >> np.uint64(l_max - longueur)).astype(np.int64) - premier
+                trouves = (longueurs == 0) & (rang >= 0) & (rang < len(candidats))
+                longueurs[trouves] = longueur
+                symboles_longs[trouves] = candidats[rang[trouves]]
+            # Bits invalides (après la fin du flux): avancer d'un bit plutôt que boucler
+            pas[a_resoudre] = np.maximum(longueurs, 1)
+
+        # Parcours de la chaîne: chaque sonde commence là où la précédente se termine
+        pas_octets = pas.tobytes()
+        p = position - debut * 8
+        limite = len(pas_octets)
+        sondes = []
+        ajouter = sondes.append
+        while p < limite:
+            ajouter(p)
+            p += pas_octets[p]
+
+        # Symboles de chaque sonde, dans l'ordre
+        sondes = np.array(sondes, dtype=np.int64)
+        fenetres_sondes = fenetres[sondes]
+        nb_par_sonde = table_nb[fenetres_sondes].astype(np.int64)
+        symboles = table_multi[fenetres_sondes]
+        sondes_longues = np.flatnonzero(nb_par_sonde == 0)
+        if len(sondes_longues):
+            symboles[sondes_longues, 0] = symboles_longs[np.searchsorted(a_resoudre, sondes[sondes_longues])]
+            nb_par_sonde[sondes_longues] = 1
+        decodes = symboles[colonnes < nb_par_sonde[:, np.newaxis]][:nb_symboles - nb_decodes]
+        resultat[nb_decodes:nb_decodes + len(decodes)] = decodes
+        nb_decodes += len(decodes)
+        position = p + debut * 8
+
+    if nb_decodes < nb_symboles:
+        raise ValueError(f"Flux tronqué: {nb_decodes} symboles décodés sur {nb_symboles}")
+    return resultat
+
+
+def serialiser_entete(image_metadata, nb_echantillons, table_longueurs):
+    """
+    Sérialise tout ce dont le décodeur a besoin: métadonnées de l'image,
+    nombre d'échantillons et table des longueurs des codes canoniques.
+
+    Args:
+        image_metadata: dict avec 'size' (largeur, hauteur) et 'mode'
+        nb_echantillons: Nombre de symboles encodés
+        table_longueurs: Longueur du code pour chaque valeur de symbole
+
+    Returns:
+        bytes: En-tête compact
+    """
+    sortie = bytearray()
+    mode = image_metadata['mode'].encode('ascii')
+    sortie.append(len(mode))
+    sortie += mode
+    largeur, hauteur = image_metadata['size']
+    ecrire_varint(largeur, sortie)
+    ecrire_varint(hauteur, sortie)
+    ecrire_varint(nb_echantillons, sortie)
+    sortie += serialiser_longueurs(table_longueurs)
+    return bytes(sortie)
+
+
+def lire_entete(donnees, position=0):
+    """
+    Relit un en-tête produit par serialiser_entete.
+
+    Returns:
+        tuple: (image_metadata, nb_echantillons, table_longueurs, position après l'en-tête)
+    """
+    taille_mode = donnees[position]
+    mode = bytes(donnees[position + 1:position + 1 + taille_mode]).decode('ascii')
+    position += 1 + taille_mode
+    largeur, position = lire_varint(donnees, position)
+    hauteur, position = lire_varint(donnees, position)
+    nb_echantillons, position = lire_varint(donnees, position)
+    table_longueurs, position = lire_longueurs(donnees, position)
+    image_metadata = {'size': (largeur, hauteur), 'mode': mode}
+    return image_metadata, nb_echantillons, table_longueurs, position
+
+
+def _rectangles_tuiles(hauteur, largeur, taille_tuile):
+    """Rectangles (y0, y1, x0, x1) des tuiles carrées de l'image, en ordre de balayage."""
+    for y in range(0, hauteur, taille_tuile):
+        for x in range(0, largeur, taille_tuile):
+            yield y, min(y + taille_tuile, hauteur), x, min(x + taille_tuile, largeur)
+
+
+def _tuiles(pixels, taille_tuile):
+    """Génère les pixels de chaque tuile, aplatis en 1D, en ordre de balayage."""
+    for y0, y1, x0, x1 in _rectangles_tuiles(pixels.shape[0], pixels.shape[1], taille_tuile):
+        yield _aplatir(pixels[y0:y1, x0:x1])
+
+
+def histogrammes_tuiles(pixels, taille_tuile, nb_valeurs):
+    """
+    Histogrammes de toutes les tuiles, calculés en une seule passe vectorisée:
+    chaque échantillon reçoit la clé (numéro de tuile * nb_valeurs + valeur),
+    et un seul np.bincount compte toutes les clés.
+
+    Args:
+        pixels: Pixels de l'image (hauteur x largeur, ou hauteur x largeur x canaux)
+        taille_tuile: Côté des tuiles, en pixels
+        nb_valeurs: Nombre de valeurs possibles des échantillons (valeur maximale + 1)
+
+    Returns:
+        np.ndarray: Occurrences (nb_tuiles x nb_valeurs), tuiles en ordre de balayage
+    """
+    hauteur, largeur = pixels.shape[:2]
+    nb_x = -(-largeur // taille_tuile)
+    nb_y = -(-hauteur // taille_tuile)
+    numeros = (np.arange(hauteur) // taille_tuile)[:, None] * nb_x + (np.arange(largeur) // taille_tuile)[None, :]
+    if pixels.ndim == 3:
+        numeros = np.broadcast_to(numeros[:, :, None], pixels.shape)
+
+    cles = numeros.reshape(-1) * nb_valeurs + _aplatir(pixels)
+    return np.bincount(cles, minlength=nb_y * nb_x * nb_valeurs).reshape(nb_y * nb_x, nb_valeurs)
+
+
+def choisir_tables_tuiles(histogrammes, table_longueurs, longueur_max=None):
+    """
+    Choisit, pour chaque tuile, entre la table globale et une table locale.
+
+    Le coût de la table globale est exact (occurrences x longueurs globales). Le coût
+    d'une table locale est celui du message plus la taille de la table sérialisée.
+    L'entropie de la tuile est une borne inférieure du message local: les tuiles pour
+    lesquelles le gain possible ne paie même pas un en-tête minimal gardent la table
+    globale sans construire d'arbre.
+
+    Args:
+        histogrammes: Occurrences par tuile (voir histogrammes_tuiles)
+        table_longueurs: Table des longueurs globale
+        longueur_max: Longueur maximale des codes des tables locales (None: sans limite)
+
+    Returns:
+        tuple: (masque des tuiles à table locale (np.ndarray de bool),
+                liste des tables locales, dans l'ordre des tuiles)
+    """
+    nb_valeurs = histogrammes.shape[1]
+    longueurs_globales = np.zeros(nb_valeurs, dtype=np.int64)
+    longueurs_globales[:min(nb_valeurs, len(table_longueurs))] = table_longueurs[:nb_valeurs]
+    couts_globaux = histogrammes @ longueurs_globales
+
+    totaux = histogrammes.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        termes = histogrammes * np.log2(histogrammes / np.maximum(totaux, 1))
+    bornes_locales = -np.nansum(termes, axis=1)
+    # Une table locale coûte au moins 2 octets (taille de l'alphabet + un jeton)
+    candidats = np.flatnonzero(couts_globaux - bornes_locales > 16)
+
+    locales = np.zeros(len(histogrammes), dtype=bool)
+    tables = []
+    for tuile in candidats:
+        symboles = np.flatnonzero(histogrammes[tuile])
+        occurrences = histogrammes[tuile, symboles]
+        table = np.zeros(int(symboles[-1]) + 1, dtype=np.int64)
+        table[symboles] = _longueurs_huffman(occurrences, longueur_max)
+        cout_local = int(occurrences @ table[symboles]) + 8 * len(serialiser_longueurs(table))
+        if cout_local < couts_globaux[tuile]:
+            locales[tuile] = True
+            tables.append(table)
+    return locales, tables
+
+
+def serialiser_tuiles(taille_tuile, locales, tables_locales):
+    """
+    Sérialise le choix de table de chaque tuile.
+
+    Format: côté des tuiles (varint), nombre de tuiles (varint), un bit par tuile
+    (1 = table locale, np.packbits), puis les tables locales (serialiser_longueurs)
+    dans l'ordre des tuiles qui les utilisent.
+
+    Returns:
+        bytes: Section SECTION_TUILES
+    """
+    sortie = bytearray()
+    ecrire_varint(taille_tuile, sortie)
+    ecrire_varint(len(locales), sortie)
+    sortie += np.packbits(locales).tobytes()
+    for table in tables_locales:
+        sortie += serialiser_longueurs(table)
+    return bytes(sortie)
+
+
+def lire_tuiles(donnees, position=0):
+    """
+    Relit une section produite par serialiser_tuiles.
+
+    Returns:
+        tuple: (taille_tuile, masque des tuiles à table locale, liste des tables locales)
+    """
+    taille_tuile, position = lire_varint(donnees, position)
+    nb_tuiles, position = lire_varint(donnees, position)
+    taille_masque = (nb_tuiles + 7) // 8
+    masque = np.frombuffer(bytes(donnees[position:position + taille_masque]), dtype=np.uint8)
+    locales = np.unpackbits(masque, count=nb_tuiles).astype(bool)
+    position += taille_masque
+
+    tables = []
+    for _ in range(int(locales.sum())):
+        table, position = lire_longueurs(donnees, position)
+        tables.append(table)
+    return taille_tuile, locales, tables
+
+
+def _cout_huffman(symboles):
+    """Nombre de bits du message si les symboles sont codés avec leur propre code de Huffman."""
+    comptes = np.bincount(symboles)
+    comptes = comptes[comptes > 0]
+    return int(comptes @ longueurs_codes(comptes))
+
+
+def choisir_plages(echantillons, histogramme, forcer=False, longueur_max=None):
+    """
+    Décide si le codage par plages (module rle) est plus avantageux que le codage direct.
+
+    La longueur moyenne des plages sert de préfiltre; ensuite on compare la taille exacte
+    des messages de Huffman (sans les tables): échantillons d'un côté, longueurs
+    (et valeurs) des plages de l'autre.
+
+    Args:
+        echantillons: Échantillons aplatis en 1D (entiers non négatifs)
+        histogramme: Occurrences de chaque valeur d'échantillon
+        forcer: Si True, retourne les plages sans comparer les coûts
+        longueur_max: Longueur maximale des codes: les plages sont écartées si leurs
+                      alphabets ne peuvent pas être codés dans cette limite
+
+    Returns:
+        dict: Plages retournées par rle.encoder_plages, ou None pour le codage direct
+    """
+    if not forcer and longueur_moyenne_plages(echantillons) < LONGUEUR_MOYENNE_MIN:
+        return None
+    plages = encoder_plages(echantillons)
+    if forcer:
+        return plages
+    if longueur_max is not None:
+        for symboles in (plages['longueurs'], plages['valeurs']):
+            if symboles is not None and np.count_nonzero(np.bincount(symboles)) > 1 << longueur_max:
+                return None
+
+    comptes = histogramme[histogramme > 0]
+    cout_direct = int(comptes @ longueurs_codes(comptes))
+    cout_plages = _cout_huffman(plages['longueurs'])
+    if plages['valeurs'] is not None:
+        cout_plages += _cout_huffman(plages['valeurs'])
+    return plages if cout_plages < cout_direct else None
+
+
+def serialiser_plages(plages, table_valeurs=None):
+    """
+    Sérialise la description du codage par plages.
+
+    Format: nombre de plages (varint), puis 1 suivi des deux valeurs alternées (varints),
+    ou 0 suivi de la table des longueurs des codes des valeurs (serialiser_longueurs).
+
+    Returns:
+        bytes: Section SECTION_PLAGES
+    """
+    sortie = bytearray()
+    ecrire_varint(len(plages['longueurs']), sortie)
+    if plages['valeurs_alternees'] is not None:
+        sortie.append(1)
+        for valeur in plages['valeurs_alternees']:
+            ecrire_varint(valeur, sortie)
+    else:
+        sortie.append(0)
+        sortie += serialiser_longueurs(table_valeurs)
+    return bytes(sortie)
+
+
+def lire_plages(donnees, position=0):
+    """
+    Relit une section produite par serialiser_plages.
+
+    Returns:
+        tuple: (nb_plages, valeurs alternées (v0, v1) ou None, table des valeurs ou None)
+    """
+    nb_plages, position = lire_varint(donnees, position)
+    if donnees[position] == 1:
+        v0, position = lire_varint(donnees, position + 1)
+        v1, position = lire_varint(donnees, position)
+        return nb_plages, (v0, v1), None
+    table_valeurs, _ = lire_longueurs(donnees, position + 1)
+    return nb_plages, None, table_valeurs
+
+
+def former_tuples(echantillons, valeurs, taille_tuple):
+    """
+    Regroupe chaque suite de taille_tuple échantillons consécutifs en un seul symbole
+    (alphabet étendu). Chaque échantillon est d'abord remplacé par son rang r parmi les
+    valeurs présentes: avec base = len(valeurs), le tuple (r0, ..., rk-1) devient
+    r0 * base^(k-1) + ... + rk-1. Une image de 4 valeurs distinctes a ainsi 4^k symboles
+    possibles, quelle que soit sa plus grande valeur. La fin est complétée par des zéros
+    (le décodeur tronque à nb_echantillons).
+
+    Args:
+        echantillons: Échantillons aplatis en 1D
+        valeurs: Valeurs présentes dans les échantillons, triées
+        taille_tuple: Nombre d'échantillons par symbole
+
+    Returns:
+        np.ndarray: Symboles étendus (int64)
+    """
+    base = len(valeurs)
+    if base ** taille_tuple > ALPHABET_MAX_TUPLES:
+        raise ValueError(f"Alphabet étendu trop grand: {base}^{taille_tuple} symboles "
+                         f"(maximum {ALPHABET_MAX_TUPLES})")
+    nb_tuples = -(-len(echantillons) // taille_tuple)
+    complets = np.zeros(nb_tuples * taille_tuple, dtype=np.int64)
+    complets[:len(echantillons)] = np.searchsorted(valeurs, echantillons)
+    puissances = base ** np.arange(taille_tuple - 1, -1, -1, dtype=np.int64)
+    return complets.reshape(nb_tuples, taille_tuple) @ puissances
+
+
+def developper_tuples(symboles, valeurs, taille_tuple):
+    """Inverse de former_tuples (sans la troncature): échantillons de chaque symbole étendu."""
+    base = len(valeurs)
+    puissances = base ** np.arange(taille_tuple - 1, -1, -1, dtype=np.int64)
+    return valeurs[(symboles[:, None] // puissances % base).reshape(-1)]
+
+
+def serialiser_tuples(taille_tuple, valeurs):
+    """
+    Sérialise la section SECTION_TUPLES: taille des tuples, nombre de valeurs présentes,
+    puis chaque valeur (écart avec la précédente), en varints.
+    """
+    sortie = bytearray()
+    ecrire_varint(taille_tuple, sortie)
+    ecrire_varint(len(valeurs), sortie)
+    precedente = 0
+    for valeur in valeurs.tolist():
+        ecrire_varint(valeur - precedente, sortie)
+        precedente = valeur
+    return bytes(sortie)
+
+
+def lire_tuples(donnees, position=0):
+    """Relit une section produite par serialiser_tuples. Retourne (taille_tuple, valeurs)."""
+    taille_tuple, position = lire_varint(donnees, position)
+    nb_valeurs, position = lire_varint(donnees, position)
+    valeurs = np.zeros(nb_valeurs, dtype=np.int64)
+    precedente = 0
+    for i in range(nb_valeurs):
+        ecart, position = lire_varint(donnees, position)
+        precedente += ecart
+        valeurs[i] = precedente
+    return taille_tuple, valeurs
+
+
+def _reconstruire_image(symboles, image_metadata):
+    """
+    Reconstruit l'image PIL à partir des valeurs des échantillons décodés.
+    """
+    largeur, hauteur = image_metadata['size']
+    mode = image_metadata['mode']
+    if mode == '1':
+        return Image.fromarray(symboles.astype(bool).reshape(hauteur, largeur))
+
+    # Même type que np.array(img) à l'encodage (ex.: uint8, uint16 pour 'I;16')
+    type_pixels = np.array(Image.new(mode, (1, 1))).dtype
+    return Image.frombytes(mode, (largeur, hauteur), symboles.astype(type_pixels).tobytes())
+
+
+def _map_ordonne(fonction, elements, threads=1, initialisation=None):
+    """
+    Comme map(fonction, elements), mais exécuté par un pool de threads.
+
+    Les résultats sont produits dans l'ordre des éléments, et au plus 2 * threads
+    éléments sont en cours à la fois pour garder la mémoire bornée. Les noyaux NumPy
+    utilisés par l'encodeur et le décodeur libèrent le GIL sur les gros tableaux.
+
+    Avec initialisation = (initialiseur, arguments), le pool est un pool de processus:
+    initialiseur(*arguments) est appelé une fois dans chaque processus, et fonction doit
+    être une fonction du module (transmise par pickle, comme les éléments et résultats).
+    """
+    if threads <= 1:
+        if initialisation is not None:
+            initialiseur, arguments = initialisation
+            initialiseur(*arguments)
+        yield from map(fonction, elements)
+        return
+
+    if initialisation is None:
+        executeur = ThreadPoolExecutor(max_workers=threads)
+    else:
+        initialiseur, arguments = initialisation
+        executeur = ProcessPoolExecutor(max_workers=threads, initializer=initialiseur, initargs=arguments)
+    with executeur:
+        en_cours = deque()
+        for element in elements:
+            en_cours.append(executeur.submit(fonction, element))
+            if len(en_cours) >= 2 * threads:
+                yield en_cours.popleft().result()
+        while en_cours:
+            yield en_cours.popleft().result()
+
+
+def _decodeur_blocs(lecteur, registre=None):
+    """
+    Prépare les tables d'un fichier .huf ouvert et renvoie decoder_bloc(i), qui décode
+    les symboles du i-ème bloc (voir iterer_blocs).
+    """
+    _, _, table_longueurs, _ = lire_entete(lecteur.sections[SECTION_ENTETE])
+    if SECTION_TABLE_PARTAGEE in lecteur.sections:
+        registre = registre if registre is not None else RegistreTables()
+        table_longueurs = registre.charger(lire_identifiant(lecteur.sections[SECTION_TABLE_PARTAGEE]))
+    if SECTION_RANS in lecteur.sections:
+        frequences, _ = lire_frequences(lecteur.sections[SECTION_RANS])
+        decodeur = preparer_decodage_rans(frequences)
+    else:
+        decodeur = preparer_decodage(table_longueurs)
+
+    # Table de chaque bloc: 0 pour la table globale, k pour la k-ième table locale
+    # (ou 1 pour la table des valeurs en codage par plages)
+    tables = [table_longueurs]
+    decodeurs = {0: decodeur}
+    numeros_tables = np.zeros(len(lecteur), dtype=np.int64)
+    if SECTION_TUILES in lecteur.sections:
+        _, locales, tables_locales = lire_tuiles(lecteur.sections[SECTION_TUILES])
+        tables += tables_locales
+        numeros_tables = np.where(locales, np.cumsum(locales), 0)
+
+    if SECTION_PLAGES in lecteur.sections:
+        nb_plages, _, table_valeurs = lire_plages(lecteur.sections[SECTION_PLAGES])
+        if table_valeurs is not None:
+            # Les premiers blocs (nb_plages symboles) sont les valeurs des plages
+            tables.append(table_valeurs)
+            decodeurs[1] = preparer_decodage(table_valeurs)
+            symboles_avant = np.cumsum([0] + [nb for _, _, nb in lecteur.index[:-1]])
+            numeros_tables[symboles_avant < nb_plages] = 1
+
+    def decoder_bloc(i):
+        vue, _, nb_symboles = lecteur.bloc(i)
+        numero = numeros_tables[i]
+        if SECTION_RANS in lecteur.sections:
+            symboles = decoder_rans(vue, nb_symboles, decodeur=decodeur)
+        elif numero in decodeurs:
+            symboles = huffman_decode(vue, nb_symboles, tables[numero], decodeur=decodeurs[numero])
+        else:
+            # Une table locale de tuile ne sert qu'à un bloc: pas de décodeur à conserver,
+            # et une table de BITS_TABLE bits se construit vite
+            symboles = huffman_decode(vue, nb_symboles, tables[numero], bits_table=BITS_TABLE)
+        vue.release()
+        return symboles
+
+    return decoder_bloc
+
+
+# decoder_bloc d'un processus du pool de décodage (voir _initialiser_processus)
+_decodeur_processus = None
+
+
+def _initialiser_processus(chemin, registre):
+    """Ouvre le fichier .huf dans un processus du pool: la projection reste ouverte pour la vie du processus."""
+    global _decodeur_processus
+    _decodeur_processus = _decodeur_blocs(LecteurHuf(chemin), registre)
+
+
+def _decoder_bloc_processus(i):
+    return _decodeur_processus(i)
+
+
+def iterer_blocs(chemin, threads=1, registre=None, processus=False):
+    """
+    Décode un fichier .huf bloc par bloc, directement depuis sa projection en mémoire.
+
+    Les blocs sont indépendants (l'index donne la position et le nombre de bits de
+    chacun): ils peuvent donc être décodés en parallèle. Ils utilisent la table globale,
+    sauf en mode par tuiles où un bloc (une tuile) peut avoir sa table locale. En codage
+    par plages, les blocs décodés (longueurs, précédées des valeurs) sont développés;
+    avec un alphabet étendu, chaque symbole redonne ses taille_tuple échantillons.
+    Les blocs codés par rANS (section SECTION_RANS) sont décodés par le module rans.
+
+    Le parcours des fenêtres d'un bloc Huffman garde le GIL (voir huffman_decode): il
+    représente 35 à 50 % du décodage des images de test, ce qui borne le gain des
+    threads à moins de 2x, même sur 4 cœurs. Avec processus=True, les blocs sont décodés
+    par un pool de processus, qui projettent chacun le fichier (les pages sont partagées
+    par le système) et renvoient les symboles décodés. Le démarrage du pool et la
+    préparation des tables dans chaque processus coûtent ~80 ms: il ne se justifie que
+    pour de gros fichiers, sur plusieurs cœurs.
+
+    Args:
+        chemin: Chemin du fichier .huf
+        threads: Nombre de threads (ou de processus) de décodage
+        registre: RegistreTables où chercher la table globale si le fichier ne contient
+                  que son identifiant (par défaut, le registre de REPERTOIRE_TABLES)
+        processus: Décoder dans un pool de processus plutôt que de threads
+
+    Yields:
+        np.ndarray: Valeurs des échantillons de chaque bloc, dans l'ordre
+    """
+    with LecteurHuf(chemin) as lecteur:
+        _, nb_echantillons, _, _ = lire_entete(lecteur.sections[SECTION_ENTETE])
+        plages = lire_plages(lecteur.sections[SECTION_PLAGES]) if SECTION_PLAGES in lecteur.sections else None
+        section_tuples = lecteur.sections.get(SECTION_TUPLES)
+        tuples = lire_tuples(section_tuples) if section_tuples is not None else None
+
+        if processus and threads > 1:
+            blocs = _map_ordonne(_decoder_bloc_processus, range(len(lecteur)), threads,
+                                 (_initialiser_processus, (chemin, registre)))
+        else:
+            blocs = _map_ordonne(_decodeur_blocs(lecteur, registre), range(len(lecteur)), threads)
+        if plages is not None:
+            yield from developper_plages(blocs, plages[0], plages[1])
+        elif tuples is not None:
+            taille_tuple, valeurs = tuples
+            position = 0
+            for bloc in blocs:
+                echantillons = developper_tuples(bloc, valeurs, taille_tuple)[:nb_echantillons - position]
+                position += len(echantillons)
+                yield echantillons
+        else:
+            yield from blocs
+
+
+def decompress(chemin, threads=1, registre=None, processus=False):
+    """
+    Décompresse un fichier .huf produit par huffman() en mode canonique.
+
+    Le fichier est projeté en mémoire et chaque bloc est décodé directement
+    depuis la projection, sans copier le flux complet.
+
+    Args:
+        chemin: Chemin du fichier .huf
+        threads: Nombre de threads de décodage (voir iterer_blocs)
+        registre: RegistreTables des tables partagées (voir iterer_blocs)
+        processus: Décoder dans un pool de processus (voir iterer_blocs)
+
+    Returns:
+        PIL.Image: Image reconstruite
+    """
+    with LecteurHuf(chemin) as lecteur:
+        image_metadata, nb_echantillons, _, _ = lire_entete(lecteur.sections[SECTION_ENTETE])
+        section_tuiles = lecteur.sections.get(SECTION_TUILES)
+        taille_tuile = lire_tuiles(section_tuiles)[0] if section_tuiles is not None else None
+        section_prediction = lecteur.sections.get(SECTION_PREDICTION)
+        choix_prediction = lire_choix(section_prediction) if section_prediction is not None else None
+
+    symboles = np.empty(nb_echantillons, dtype=np.int64)
+    if taille_tuile is None:
+        position = 0
+        for bloc in iterer_blocs(chemin, threads, registre, processus):
+            symboles[position:position + len(bloc)] = bloc
+            position += len(bloc)
+    else:
+        # Mode par tuiles: chaque bloc est une tuile, remise à sa place dans l'image
+        largeur, hauteur = image_metadata['size']
+        pixels = symboles.reshape(hauteur, largeur, -1)
+        rectangles = _rectangles_tuiles(hauteur, largeur, taille_tuile)
+        for (y0, y1, x0, x1), bloc in zip(rectangles, iterer_blocs(chemin, threads, registre, processus)):
+            pixels[y0:y1, x0:x1] = bloc.reshape(y1 - y0, x1 - x0, -1)
+
+    if choix_prediction is not None:
+        # Les symboles décodés sont les résidus: on inverse la prédiction
+        largeur, hauteur = image_metadata['size']
+        symboles = inverser(symboles.reshape(hauteur, largeur, -1), choix_prediction).reshape(-1)
+
+    return _reconstruire_image(symboles, image_metadata)
+
+
+def _verifier_decodage(chemin, bandes, threads=1, registre=None, processus=False):
+    """
+    Vérifie, bloc par bloc, que le fichier .huf redonne exactement les bandes de pixels
+    (ou les tuiles, en mode par tuiles). Les blocs ne chevauchent jamais deux bandes.
+    """
+    blocs = iterer_blocs(chemin, threads, registre, processus)
+    for bande in bandes:
+        position = 0
+        while position < len(bande):
+            bloc = next(blocs, None)
+            if bloc is None or not np.array_equal(bloc, bande[position:position + len(bloc)]):
+                blocs.close()
+                return False
+            position += len(bloc)
+    return next(blocs, None) is None
+
+
+def _taille_brute(img):
+    """Taille en octets de img.tobytes(), calculée sans copier les pixels."""
+    largeur, hauteur = img.size
+    if img.mode == '1':
+        # Les images binaires sont stockées à 1 bit par pixel, lignes alignées sur l'octet
+        return (largeur + 7) // 8 * hauteur
+    taille_echantillon = np.dtype(ImageMode.getmode(img.mode).typestr).itemsize
+    return largeur * hauteur * len(img.getbands()) * taille_echantillon
+
+
+def _aplatir(pixels):
+    """
+    Pixels aplatis en 1D (sans copie). Les pixels booléens (mode '1') sont convertis
+    en uint8 pour pouvoir indexer les tables de codes (une vue ne suffit pas: PIL peut
+    représenter True par 255).
+    """
+    pixels = pixels.reshape(-1)
+    if pixels.dtype == bool:
+        pixels = pixels.astype(np.uint8)
+    return pixels
+
+
+def _bandes(img, hauteur_bande=None):
+    """
+    Génère les pixels de l'image par bandes horizontales, aplaties en 1D.
+    Sans hauteur_bande, une seule bande couvre toute l'image.
+
+    Limite: img.crop charge l'image, et PIL ne sait décoder un PNG qu'en entier. Seule
+    la copie numpy est donc limitée à une bande; l'image décodée (taille_decodee dans
+    estimer_memoire) reste en mémoire pendant toutes les passes.
+    """
+    largeur, hauteur = img.size
+    if hauteur_bande is None or hauteur_bande >= hauteur:
+        hauteur_bande = hauteur
+    for y in range(0, hauteur, hauteur_bande):
+        if hauteur_bande == hauteur:
+            bande = np.array(img)
+        else:
+            bande = np.array(img.crop((0, y, largeur, min(y + hauteur_bande, hauteur))))
+        yield _aplatir(bande)
+
+
+def _blocs(bandes, symboles_par_bloc):
+    """Découpe chaque bande en blocs d'au plus symboles_par_bloc symboles."""
+    for bande in bandes:
+        for debut in range(0, len(bande), symboles_par_bloc):
+            yield bande[debut:debut + symboles_par_bloc]
+
+
+def _compter_symboles(bandes):
+    """
+    Compte les occurrences des symboles sur toutes les bandes.
+
+    Les entiers non négatifs sont comptés avec np.bincount, bande par bande, sans
+    jamais avoir l'image complète en mémoire. Les autres types (flottants, entiers
+    négatifs) nécessitent np.unique sur l'image entière.
+
+    Args:
+        bandes: Fonction retournant un nouvel itérateur sur les bandes
+
+    Returns:
+        tuple: (symboles présents triés, occurrences)
+    """
+    histogramme = np.zeros(0, dtype=np.int64)
+    for bande in bandes():
+        if not np.issubdtype(bande.dtype, np.integer) or (len(bande) and bande.min() < 0):
+            return np.unique(np.concatenate(list(bandes())), return_counts=True)
+        comptes = np.bincount(bande, minlength=len(histogramme))
+        comptes[:len(histogramme)] += histogramme
+        histogramme = comptes
+
+    symboles = np.flatnonzero(histogramme)
+    return symboles, histogramme[symboles]
+
+
+def _ecrire_artefacts(niveau, producteurs):
+    """
+    Écrit les fichiers de débogage du niveau demandé. Chaque producteur n'est
+    appelé (et donc le contenu rendu) que si son fichier fait partie du niveau.
+    """
+    for nom in NIVEAUX_ARTEFACTS[niveau]:
+        with open(os.path.join(OUTPUT_DIR, nom), "w") as f:
+            f.write(producteurs[nom]())
+
+
+class _Chronometre:
+    """
+    Temps passé dans chaque étape de huffman(), mesuré avec time.perf_counter (monotone).
+
+    top(etape) attribue à l'étape le temps écoulé depuis le top précédent: un seul
+    appel d'horloge par frontière d'étape, sans rien dans les boucles. Une étape
+    comptée plusieurs fois cumule ses durées.
+
+    Avec memoire=True (tracemalloc doit tracer les allocations, voir _tracer_memoire),
+    top() relève aussi le pic de mémoire allouée pendant l'étape, puis remet le pic à zéro.
+    """
+
+    def __init__(self, memoire=False):
+        self.durees = {}
+        self.pics_memoire = {} if memoire else None
+        if self.pics_memoire is not None:
+            tracemalloc.reset_peak()
+        self._precedent = time.perf_counter()
+
+    def top(self, etape):
+        maintenant = time.perf_counter()
+        self.durees[etape] = self.durees.get(etape, 0.0) + maintenant - self._precedent
+        if self.pics_memoire is not None:
+            self.pics_memoire[etape] = max(self.pics_memoire.get(etape, 0), tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+        self._precedent = time.perf_counter()
+
+    def resume(self, nb_echantillons):
+        """
+        Durée (s), débit (échantillons par seconde) et, si elle est mesurée, pic de mémoire
+        allouée (octets, 'memoire') de chaque étape, dans l'ordre d'exécution.
+        """
+        etapes = {etape: {'duree': duree, 'debit': nb_echantillons / duree if duree > 0 else float('inf')}
+                  for etape, duree in self.durees.items()}
+        if self.pics_memoire is not None:
+            for etape, pic in self.pics_memoire.items():
+                etapes[etape]['memoire'] = pic
+        return etapes
+
+
+def _lignes_etapes(etapes):
+    """Lignes du tableau des temps par étape (métriques et fichier *_metrics.txt)."""
+    total = sum(mesure['duree'] for mesure in etapes.values())
+    lignes = []
+    for etape, mesure in etapes.items():
+        part = mesure['duree'] / total * 100 if total > 0 else 0
+        ligne = (f"  {etape:<14} {mesure['duree'] * 1000:10.2f} ms  {part:5.1f}%  "
+                 f"{mesure['debit'] / 1e6:10.2f} M éch./s")
+        if 'memoire' in mesure:
+            ligne += f"  pic {mesure['memoire'] / 1e6:9.2f} Mo"
+        lignes.append(ligne)
+    lignes.append(f"  {'total':<14} {total * 1000:10.2f} ms")
+    return lignes
+
+
+def _pic_rss():
+    """Pic de mémoire résidente du processus (octets), ou None si la plateforme ne le donne pas."""
+    if resource is None:
+        return None
+    pic = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux: kio; macOS: octets
+    return pic if sys.platform == 'darwin' else pic * 1024
+
+
+def estimer_memoire(largeur, hauteur, nb_canaux, transformee='image', hauteur_bande=None,
+                    symboles_par_bloc=1 << 20, threads=1, taille_decodee=0):
+    """
+    Estime le pic de mémoire de travail de huffman(), d'après les coûts mesurés
+    OCTETS_PAR_ECHANTILLON (l'estimation est volontairement par excès).
+
+    L'estimation ne couvre pas la mémoire déjà occupée par l'interpréteur et les
+    bibliothèques, les tampons internes du décodeur PNG (zlib) pendant le chargement,
+    ni les pages du fichier .huf projeté en mémoire pendant la vérification (comptées
+    dans la mémoire résidente, mais adossées au fichier et libérables par le système).
+
+    Args:
+        largeur, hauteur, nb_canaux: Dimensions de l'image
+        transformee: Clé de OCTETS_PAR_ECHANTILLON ('image', 'prediction', 'tuples', 'tuiles'
+                     ou 'plages'), ignorée en mode flux
+        hauteur_bande: Hauteur des bandes en mode flux (None: image entière en mémoire)
+        symboles_par_bloc: Nombre de symboles par bloc
+        threads: Nombre de threads (2 * threads blocs en cours au plus, voir _map_ordonne)
+        taille_decodee: Taille de l'image décodée par PIL (_taille_brute), gardée entière
+                        en mémoire même en mode flux
+
+    Returns:
+        int: Mémoire estimée, en octets
+    """
+    nb_echantillons = largeur * hauteur * nb_canaux
+    taille_bande = nb_echantillons if hauteur_bande is None else min(hauteur_bande, hauteur) * largeur * nb_canaux
+    blocs_en_cours = 2 * threads if threads > 1 else 1
+    memoire_blocs = OCTETS_PAR_SYMBOLE_BLOC * min(symboles_par_bloc, taille_bande, MORCEAU_BLOC) * blocs_en_cours
+    if hauteur_bande is None:
+        return taille_decodee + OCTETS_PAR_ECHANTILLON[transformee] * nb_echantillons + memoire_blocs
+    return taille_decodee + OCTETS_PAR_ECHANTILLON_BANDE * taille_bande + memoire_blocs
+
+
+def _tracer_memoire(fonction):
+    """
+    Démarre tracemalloc pour un appel avec mesurer_memoire=True (s'il ne trace pas déjà)
+    et l'arrête à la sortie, même en cas d'erreur.
+    """
+    @wraps(fonction)
+    def enveloppe(*args, mesurer_memoire=False, **kwargs):
+        demarre = mesurer_memoire and not tracemalloc.is_tracing()
+        if demarre:
+            tracemalloc.start()
+        try:
+            return fonction(*args, mesurer_memoire=mesurer_memoire, **kwargs)
+        finally:
+            if demarre:
+                tracemalloc.stop()
+    return enveloppe
+
+
+def _resume_table_partagee(table_partagee, identifiant_partage, surcout):
+    """Description courte du choix entre table partagée et table propre."""
+    if surcout is None:
+        return f"{table_partagee} inutilisable (symboles absents ou codes trop longs), table propre"
+    if identifiant_partage is None:
+        return f"{table_partagee} refusée (surcoût {surcout:,} bits), table propre"
+    return f"{table_partagee} (surcoût {surcout:,} bits)"
+
+
+def _restaurer_du_cache(entree, base_filename, metrics_filepath, chronometre, nb_echantillons):
+    """
+    Recopie dans OUTPUT_DIR le fichier de métriques (et le fichier .huf s'il a été
+    conservé) d'une entrée du cache, et retourne les métriques mises en cache.
+
+    Les temps par étape et les pics de mémoire de l'exécution d'origine sont remplacés
+    par ceux de cet appel (chargement et lecture du cache): les rapporter comme frais
+    fausserait les cumuls de CompressionAnalyzer.print_summary.
+    """
+    shutil.copyfile(entree['metrics_txt'], metrics_filepath)
+
+    metrics = entree['metrics']
+    metrics['fichier_metrics'] = metrics_filepath
+    if entree['flux'] is not None:
+        metrics['fichier_compresse'] = os.path.join(OUTPUT_DIR, f"{base_filename}.huf")
+        shutil.copyfile(entree['flux'], metrics['fichier_compresse'])
+    else:
+        metrics['fichier_compresse'] = None
+    metrics['cache'] = True
+
+    chronometre.top('cache')
+    metrics['etapes'] = chronometre.resume(nb_echantillons)
+    metrics['memoire'] = dict(metrics.get('memoire') or {},
+                              pic_alloue=max(chronometre.pics_memoire.values()) if chronometre.pics_memoire else None,
+                              pic_rss=_pic_rss())
+
+    print(f"Résultat trouvé dans le cache: {base_filename} (ratio {metrics['ratio_compression']:.2f}x)")
+    print(f"Métriques restaurées: {metrics_filepath}")
+    print("")
+    return metrics
+
+
 # Code pris de github.com/gabilodeau/INF8770/Codage Huffman.ipynb et modifié
-def huffman(image_path):
+@_tracer_memoire
+def huffman(image_path, canonique=True, verifier=True, symboles_par_bloc=1 << 20, artefacts='aucun',
+            hauteur_bande=None, threads=1, cache=None, taille_tuile=None, prediction=None, rle=None,
+            taille_tuple=1, longueur_max=None, codeur='huffman', table_partagee=None, registre=None,
+            max_memory=None, mesurer_memoire=False):
     """
     Applique le codage de Huffman à une image PNG.
     
     Args:
         image_path: Chemin vers l'image PNG à compresser
-    
+        canonique: Si True, utilise des codes canoniques et un en-tête ne contenant
+                   que la table des longueurs. Sinon, les codes viennent de l'arbre
+                   et l'en-tête est le dictionnaire sérialisé avec pickle.
+        verifier: Si True (mode canonique), décompresse le fichier produit, vérifie
+                  que l'image est identique et mesure le débit de décodage.
+        symboles_par_bloc: Nombre de symboles par bloc du fichier .huf
+        artefacts: Fichiers de débogage à écrire dans OUTPUT_DIR ('aucun', 'resume' ou 'complet',
+                   voir NIVEAUX_ARTEFACTS)
+        hauteur_bande: Si donné, mode flux: l'image est traitée par bandes de hauteur_bande
+                       lignes, en deux passes (histogramme, puis encodage). Les tableaux de
+                       travail sont alors bornés par la taille d'une bande, mais pas le pic
+                       de mémoire: PIL décode l'image entière au premier crop (voir _bandes),
+                       et la garde jusqu'à la fin.
+        threads: Nombre de threads pour encoder (et vérifier) les blocs du fichier .huf.
+                 Les blocs partagent la même table de codes et restent décodables
+                 indépendamment grâce à l'index du conteneur.
+        cache: CacheResultats optionnel. Si l'image (mêmes pixels, mêmes options) y est
+               déjà, les métriques et le fichier .huf sont repris du cache sans réencoder.
+               Avec artefacts différent de 'aucun', le cache n'est pas consulté (les
+               artefacts demandent l'arbre), mais le résultat y est enregistré.
+        taille_tuile: Si donné (mode canonique), mode adaptatif par tuiles carrées de
+                      taille_tuile pixels: chaque tuile est un bloc, encodé avec sa propre
+                      table si celle-ci (en-tête compris) coûte moins que la table globale.
+                      Incompatible avec hauteur_bande.
+        prediction: Si donné (images 8 bits), code les résidus d'une transformée prédictive
+                    au lieu des pixels: nom d'un prédicteur de prediction.PREDICTEURS pour
+                    toute l'image, ou 'ligne' / 'tuile' pour choisir le meilleur prédicteur
+                    par ligne ou par tuile (de taille_tuile pixels si donné, sinon
+                    TAILLE_TUILE_PREDICTION). Incompatible avec hauteur_bande.
+        rle: Codage par plages (module rle) avant Huffman: None pour le choisir automatiquement
+             quand il réduit le message (mode canonique, sans hauteur_bande ni taille_tuile),
+             True pour le forcer, False pour le désactiver.
+        taille_tuple: Si > 1 (mode canonique), code chaque suite de taille_tuple échantillons
+                      consécutifs comme un seul symbole d'un alphabet étendu (paires pour 2),
+                      ce qui rapproche le débit de l'entropie. Désactive le codage par plages
+                      automatique; incompatible avec hauteur_bande, taille_tuile et rle=True.
+        longueur_max: Si donné (mode canonique), aucun code ne dépasse longueur_max bits
+                      (package-merge, voir longueurs_limitees): avec une limite <= BITS_TABLE,
+                      le décodeur trouve chaque symbole sans passer par les codes longs. Le
+                      surcoût par rapport au code optimal est rapporté dans les métriques.
+        codeur: Codeur entropique des blocs: 'huffman', ou 'rans' (module rans, débit proche
+                de l'entropie, sans plancher de 1 bit par symbole). Avec 'rans', les fichiers
+                produits sont suffixés par _rans; incompatible avec taille_tuile, rle=True
+                et longueur_max.
+        table_partagee: Identifiant d'une table pré-entraînée (entrainer_table) du registre.
+                        Le fichier .huf ne contient alors que l'identifiant, si le surcoût
+                        du message avec la table du corpus (sa divergence de Kullback-Leibler
+                        avec l'image, en bits) est inférieur à la taille d'une table propre;
+                        sinon l'image garde sa propre table. Désactive le codage par plages
+                        automatique; incompatible avec taille_tuile, rle=True, taille_tuple > 1
+                        et le codeur rANS.
+        registre: RegistreTables contenant table_partagee (par défaut, celui de REPERTOIRE_TABLES)
+        max_memory: Budget de mémoire de travail, en octets. La mémoire est estimée avant de
+                    charger les pixels (estimer_memoire), image décodée par PIL comprise:
+                    celle-ci reste entière en mode flux, le budget doit donc au moins la
+                    contenir. Au-delà du budget, le codage par plages automatique est
+                    abandonné, puis l'image est traitée en mode flux avec des bandes (et des
+                    blocs) assez petites, si les options le permettent. Sinon, ValueError
+                    avant toute allocation. Ce que le budget ne couvre pas: voir
+                    estimer_memoire.
+        mesurer_memoire: Si True, trace les allocations avec tracemalloc (ce qui ralentit
+                         nettement l'encodage) et rapporte le pic de mémoire de chaque étape.
+                         Le pic de mémoire résidente du processus est rapporté dans tous les cas.
+
     Returns:
         dict: Métriques de compression incluant taille originale, compressée et ratio de compression
     """
     
-    img = Image.open(image_path)
+    if artefacts not in NIVEAUX_ARTEFACTS:
+        raise ValueError(f"Niveau d'artefacts inconnu: {artefacts} (choix: {', '.join(NIVEAUX_ARTEFACTS)})")
+    if taille_tuile is not None and hauteur_bande is not None:
+        raise ValueError("Le mode par tuiles n'est pas disponible en mode flux (hauteur_bande)")
+    if prediction is not None and hauteur_bande is not None:
+        raise ValueError("La prédiction n'est pas disponible en mode flux (hauteur_bande)")
+    if rle and (hauteur_bande is not None or taille_tuile is not None):
+        raise ValueError("Le codage par plages n'est pas disponible avec hauteur_bande ou taille_tuile")
+    if taille_tuple > 1 and (hauteur_bande is not None or taille_tuile is not None or rle):
+        raise ValueError("Le codage par tuples n'est pas disponible avec hauteur_bande, taille_tuile ou rle")
+    if codeur not in CODEURS:
+        raise ValueError(f"Codeur inconnu: {codeur} (choix: {', '.join(CODEURS)})")
+    if codeur == 'rans' and (not canonique or taille_tuile is not None or rle or longueur_max is not None):
+        raise ValueError("Le codeur rANS demande canonique=True et n'est pas disponible avec taille_tuile, "
+                         "rle ou longueur_max")
+    if table_partagee is not None and (not canonique or taille_tuile is not None or rle or taille_tuple > 1
+                                       or codeur != 'huffman'):
+        raise ValueError("La table partagée demande canonique=True et n'est pas disponible avec taille_tuile, "
+                         "rle, taille_tuple ou le codeur rANS")
+
+    # Table pré-entraînée: chargée avant tout calcul pour échouer tôt si elle est absente
+    longueurs_partagees = None
+    if table_partagee is not None:
+        registre = registre if registre is not None else RegistreTables()
+        longueurs_partagees = registre.charger(table_partagee)
+
+    # Budget mémoire: estimation à partir des dimensions seules, avant de décoder les pixels
+    estimation_memoire = None
+    if max_memory is not None:
+        with Image.open(image_path) as entete_image:
+            largeur, hauteur = entete_image.size
+            nb_canaux = len(entete_image.getbands())
+            taille_decodee = _taille_brute(entete_image)
+
+        def estimer(transformee='image'):
+            return estimer_memoire(largeur, hauteur, nb_canaux, transformee, hauteur_bande,
+                                   symboles_par_bloc, threads, taille_decodee)
+
+        if rle is None and hauteur_bande is None and estimer('plages') > max_memory:
+            print("Budget mémoire: codage par plages automatique désactivé")
+            rle = False
+        transformee = ('prediction' if prediction is not None else 'tuples' if taille_tuple > 1
+                       else 'tuiles' if taille_tuile is not None else 'plages' if rle else 'image')
+        estimation_memoire = estimer(transformee)
+        flux_possible = prediction is None and taille_tuple == 1 and taille_tuile is None and not rle
+        if estimation_memoire > max_memory and flux_possible:
+            # Mode flux: au plus la moitié du budget pour les blocs, le reste (moins l'image
+            # décodée, gardée entière par PIL) pour la bande
+            blocs_en_cours = 2 * threads if threads > 1 else 1
+            symboles_par_bloc = min(symboles_par_bloc, MORCEAU_BLOC)
+            while symboles_par_bloc > 1 << 12 and \
+                    OCTETS_PAR_SYMBOLE_BLOC * symboles_par_bloc * blocs_en_cours > max_memory // 2:
+                symboles_par_bloc //= 2
+            memoire_blocs = OCTETS_PAR_SYMBOLE_BLOC * symboles_par_bloc * blocs_en_cours
+            hauteur_max = int((max_memory - memoire_blocs - taille_decodee)
+                              // (OCTETS_PAR_ECHANTILLON_BANDE * largeur * nb_canaux))
+            if hauteur_max >= 1:
+                hauteur_bande = min(hauteur_bande or hauteur, hauteur_max)
+                estimation_memoire = estimer()
+                print(f"Budget mémoire: mode flux, bandes de {hauteur_bande} lignes, "
+                      f"blocs de {symboles_par_bloc:,} symboles")
+        if estimation_memoire > max_memory:
+            raise ValueError(f"Mémoire estimée {estimation_memoire / 1e6:.1f} Mo, au-delà du budget "
+                             f"max_memory de {max_memory / 1e6:.1f} Mo: {image_path}")
+
+    # Temps (et pics de mémoire) par étape (voir _Chronometre), rapportés dans les métriques
+    chronometre = _Chronometre(memoire=mesurer_memoire)
+
+    if hauteur_bande is None:
+        # Image décodée et comptée une seule fois par exécution: les statistiques sont
+        # partagées avec CompressionAnalyzer et analyze_spatial_redundancy
+        stats = obtenir_stats(image_path)
+        img = stats.image
+    else:
+        # En mode flux, on ne garde pas l'image entière dans le cache
+        stats = None
+        img = Image.open(image_path)
     
     # Sauvegarder les métadonnées pour la reconstruction
     image_metadata = {
@@ -33,155 +1683,269 @@ def huffman(image_path):
         'mode': img.mode
     }
     
-    # Convertir l'image en tableau numpy et obtenir les bytes originaux
-    Message = np.array(img)
-    original_image_bytes = img.tobytes()
-    taille_originale = len(original_image_bytes)
-    
-    # On s'assure que l'array est 1D
-    Message = Message.flatten()
+    # Taille des bytes originaux (len(img.tobytes())), calculée sans copier les pixels
+    taille_originale = _taille_brute(img)
+    nb_echantillons = img.size[0] * img.size[1] * len(img.getbands())
 
-    # On converti uint8 en int pour éviter un overflow lors d'une addition
-    if np.issubdtype(Message.dtype, np.integer):
-        Message = Message.astype(int)
+    # Les pixels sont lus par bandes horizontales, aplaties en 1D (une seule bande
+    # pour toute l'image si hauteur_bande est None). Chaque passe relit les bandes:
+    # en mode flux, une seule bande à la fois est convertie en tableau numpy.
+    # pixels: échantillons à coder (les résidus de prédiction une fois la transformée appliquée)
+    pixels = stats.pixels if stats is not None else None
 
-    #Liste qui sera modifié jusqu'à ce qu'elle contienne seulement la racine de l'arbre
-    # On utilise np.unique pour optimiser le dénombrement (O(N) au lieu de O(N^2))
-    symbols_uniques, counts = np.unique(Message, return_counts=True)
-    
-    ArbreSymb = []
-    #dictionnaire obtenu à partir de l'arbre.
-    dictionnaire = []
-    
-    for symbol, count in zip(symbols_uniques, counts):
-        ArbreSymb.append([symbol, count, Node(symbol)])
-        dictionnaire.append([symbol, ''])
-        
-    nbsymboles = len(symbols_uniques)
-    print("Nombre de symboles différents: {0}", nbsymboles)
+    def bandes():
+        if stats is not None:
+            return iter([_aplatir(pixels)])
+        return _bandes(img, hauteur_bande)
 
-    # Calcul de la taille originale en bits (8 bits par symbole)
-    # On suppose que l'image source est toujours stockée sur 8 bits par canal
-    longueurOriginale = len(Message) * 8
+    base_filename = os.path.splitext(os.path.basename(image_path))[0]
+    if codeur != 'huffman':
+        # Fichiers distincts pour comparer les codeurs côte à côte
+        base_filename += f"_{codeur}"
+    metrics_filepath = os.path.join(OUTPUT_DIR, f"{base_filename}_metrics.txt")
 
-    OccSymb = ArbreSymb.copy()
+    chronometre.top('chargement')
 
-    with open(os.path.join(OUTPUT_DIR, "occurences.txt"), "w") as f:
-        f.write(str(OccSymb))
+    # Cache: un hash des pixels remplace l'encodage si l'image a déjà été traitée
+    cle_cache = None
+    if cache is not None:
+        configuration = {
+            'canonique': canonique,
+            'verifier': verifier,
+            'symboles_par_bloc': symboles_par_bloc,
+            'hauteur_bande': hauteur_bande,
+            'taille_tuile': taille_tuile,
+            'prediction': prediction,
+            'rle': rle,
+            'taille_tuple': taille_tuple,
+            'longueur_max': longueur_max,
+            'codeur': codeur,
+            'table_partagee': table_partagee,
+        }
+        cle_cache = cache.cle(bandes(), image_metadata, configuration)
+        # Les artefacts sont rendus depuis l'arbre, que le cache ne conserve pas
+        entree = cache.lire(cle_cache) if artefacts == 'aucun' else None
+        if entree is not None:
+            return _restaurer_du_cache(entree, base_filename, metrics_filepath, chronometre, nb_echantillons)
+        chronometre.top('cache')
 
+    # Transformée prédictive: les résidus remplacent les pixels pour la suite
+    histogramme = stats.histogramme if stats is not None else None
+    choix_prediction = None
+    if prediction is not None and pixels.dtype != np.uint8:
+        print(f"Prédiction ignorée: échantillons {pixels.dtype}, 8 bits requis")
+    elif prediction is not None:
+        pixels, choix_prediction = transformer(pixels, prediction, taille_tuile or TAILLE_TUILE_PREDICTION)
+        histogramme = np.bincount(pixels.reshape(-1))
 
+    # Histogramme des échantillons codés (pixels ou résidus), pour l'entropie
+    histogramme_echantillons = histogramme
 
-    ArbreSymb = sorted(ArbreSymb, key=lambda x: x[1])
-    # print(ArbreSymb)
+    # Alphabet étendu: un symbole par suite de taille_tuple échantillons consécutifs,
+    # en base nombre de valeurs présentes
+    symboles_tuples = None
+    if taille_tuple > 1 and (not canonique or histogramme is None):
+        print("Codage par tuples ignoré: symboles non entiers ou négatifs")
+    elif taille_tuple > 1:
+        valeurs_tuples = np.flatnonzero(histogramme)
+        symboles_tuples = former_tuples(_aplatir(pixels), valeurs_tuples, taille_tuple)
+        histogramme = np.bincount(symboles_tuples)
 
-    with open(os.path.join(OUTPUT_DIR, "occurences_triees.txt"), "w") as f:
-        f.write(str(ArbreSymb))
+    # Codage par plages: les longueurs des plages deviennent les symboles de la table principale
+    plages = None
+    if (rle is not False and canonique and taille_tuile is None and symboles_tuples is None
+            and codeur == 'huffman' and table_partagee is None and histogramme is not None):
+        plages = choisir_plages(_aplatir(pixels), histogramme, forcer=bool(rle), longueur_max=longueur_max)
+        if plages is not None:
+            histogramme = np.bincount(plages['longueurs'])
 
+    chronometre.top('transformee')
 
-    while len(ArbreSymb) > 1:
-        #Fusion des noeuds de poids plus faibles
-        symbfusionnes = ArbreSymb[0][0] + ArbreSymb[1][0]
-        #Création d'un nouveau noeud
-        noeud = Node(symbfusionnes)
-        temp = [symbfusionnes, ArbreSymb[0][1] + ArbreSymb[1][1], noeud]
-        #Ajustement de l'arbre pour connecter le nouveau avec ses parents
-        ArbreSymb[0][2].parent = noeud
-        ArbreSymb[1][2].parent = noeud
-        #Enlève les noeuds fusionnés de la liste de noeud à fusionner.
-        del ArbreSymb[0:2]
-        #Ajout du nouveau noeud à la liste et tri.
-        ArbreSymb += [temp]
+    # Passe 1: dénombrement des symboles (histogramme cumulé bande par bande)
+    if histogramme is not None:
+        symbols_uniques = np.flatnonzero(histogramme)
+        counts = histogramme[symbols_uniques]
+    else:
+        symbols_uniques, counts = _compter_symboles(bandes)
+    chronometre.top('denombrement')
+    
+    nbsymboles = len(symbols_uniques)
+    print("Nombre de symboles différents: {0}", nbsymboles)
 
-        #Pour affichage de l'arbre ou des sous-branches
-        # print('\nArbre actuel:\n\n')
-        # for i in range(len(ArbreSymb)):
-            # if np.count_nonzero(ArbreSymb[i][0]) > 1:
-                # print(RenderTree(ArbreSymb[i][2], style=AsciiStyle()).by_attr())
+    # Calcul de la taille originale en bits (8 bits par symbole)
+    # On suppose que l'image source est toujours stockée sur 8 bits par canal
+    longueurOriginale = nb_echantillons * 8
 
-        ArbreSymb = sorted(ArbreSymb, key=lambda x: x[1])
+    # Construction de l'arbre avec deux files (tri des feuilles, puis fusions linéaires) sur les occurrences seulement
+    parents, bits = construire_arbre_huffman(counts)
+    codes, longueurs = codes_arbre(parents, bits, nbsymboles)
 
-        with open(os.path.join(OUTPUT_DIR, "occurences_triees_fusion.txt"), "w") as f:
-            f.write(str(ArbreSymb))
-        # print(ArbreSymb)
+    # Les codes canoniques ne dépendent que des longueurs: il faut des symboles entiers non négatifs
+    # pour pouvoir les indexer dans la table des longueurs
+    if canonique and not (np.issubdtype(symbols_uniques.dtype, np.integer) and symbols_uniques[0] >= 0):
+        if codeur == 'rans':
+            raise ValueError(f"Le codeur rANS demande des symboles entiers non négatifs: {image_path}")
+        print("Symboles non entiers ou négatifs: utilisation des codes de l'arbre")
+        canonique = False
 
+    # Codes limités à longueur_max bits: surcoût (en bits) par rapport au code optimal
+    surcout_limite = None
+    if canonique and longueur_max is not None:
+        optimum = int(counts @ longueurs)
+        if longueurs.max() > longueur_max:
+            longueurs = longueurs_limitees(counts, longueur_max)
+        surcout_limite = int(counts @ longueurs) - optimum
 
+    if canonique:
+        table_longueurs = np.zeros(int(symbols_uniques[-1]) + 1, dtype=np.int64)
+        table_longueurs[symbols_uniques] = longueurs
 
-    ArbreCodes = Node('')
-    noeud = ArbreCodes
-    #print([node.name for node in PreOrderIter(ArbreSymb[0][2])])
-    parcoursprefix = [node for node in PreOrderIter(ArbreSymb[0][2])]
-    parcoursprefix = parcoursprefix[1:len(parcoursprefix)] #ignore la racine
+    # Table partagée: surcoût du message (divergence de Kullback-Leibler entre l'image et
+    # le corpus, en bits), comparé à la table propre que l'identifiant remplace
+    identifiant_partage = None
+    surcout_partage = None
+    if longueurs_partagees is not None:
+        if (symbols_uniques[-1] < len(longueurs_partagees) and longueurs_partagees[symbols_uniques].all()
+                and (longueur_max is None or longueurs_partagees.max() <= longueur_max)):
+            surcout_partage = int(counts @ (longueurs_partagees[symbols_uniques] - longueurs))
+            economie = 8 * (len(serialiser_longueurs(table_longueurs)) - TAILLE_IDENTIFIANT)
+            if surcout_partage < economie:
+                identifiant_partage = table_partagee
+                table_longueurs = longueurs_partagees
+                longueurs = longueurs_partagees[symbols_uniques]
 
-    Prevdepth = 0 #pour suivre les mouvements en profondeur dans l'arbre
-    for node in parcoursprefix:  #Liste des noeuds
-        if Prevdepth < node.depth: #On va plus profond dans l'arbre, on met un 0
-            temp = Node(noeud.name + '0')
-            noeud.children = [temp]
-            if node.children: #On avance le "pointeur" noeud si le noeud ajouté a des enfants.
-                noeud = temp
-        elif Prevdepth == node.depth: #Même profondeur, autre feuille, on met un 1
-            temp = Node(noeud.name + '1')
-            noeud.children = [noeud.children[0], temp]  #Ajoute le deuxième enfant
-            if node.children: #On avance le "pointeur" noeud si le noeud ajouté a des enfants.
-                noeud = temp
-        else:
-            for i in range(Prevdepth-node.depth): #On prend une autre branche, donc on met un 1
-                noeud = noeud.parent #On remontre dans l'arbre pour prendre la prochaine branche non explorée.
-            temp = Node(noeud.name + '1')
-            noeud.children = [noeud.children[0], temp]
-            if node.children:
-                noeud = temp
+    if canonique:
+        codes = codes_canoniques(table_longueurs)[symbols_uniques]
 
-        Prevdepth = node.depth
+    #dictionnaire obtenu à partir de l'arbre (ou des longueurs en mode canonique).
+    def dictionnaire():
+        return [[symbol, _code_str(code, longueur)]
+                for symbol, code, longueur in zip(symbols_uniques, codes, longueurs)]
 
-    with open(os.path.join(OUTPUT_DIR, "arbre_codes.txt"), "w") as f:
-        f.write(str(RenderTree(ArbreCodes, style=AsciiStyle()).by_attr()))
+    # Fichiers de débogage: rendus seulement s'ils sont demandés, une seule fois, à la fin
+    def occurences():
+        return [[symbol, count] for symbol, count in zip(symbols_uniques, counts)]
 
-    with open(os.path.join(OUTPUT_DIR, "arbre_symboles.txt"), "w") as f:
-        f.write(str(RenderTree(ArbreSymb[0][2], style=AsciiStyle()).by_attr()))
-    # print('\nArbre des codes:\n\n',RenderTree(ArbreCodes, style=AsciiStyle()).by_attr())
-    # print('\nArbre des symboles:\n\n', RenderTree(ArbreSymb[0][2], style=AsciiStyle()).by_attr())
+    producteurs_artefacts = {
+        "occurences.txt": lambda: str(occurences()),
+        "occurences_triees.txt": lambda: str(sorted(occurences(), key=lambda x: x[1])),
+        "occurences_triees_fusion.txt": lambda: str(_fusions(parents, counts)),
+        "dictionnaire.txt": lambda: str(dictionnaire()),
+        "arbre_codes.txt": lambda: str(RenderTree(_arbre_codes(dictionnaire()), style=AsciiStyle()).by_attr()),
+        "arbre_symboles.txt": lambda: str(RenderTree(_arbre_symboles(parents, symbols_uniques, counts),
+                                                     style=AsciiStyle()).by_attr()),
+    }
 
+    # Tables de codes indexées directement par la valeur du symbole (mode canonique)
+    # ou par son rang dans symbols_uniques (codes de l'arbre)
+    if canonique:
+        table_codes = codes_canoniques(table_longueurs)
+    else:
+        table_codes = codes
+        table_longueurs = longueurs
 
+    fichier_compresse = None
+    debit_decodage = None
+    tuiles_locales = None
+    resume_plages = None
+    if plages is not None:
+        resume_plages = (len(plages['longueurs']), nb_echantillons / max(len(plages['longueurs']), 1))
 
-    ArbreSymbList = [node for node in PreOrderIter(ArbreSymb[0][2])]
-    ArbreCodeList = [node for node in PreOrderIter(ArbreCodes)]
+    chronometre.top('arbre')
 
-    for i in range(len(ArbreSymbList)):
-        if ArbreSymbList[i].is_leaf: #Génère des codes pour les feuilles seulement
-            temp = list(filter(lambda x: x[0] == ArbreSymbList[i].name, dictionnaire))
-            if temp:
-                indice = dictionnaire.index(temp[0])
-                dictionnaire[indice][1] = ArbreCodeList[i].name
+    # Passe 2: encodage, bande par bande
+    debut_encodage = time.perf_counter()
+    longueur = 0
+    if canonique:
+        # Fichier .huf: en-tête (métadonnées + table des longueurs), puis les blocs
+        # (avec rANS, la table des longueurs est remplacée par la table des fréquences)
+        if codeur == 'rans':
+            comptes_symboles = np.zeros(int(symbols_uniques[-1]) + 1, dtype=np.int64)
+            comptes_symboles[symbols_uniques] = counts
+            frequences = normaliser_frequences(comptes_symboles)
+            entete = serialiser_entete(image_metadata, nb_echantillons, np.zeros(0, dtype=np.int64))
+            sections = {SECTION_ENTETE: entete, SECTION_RANS: serialiser_frequences(frequences)}
+        elif identifiant_partage is not None:
+            entete = serialiser_entete(image_metadata, nb_echantillons, np.zeros(0, dtype=np.int64))
+            sections = {SECTION_ENTETE: entete, SECTION_TABLE_PARTAGEE: serialiser_identifiant(identifiant_partage)}
+        else:
+            entete = serialiser_entete(image_metadata, nb_echantillons, table_longueurs)
+            sections = {SECTION_ENTETE: entete}
+        if choix_prediction is not None:
+            sections[SECTION_PREDICTION] = serialiser_choix(choix_prediction)
+        fichier_compresse = os.path.join(OUTPUT_DIR, f"{base_filename}.huf")
 
+        # Chaque bloc est encodé avec une table (codes, longueurs): la table globale,
+        # ou en mode par tuiles la table locale de la tuile si elle est plus avantageuse
+        tables = [(table_codes, table_longueurs)]
+        if taille_tuile is not None:
+            histogrammes = histogrammes_tuiles(pixels, taille_tuile, len(table_longueurs))
+            locales, tables_locales = choisir_tables_tuiles(histogrammes, table_longueurs, longueur_max)
+            sections[SECTION_TUILES] = serialiser_tuiles(taille_tuile, locales, tables_locales)
+            tables += [(codes_canoniques(table), table) for table in tables_locales]
+            numeros_tables = np.where(locales, np.cumsum(locales), 0)
+            tuiles_locales = (len(tables_locales), len(locales))
 
-    with open(os.path.join(OUTPUT_DIR, "dictionnaire.txt"), "w") as f:
-        f.write(str(dictionnaire))
-    # print(dictionnaire)
+            def bandes_verification():
+                return _tuiles(pixels, taille_tuile)
+            blocs = zip(bandes_verification(), numeros_tables.tolist())
+        elif plages is not None:
+            # Blocs des valeurs (table 1, hors alternance) puis blocs des longueurs (table globale)
+            blocs_valeurs = ()
+            table_valeurs = None
+            if plages['valeurs'] is not None:
+                comptes_valeurs = np.bincount(plages['valeurs'])
+                presentes = np.flatnonzero(comptes_valeurs)
+                table_valeurs = np.zeros(len(comptes_valeurs), dtype=np.int64)
+                table_valeurs[presentes] = _longueurs_huffman(comptes_valeurs[presentes], longueur_max)
+                tables.append((codes_canoniques(table_valeurs), table_valeurs))
+                blocs_valeurs = ((bloc, 1) for bloc in _blocs([plages['valeurs']], symboles_par_bloc))
+            sections[SECTION_PLAGES] = serialiser_plages(plages, table_valeurs)
+            bandes_verification = bandes
+            blocs = chain(blocs_valeurs, ((bloc, 0) for bloc in _blocs([plages['longueurs']], symboles_par_bloc)))
+        elif symboles_tuples is not None:
+            sections[SECTION_TUPLES] = serialiser_tuples(taille_tuple, valeurs_tuples)
+            bandes_verification = bandes
+            blocs = ((bloc, 0) for bloc in _blocs([symboles_tuples], symboles_par_bloc))
+        else:
+            bandes_verification = bandes
+            blocs = ((bloc, 0) for bloc in _blocs(bandes(), symboles_par_bloc))
 
+        # encodés indépendamment (en parallèle si threads > 1) et écrits dans l'ordre
+        def encoder_bloc(element):
+            bloc, numero = element
+            if codeur == 'rans':
+                flux = encoder_rans(bloc, frequences)
+                return flux, 8 * len(flux), len(bloc)
+            return encoder_bits(bloc, *tables[numero]) + (len(bloc),)
 
-    # On converti de list à dict pour O(1) un lookup
-    dict_lookup = {entry[0]: entry[1] for entry in dictionnaire}
+        with EcrivainHuf(fichier_compresse, sections) as ecrivain:
+            for flux, nb_bits, nb_symboles in _map_ordonne(encoder_bloc, blocs, threads):
+                ecrivain.ecrire_bloc(flux, nb_bits, nb_symboles)
+                longueur += nb_bits
+        taille_fichier = ecrivain.fermer()
+    else:
+        for bande in bandes():
+            _, nb_bits = encoder_bits(np.searchsorted(symbols_uniques, bande), table_codes, table_longueurs)
+            longueur += nb_bits
+    duree_encodage = time.perf_counter() - debut_encodage
+    debit_encodage = taille_originale / duree_encodage / 1e6 if duree_encodage > 0 else float('inf')
+    chronometre.top('encodage')
 
-    MessageCode = []
-    longueur = 0
-    for symbol in Message:
-        code = dict_lookup[symbol]
-        MessageCode.append(code)
-        longueur += len(code)
-
-    with open(os.path.join(OUTPUT_DIR, "message_code.txt"), "w") as f:
-        f.write(str(MessageCode))
-    # print(MessageCode)
-
-    # Calculer la taille compressée réelle en incluant l'arbre et les métadonnées
-    compressed_data = {
-        'arbre': ArbreSymb[0][2],
-        'dictionnaire': dictionnaire,
-        'message_code': MessageCode,
-        'metadata': image_metadata if image_metadata else None
-    }
-    
+    if canonique and verifier:
+        debut_decodage = time.perf_counter()
+        if choix_prediction is not None:
+            # Vérification complète: décodage des résidus puis inversion de la prédiction
+            identique = np.array_equal(np.array(decompress(fichier_compresse, threads, registre)), stats.pixels)
+        else:
+            identique = _verifier_decodage(fichier_compresse, bandes_verification(), threads, registre)
+        duree_decodage = time.perf_counter() - debut_decodage
+        debit_decodage = taille_originale / duree_decodage / 1e6 if duree_decodage > 0 else float('inf')
+        if not identique:
+            raise ValueError(f"L'image décompressée ne correspond pas à l'originale: {image_path}")
+        chronometre.top('verification')
+
+    # Calculer la taille compressée réelle en incluant le dictionnaire et les métadonnées
     # CORRECTION: Ne pas utiliser pickle pour mesurer la vraie compression
     # Le pickle ajoute un overhead énorme pour les listes de strings
     # On calcule plutôt: bits encodés / 8 + overhead du dictionnaire
@@ -189,13 +1953,17 @@ def huffman(image_path):
     # Taille du message encodé en bytes (arrondi au byte supérieur)
     message_encoded_bytes = (longueur + 7) // 8
     
-    # Pour la décompression, on n'a besoin QUE du dictionnaire et des métadonnées
-    # L'arbre n'est pas nécessaire pour décoder, seul le dictionnaire l'est
-    decompression_data = {
-        'dictionnaire': dictionnaire,
-        'metadata': image_metadata
-    }
-    overhead_bytes = len(pickle.dumps(decompression_data))
+    # Pour la décompression, on n'a besoin QUE des codes et des métadonnées
+    # En mode canonique, la table des longueurs suffit à reconstruire les codes: l'overhead
+    # est tout ce que le fichier .huf contient en plus du message (en-tête, index, alignement des blocs)
+    if canonique:
+        overhead_bytes = taille_fichier - message_encoded_bytes
+    else:
+        decompression_data = {
+            'dictionnaire': dictionnaire(),
+            'metadata': image_metadata
+        }
+        overhead_bytes = len(pickle.dumps(decompression_data))
     
     # Taille compressée totale = message encodé + overhead
     taille_compressee = message_encoded_bytes + overhead_bytes
@@ -205,81 +1973,161 @@ def huffman(image_path):
     ratio_compression = taille_originale / taille_compressee if taille_compressee > 0 else 0
     pourcentage_reduction = (1 - taille_compressee / taille_originale) * 100 if taille_originale > 0 else 0
 
+    # Lignes des métriques, construites une fois pour la console et le fichier *_metrics.txt
+    titre = ("MÉTRIQUES DE COMPRESSION HUFFMAN" if codeur == 'huffman'
+             else f"MÉTRIQUES DE COMPRESSION ({codeur.upper()})")
+    lignes_metriques = [
+        f"Taille originale:           {taille_originale:,} octets",
+        "",
+        "COMPRESSION (bits encodés):",
+        f"  Bits originaux:           {int(longueurOriginale):,} bits",
+        f"  Bits encodés:             {longueur:,} bits",
+        f"  Octets encodés:           {message_encoded_bytes:,} octets",
+        f"  Ratio (raw):              {ratio_raw:.2f}x",
+        f"  Gain (raw):               {(1 - longueur/longueurOriginale)*100:.2f}%",
+        f"  Débit d'encodage:         {debit_encodage:.2f} Mo/s",
+    ]
+    if codeur != 'huffman':
+        lignes_metriques.append(f"  Codeur entropique:        {codeur}")
+    if debit_decodage is not None:
+        lignes_metriques.append(f"  Débit de décodage:        {debit_decodage:.2f} Mo/s (reconstruction vérifiée)")
+    if tuiles_locales is not None:
+        lignes_metriques.append(f"  Tuiles à table locale:    {tuiles_locales[0]} / {tuiles_locales[1]}")
+    if choix_prediction is not None:
+        lignes_metriques.append(f"  Prédiction:               {resume_choix(choix_prediction)}")
+    if resume_plages is not None:
+        lignes_metriques.append(f"  Plages (RLE):             {resume_plages[0]:,} "
+                                f"(longueur moyenne {resume_plages[1]:.1f})")
+    if surcout_limite is not None:
+        lignes_metriques.append(f"  Surcoût longueur max:     {surcout_limite:,} bits "
+                                f"({surcout_limite / optimum * 100:.3f}%, codes <= {longueur_max} bits)")
+    if table_partagee is not None:
+        lignes_metriques.append(f"  Table partagée:           "
+                                f"{_resume_table_partagee(table_partagee, identifiant_partage, surcout_partage)}")
+    lignes_metriques += [
+        "",
+        "OVERHEAD (dictionnaire + métadonnées):",
+        f"  Taille overhead:          {overhead_bytes:,} octets",
+        f"  Overhead % original:      {overhead_bytes/taille_originale*100:.2f}%",
+        "",
+        "TOTAL (encodé + overhead):",
+        f"  Taille compressée:        {taille_compressee:,} octets",
+        f"  Ratio de compression:     {ratio_compression:.2f}x",
+        f"  Réduction:                {pourcentage_reduction:.2f}%",
+    ]
+
     print("")
     print("="*60)
-    print("MÉTRIQUES DE COMPRESSION HUFFMAN")
+    print(titre)
     print("="*60)
-    print(f"Taille originale:           {taille_originale:,} octets")
-    print("")
-    print("COMPRESSION (bits encodés):")
-    print(f"  Bits originaux:           {int(longueurOriginale):,} bits")
-    print(f"  Bits encodés:             {longueur:,} bits")
-    print(f"  Octets encodés:           {message_encoded_bytes:,} octets")
-    print(f"  Ratio (raw):              {ratio_raw:.2f}x")
-    print(f"  Gain (raw):               {(1 - longueur/longueurOriginale)*100:.2f}%")
-    print("")
-    print("OVERHEAD (dictionnaire + métadonnées):")
-    print(f"  Taille overhead:          {overhead_bytes:,} octets")
-    print(f"  Overhead % original:      {overhead_bytes/taille_originale*100:.2f}%")
-    print("")
-    print("TOTAL (encodé + overhead):")
-    print(f"  Taille compressée:        {taille_compressee:,} octets")
-    print(f"  Ratio de compression:     {ratio_compression:.2f}x")
-    print(f"  Réduction:                {pourcentage_reduction:.2f}%")
+    for ligne in lignes_metriques:
+        print(ligne)
     print("="*60)
     print("")
 
-    print('Espérance: ' + str(longueur/len(Message)))
-    entropie = 0
-    for i in range(nbsymboles):
-        if OccSymb[i][1] > 0:
-            entropie = entropie-(OccSymb[i][1]/len(Message))*math.log(OccSymb[i][1]/len(Message),2)
-        else:
-            raise ValueError('Trying to do log(0)')
+    print('Espérance: ' + str(longueur/nb_echantillons))
+    # Entropie d'ordre 0 des échantillons codés (pixels ou résidus), en bits par échantillon:
+    # avec les plages ou les tuples, les symboles de la table ne sont plus des échantillons
+    if histogramme_echantillons is not None:
+        entropie = _entropie(histogramme_echantillons)
+    else:
+        entropie = 0
+        for i in range(nbsymboles):
+            if counts[i] > 0:
+                entropie = entropie-(counts[i]/nb_echantillons)*math.log(counts[i]/nb_echantillons,2)
+            else:
+                raise ValueError('Trying to do log(0)')
 
     print('Entropie: ' + str(entropie))
     print("")
+    chronometre.top('rapport')
+
+    _ecrire_artefacts(artefacts, producteurs_artefacts)
+    chronometre.top('artefacts')
     
-    # Sauvegarder les métriques dans un fichier
-    base_filename = os.path.splitext(os.path.basename(image_path))[0]
-    metrics_filepath = os.path.join(OUTPUT_DIR, f"{base_filename}_metrics.txt")
+    # Sauvegarder les métriques dans un fichier (l'écriture elle-même est chronométrée
+    # dans le dict des métriques seulement)
+    etapes = chronometre.resume(nb_echantillons)
+
+    # Mémoire: estimation (avec max_memory), pic alloué (avec mesurer_memoire) et pic de RSS
+    memoire = {
+        'estimation': estimation_memoire,
+        'budget': max_memory,
+        'hauteur_bande': hauteur_bande,
+        'pic_alloue': max(chronometre.pics_memoire.values()) if chronometre.pics_memoire else None,
+        'pic_rss': _pic_rss(),
+    }
+    lignes_memoire = []
+    if memoire['estimation'] is not None:
+        lignes_memoire.append(f"  Estimation:               {memoire['estimation'] / 1e6:.1f} Mo "
+                              f"(budget {max_memory / 1e6:.1f} Mo)")
+    if memoire['pic_alloue'] is not None:
+        lignes_memoire.append(f"  Pic alloué (tracemalloc): {memoire['pic_alloue'] / 1e6:.1f} Mo")
+    if memoire['pic_rss'] is not None:
+        lignes_memoire.append(f"  Pic RSS du processus:     {memoire['pic_rss'] / 1e6:.1f} Mo")
     
     with open(metrics_filepath, 'w', encoding='utf-8') as f:
         f.write("="*60 + "\n")
-        f.write("MÉTRIQUES DE COMPRESSION HUFFMAN\n")
+        f.write(titre + "\n")
         f.write("="*60 + "\n")
         f.write(f"Image: {os.path.basename(image_path)}\n\n")
-        f.write(f"Taille originale:           {taille_originale:,} octets\n\n")
-        f.write("COMPRESSION (bits encodés):\n")
-        f.write(f"  Bits originaux:           {int(longueurOriginale):,} bits\n")
-        f.write(f"  Bits encodés:             {longueur:,} bits\n")
-        f.write(f"  Octets encodés:           {message_encoded_bytes:,} octets\n")
-        f.write(f"  Ratio (raw):              {ratio_raw:.2f}x\n")
-        f.write(f"  Gain (raw):               {(1 - longueur/longueurOriginale)*100:.2f}%\n\n")
-        f.write("OVERHEAD (dictionnaire + métadonnées):\n")
-        f.write(f"  Taille overhead:          {overhead_bytes:,} octets\n")
-        f.write(f"  Overhead % original:      {overhead_bytes/taille_originale*100:.2f}%\n\n")
-        f.write("TOTAL (encodé + overhead):\n")
-        f.write(f"  Taille compressée:        {taille_compressee:,} octets\n")
-        f.write(f"  Ratio de compression:     {ratio_compression:.2f}x\n")
-        f.write(f"  Réduction:                {pourcentage_reduction:.2f}%\n\n")
-        f.write(f"Espérance:                  {longueur/len(Message):.4f}\n")
+        for ligne in lignes_metriques:
+            f.write(ligne + "\n")
+        f.write("\n")
+        f.write(f"Espérance:                  {longueur/nb_echantillons:.4f}\n")
         f.write(f"Entropie:                   {entropie:.4f}\n")
-        f.write(f"Nombre de symboles:         {nbsymboles}\n")
+        f.write(f"Nombre de symboles:         {nbsymboles}\n\n")
+        f.write("TEMPS PAR ÉTAPE:\n")
+        for ligne in _lignes_etapes(etapes):
+            f.write(ligne + "\n")
+        if lignes_memoire:
+            f.write("\nMÉMOIRE:\n")
+            for ligne in lignes_memoire:
+                f.write(ligne + "\n")
         f.write("="*60 + "\n")
-    
+    chronometre.top('metriques')
+    etapes = chronometre.resume(nb_echantillons)
+
+    print("TEMPS PAR ÉTAPE:")
+    for ligne in _lignes_etapes(etapes):
+        print(ligne)
+    if lignes_memoire:
+        print("MÉMOIRE:")
+        for ligne in lignes_memoire:
+            print(ligne)
+    print("")
     print("="*50)
     print(f"Métriques sauvegardées: {metrics_filepath}")
     print("="*50)
     print("")
     
     # Retourner les métriques
-    return {
+    metrics = {
         'taille_originale': taille_originale,
         'taille_compressee': taille_compressee,
         'ratio_compression': ratio_compression,
         'pourcentage_reduction': pourcentage_reduction,
         'longueur_bits': longueur,
         'entropie': entropie,
-        'fichier_metrics': metrics_filepath
-    }
\ No newline at end of file
+        'debit_encodage': debit_encodage,
+        'debit_decodage': debit_decodage,
+        'fichier_compresse': fichier_compresse,
+        'fichier_metrics': metrics_filepath,
+        'tuiles_locales': tuiles_locales,
+        'prediction': resume_choix(choix_prediction) if choix_prediction is not None else None,
+        'plages': resume_plages,
+        'taille_tuple': taille_tuple if symboles_tuples is not None else 1,
+        'codeur': codeur,
+        'longueur_max_code': int(longueurs.max()),
+        'surcout_longueur_max': surcout_limite,
+        'table_partagee': identifiant_partage,
+        'surcout_table_partagee': surcout_partage,
+        'nb_echantillons': nb_echantillons,
+        'etapes': etapes,
+        'memoire': memoire,
+    }
+
+    if cache is not None:
+        cache.ecrire(cle_cache, metrics, metrics_filepath, fichier_compresse)
+
+    return metrics
\ No newline at end of file
@@ -0,0 +1,219 @@
+"""
+Statistiques d'image partagées entre la compression, l'analyse et les graphiques
+
+Une image n'est décodée (et ses symboles comptés) qu'une seule fois par exécution:
+huffman(), CompressionAnalyzer et analyze_spatial_redundancy passent tous par
+obtenir_stats(), qui garde les derniers ImageStats dans un cache LRU.
+"""
+
+import os
+from collections import OrderedDict
+from functools import cached_property
+
+import numpy as np
+from PIL import Image
+
+from correlation_spatiale import correlations_spatiales
+from index_complexite import IndexComplexite
+
+# Nombre d'images gardées en mémoire par obtenir_stats()
+TAILLE_CACHE = 4
+
+_cache = OrderedDict()
+
+
+class ImageStats:
+    """
+    Statistiques d'une image, calculées à la demande puis conservées.
+
+    Attributs:
+        image_path: Chemin de l'image
+        image: Image PIL (chargée une seule fois)
+    """
+
+    def __init__(self, image_path):
+        self.image_path = image_path
+        self.image = Image.open(image_path)
+        self.image.load()
+        self._correlations = {}
+
+    @cached_property
+    def pixels(self):
+        """Pixels bruts (np.array(image)), dans le mode d'origine."""
+        return np.array(self.image)
+
+    @cached_property
+    def histogramme(self):
+        """
+        Occurrences de chaque valeur d'échantillon (np.bincount sur tous les canaux),
+        ou None si les échantillons ne sont pas des entiers non négatifs.
+        """
+        echantillons = self.pixels.reshape(-1)
+        if echantillons.dtype != bool and not np.issubdtype(echantillons.dtype, np.integer):
+            return None
+        if len(echantillons) and echantillons.min() < 0:
+            return None
+        return np.bincount(echantillons)
+
+    @cached_property
+    def entropie(self):
+        """Entropie (bits par échantillon) des échantillons bruts."""
+        return _entropie(self.histogramme)
+
+    @cached_property
+    def pixels_rgb(self):
+        """Pixels convertis en RGB (hauteur x largeur x 3)."""
+        if self.image.mode == 'RGB':
+            return self.pixels
+        return np.array(self.image.convert('RGB'))
+
+    @cached_property
+    def histogrammes_rgb(self):
+        """Occurrences des 256 valeurs pour chacun des canaux R, G et B."""
+        return [np.bincount(self.pixels_rgb[:, :, i].reshape(-1), minlength=256) for i in range(3)]
+
+    @cached_property
+    def pixels_gris(self):
+        """
+        Pixels en niveaux de gris (luminance, mode 'L'). Pour une image RGB ou RGBA, la
+        luminance est calculée depuis les canaux R, G et B (comme convert('L')).
+        """
+        if self.image.mode == 'L':
+            return self.pixels
+        if self.image.mode in ('RGB', 'RGBA'):
+            return luminance(self.pixels[:, :, :3])
+        return np.array(self.image.convert('L'))
+
+    @cached_property
+    def histogramme_gris(self):
+        """Occurrences des 256 niveaux de gris."""
+        return np.bincount(self.pixels_gris.reshape(-1), minlength=256)
+
+    @cached_property
+    def entropie_gris(self):
+        """Entropie (bits par pixel) de l'image en niveaux de gris."""
+        return _entropie(self.histogramme_gris)
+
+    @cached_property
+    def histogramme_conjoint_gris(self):
+        """
+        Occurrences des paires (Pixel[i, j], Pixel[i, j+1]) de l'image en niveaux de gris,
+        voisins sur une même ligne (la fin d'une ligne n'est pas appariée au début de la
+        suivante): matrice 256 x 256, ligne = Pixel[i, j], colonne = Pixel[i, j+1].
+        """
+        pixels = self.pixels_gris
+        return histogramme_conjoint(pixels[:, :-1].reshape(-1), pixels[:, 1:].reshape(-1))
+
+    @cached_property
+    def entropie_conditionnelle_gris(self):
+        """Entropie conditionnelle H(Pixel[i, j+1] | Pixel[i, j]) en bits par pixel (voisins sur une ligne)."""
+        return entropie_conditionnelle(self.histogramme_conjoint_gris)
+
+    def correlations(self, decalage_max=1):
+        """
+        Corrélations spatiales par direction, décalage (1 à decalage_max) et canal, plus la
+        luminance (voir correlation_spatiale.correlations_spatiales). Les images L, 1, RGB
+        et RGBA sont mesurées sans conversion; les autres modes passent par pixels_rgb.
+        """
+        if decalage_max not in self._correlations:
+            if self.image.mode in ('L', '1', 'RGB', 'RGBA'):
+                pixels, canaux = self.pixels, self.image.getbands()
+            else:
+                pixels, canaux = self.pixels_rgb, ('R', 'G', 'B')
+            if self.image.mode == '1':
+                canaux = ('L',)
+            self._correlations[decalage_max] = correlations_spatiales(pixels, decalage_max, canaux)
+        return self._correlations[decalage_max]
+
+    @cached_property
+    def gradients(self):
+        """Différences absolues entre pixels adjacents en niveaux de gris: (grad_x, grad_y)."""
+        pixels_float = self.pixels_gris.astype(float)
+        grad_y = np.abs(pixels_float[1:, :] - pixels_float[:-1, :])
+        grad_x = np.abs(pixels_float[:, 1:] - pixels_float[:, :-1])
+        return grad_x, grad_y
+
+    @cached_property
+    def carte_complexite(self):
+        """Somme des gradients horizontal et vertical en chaque pixel."""
+        grad_x, grad_y = self.gradients
+        complexity_map = np.zeros(self.pixels_gris.shape, dtype=float)
+        complexity_map[:-1, :] += grad_y
+        complexity_map[:, :-1] += grad_x
+        return complexity_map
+
+    @cached_property
+    def index_complexite(self):
+        """Index de complexité (tables de sommes) pour interroger des régions en O(1)."""
+        return IndexComplexite(self.pixels_gris, self.carte_complexite)
+
+
+def _entropie(counts):
+    """Entropie (en bits) d'une distribution donnée par ses occurrences."""
+    if counts is None:
+        return None
+    probabilities = counts[counts > 0] / np.sum(counts)
+    return float(-np.sum(probabilities * np.log2(probabilities)))
+
+
+def luminance(rgb):
+    """Luminance entière de pixels RGB (..., 3), arrondie comme PIL convert('L')."""
+    rgb = rgb.astype(np.uint32)
+    return ((rgb[..., 0] * 19595 + rgb[..., 1] * 38470 + rgb[..., 2] * 7471 + 0x8000) >> 16).astype(np.uint8)
+
+
+def histogramme_conjoint(x, y, nb_valeurs=256):
+    """
+    Histogramme conjoint de deux suites de valeurs de même longueur, en un seul
+    np.bincount sur x * nb_valeurs + y.
+
+    Args:
+        x: Premières valeurs de chaque paire (entiers dans [0, nb_valeurs))
+        y: Secondes valeurs de chaque paire
+        nb_valeurs: Taille de l'alphabet
+
+    Returns:
+        np.ndarray: Matrice nb_valeurs x nb_valeurs des occurrences (ligne = x, colonne = y)
+    """
+    # Passage en intp avant la multiplication: x * 256 déborde en uint8
+    indices = np.asarray(x, dtype=np.intp) * nb_valeurs + np.asarray(y, dtype=np.intp)
+    return np.bincount(indices, minlength=nb_valeurs * nb_valeurs).reshape(nb_valeurs, nb_valeurs)
+
+
+def entropie_conditionnelle(conjoint):
+    """Entropie conditionnelle H(Y | X) en bits, depuis l'histogramme conjoint (ligne = X)."""
+    if conjoint.sum() == 0:
+        return 0.0
+    return _entropie(conjoint.reshape(-1)) - _entropie(conjoint.sum(axis=1))
+
+
+def obtenir_stats(image_path):
+    """
+    Retourne les statistiques de l'image, depuis le cache si elle a déjà été chargée.
+
+    La clé du cache inclut la date de modification et la taille du fichier: une
+    image modifiée sur disque est rechargée. Au-delà de TAILLE_CACHE images, la
+    moins récemment utilisée est retirée.
+
+    Args:
+        image_path: Chemin de l'image
+
+    Returns:
+        ImageStats: Statistiques de l'image
+    """
+    infos = os.stat(image_path)
+    cle = (os.path.abspath(image_path), infos.st_mtime_ns, infos.st_size)
+
+    stats = _cache.pop(cle, None)
+    if stats is None:
+        stats = ImageStats(image_path)
+    _cache[cle] = stats
+
+    while len(_cache) > TAILLE_CACHE:
+        _cache.popitem(last=False)
+    return stats
+
+
+def vider_cache():
+    """Retire toutes les images du cache."""
+    _cache.clear()
@@ -0,0 +1,122 @@
+"""
+Index de complexité par tuiles, à base de tables de sommes cumulées (images intégrales)
+
+La carte de complexité (somme des gradients horizontal et vertical en chaque pixel,
+ImageStats.carte_complexite) et les moments des pixels en niveaux de gris sont
+cumulés une fois en tables de sommes: S[l, c] = somme des valeurs des lignes < l et
+colonnes < c. La somme sur n'importe quel rectangle vaut alors
+
+    S[l1, c1] - S[l0, c1] - S[l1, c0] + S[l0, c0]
+
+soit quatre lectures, quelle que soit sa taille. Moyenne, variance et complexité
+moyenne d'une région s'en déduisent en O(1), et la carte de toutes les tuiles d'une
+taille donnée en une seule opération vectorisée, sans relire les pixels.
+"""
+
+import numpy as np
+
+# Tailles de tuiles (pixels de côté) de carte_multi_echelles
+TAILLES_TUILES = (8, 16, 32, 64)
+
+
+def table_sommes(valeurs, dtype=np.int64):
+    """
+    Table de sommes cumulées d'une image 2D, avec une ligne et une colonne de zéros en tête.
+
+    Returns:
+        np.ndarray: Table (hauteur + 1) x (largeur + 1)
+    """
+    table = np.zeros((valeurs.shape[0] + 1, valeurs.shape[1] + 1), dtype=dtype)
+    np.cumsum(valeurs, axis=0, dtype=dtype, out=table[1:, 1:])
+    np.cumsum(table[1:, 1:], axis=1, out=table[1:, 1:])
+    return table
+
+
+def _somme(table, ligne_debut, ligne_fin, colonne_debut, colonne_fin):
+    """Somme sur [ligne_debut, ligne_fin) x [colonne_debut, colonne_fin) (scalaires ou tableaux d'indices)."""
+    return (table[ligne_fin, colonne_fin] - table[ligne_debut, colonne_fin]
+            - table[ligne_fin, colonne_debut] + table[ligne_debut, colonne_debut])
+
+
+class IndexComplexite:
+    """
+    Statistiques de régions d'une image en O(1): moyenne et variance des pixels,
+    complexité moyenne (gradients par pixel).
+
+    Args:
+        pixels_gris: Pixels en niveaux de gris (hauteur x largeur, entiers)
+        carte_complexite: Somme des gradients en chaque pixel (même forme)
+    """
+
+    def __init__(self, pixels_gris, carte_complexite):
+        if pixels_gris.shape != carte_complexite.shape:
+            raise ValueError(f"Formes différentes: {pixels_gris.shape} et {carte_complexite.shape}")
+        self.hauteur, self.largeur = pixels_gris.shape
+        pixels = pixels_gris.astype(np.int64)
+        self._sommes = table_sommes(pixels)
+        self._carres = table_sommes(pixels * pixels)
+        # Les gradients de niveaux de gris sont entiers: la table reste exacte en int64
+        self._gradients = table_sommes(np.rint(carte_complexite).astype(np.int64))
+
+    def _statistiques(self, ligne_debut, ligne_fin, colonne_debut, colonne_fin):
+        nb_pixels = (ligne_fin - ligne_debut) * (colonne_fin - colonne_debut)
+        moyenne = _somme(self._sommes, ligne_debut, ligne_fin, colonne_debut, colonne_fin) / nb_pixels
+        carres = _somme(self._carres, ligne_debut, ligne_fin, colonne_debut, colonne_fin) / nb_pixels
+        complexite = _somme(self._gradients, ligne_debut, ligne_fin, colonne_debut, colonne_fin) / nb_pixels
+        # Arrondi flottant: une variance ne peut pas être négative
+        return moyenne, np.maximum(carres - moyenne * moyenne, 0), complexite
+
+    def rectangle(self, ligne_debut, ligne_fin, colonne_debut, colonne_fin):
+        """
+        Statistiques du rectangle [ligne_debut, ligne_fin) x [colonne_debut, colonne_fin).
+
+        Returns:
+            dict: {'moyenne', 'variance', 'complexite'} (complexité = gradient moyen par pixel)
+        """
+        if not (0 <= ligne_debut < ligne_fin <= self.hauteur and 0 <= colonne_debut < colonne_fin <= self.largeur):
+            raise ValueError(f"Rectangle hors de l'image {self.largeur}x{self.hauteur}: "
+                             f"lignes [{ligne_debut}, {ligne_fin}), colonnes [{colonne_debut}, {colonne_fin})")
+        moyenne, variance, complexite = self._statistiques(ligne_debut, ligne_fin, colonne_debut, colonne_fin)
+        return {'moyenne': float(moyenne), 'variance': float(variance), 'complexite': float(complexite)}
+
+    def carte_tuiles(self, taille):
+        """
+        Statistiques de toutes les tuiles taille x taille (tuiles de bord tronquées), classées
+        par complexité.
+
+        Args:
+            taille: Côté des tuiles, en pixels
+
+        Returns:
+            dict: {'taille', 'moyenne', 'variance', 'complexite', 'rang', 'ordre'}: grilles
+                  (lignes de tuiles x colonnes de tuiles) des statistiques, rang de chaque tuile
+                  (0 = la plus complexe), et ordre: coordonnées (ligne, colonne) en pixels de
+                  l'origine des tuiles, de la plus complexe à la plus plate.
+        """
+        if taille < 1:
+            raise ValueError(f"Taille de tuile invalide: {taille}")
+        origines_lignes = np.arange(0, self.hauteur, taille)
+        origines_colonnes = np.arange(0, self.largeur, taille)
+        ligne_debut = origines_lignes[:, np.newaxis]
+        ligne_fin = np.minimum(ligne_debut + taille, self.hauteur)
+        colonne_debut = origines_colonnes[np.newaxis, :]
+        colonne_fin = np.minimum(colonne_debut + taille, self.largeur)
+        moyenne, variance, complexite = self._statistiques(ligne_debut, ligne_fin, colonne_debut, colonne_fin)
+
+        # Tri stable: à complexité égale, ordre de lecture de l'image
+        ordre = np.argsort(-complexite, axis=None, kind='stable')
+        rang = np.empty(complexite.size, dtype=np.int64)
+        rang[ordre] = np.arange(complexite.size)
+        lignes, colonnes = np.unravel_index(ordre, complexite.shape)
+        return {
+            'taille': taille,
+            'moyenne': moyenne,
+            'variance': variance,
+            'complexite': complexite,
+            'rang': rang.reshape(complexite.shape),
+            'ordre': np.stack((origines_lignes[lignes], origines_colonnes[colonnes]), axis=1),
+        }
+
+    def carte_multi_echelles(self, tailles=TAILLES_TUILES):
+        """Cartes de tuiles (carte_tuiles) pour chaque taille: {taille: carte}."""
+        return {taille: self.carte_tuiles(taille) for taille in tailles}
@@ -1,6 +1,7 @@
 import huffman_coding
 from huffman_coding import huffman
 import generate_histograms
+from cache_resultats import CacheResultats
 
 import numpy as np
 import os
@@ -28,15 +29,18 @@ def main():
     # analyze_spatial_redundancy_rgb(IMAGE_2)
     # analyze_spatial_redundancy_rgb(IMAGE_3)
 
-    huffman(IMAGE_1)
-    huffman(IMAGE_2)
-    huffman(IMAGE_3)
+    # Les images inchangées depuis la dernière exécution sont reprises du cache
+    cache = CacheResultats()
+
+    huffman(IMAGE_1, cache=cache)
+    huffman(IMAGE_2, cache=cache)
+    huffman(IMAGE_3, cache=cache)
     
     # Générer les histogrammes de compression
     print("\n" + "="*60)
     print("Génération des histogrammes...")
     print("="*60)
-    generate_histograms.generate_compression_histograms([IMAGE_1, IMAGE_2, IMAGE_3])
+    generate_histograms.generate_compression_histograms([IMAGE_1, IMAGE_2, IMAGE_3], cache=cache)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
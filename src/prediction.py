@@ -0,0 +1,217 @@
+"""
+Transformée prédictive (DPCM) appliquée avant le codage de Huffman
+
+Chaque échantillon est prédit à partir de ses voisins déjà connus dans le même
+canal: a (gauche), b (haut) et c (haut-gauche), les voisins hors de l'image
+valant 0 comme dans les filtres PNG. On code ensuite le résidu
+(valeur - prédiction) modulo 256, dont la distribution est beaucoup plus
+concentrée autour de 0 que celle des pixels bruts quand les voisins sont corrélés.
+
+Prédicteurs (numérotés dans l'ordre de PREDICTEURS):
+    aucun    0
+    gauche   a
+    haut     b
+    moyenne  (a + b) // 2
+    paeth    celui de a, b, c le plus proche de a + b - c (PNG)
+    med      médiane de a, b et a + b - c (LOCO-I / JPEG-LS)
+
+Le prédicteur est choisi pour toute l'image, par ligne ou par tuile. Le choix
+par ligne ou par tuile minimise la somme des |résidus| (résidus vus comme des
+entiers signés sur 8 bits), l'heuristique des encodeurs PNG.
+
+L'encodeur connaît tous les pixels: les prédictions sont calculées en une fois
+sur toute l'image. Le décodeur a besoin des pixels déjà reconstruits; il avance
+par anti-diagonales (y + x constant), dont les pixels ne dépendent que des
+diagonales précédentes et sont donc reconstruits ensemble.
+"""
+
+import numpy as np
+
+from huf_container import ecrire_varint, lire_varint
+
+PREDICTEURS = ('aucun', 'gauche', 'haut', 'moyenne', 'paeth', 'med')
+
+# Unités de sélection du prédicteur
+SELECTIONS = ('image', 'ligne', 'tuile')
+
+# Côté des tuiles pour la sélection par tuile, si huffman() n'en impose pas
+TAILLE_TUILE_PREDICTION = 32
+
+
+def _predire(numero, a, b, c):
+    """
+    Prédiction du prédicteur numero à partir des voisins a, b, c (tableaux int16).
+    """
+    if numero == 0:
+        return np.zeros_like(a)
+    if numero == 1:
+        return a
+    if numero == 2:
+        return b
+    if numero == 3:
+        return (a + b) >> 1
+    if numero == 4:
+        p = a + b - c
+        pa, pb, pc = np.abs(p - a), np.abs(p - b), np.abs(p - c)
+        return np.where((pa <= pb) & (pa <= pc), a, np.where(pb <= pc, b, c))
+    if numero == 5:
+        minimum, maximum = np.minimum(a, b), np.maximum(a, b)
+        return np.where(c >= maximum, minimum, np.where(c <= minimum, maximum, a + b - c))
+    raise ValueError(f"Prédicteur inconnu: {numero}")
+
+
+def _en_3d(pixels):
+    """Vue hauteur x largeur x canaux (un seul canal pour une image 2D)."""
+    return pixels[:, :, None] if pixels.ndim == 2 else pixels
+
+
+def _voisins(pixels):
+    """Voisins (a, b, c) de chaque échantillon, en int16, les bords valant 0."""
+    hauteur, largeur, canaux = pixels.shape
+    entoure = np.zeros((hauteur + 1, largeur + 1, canaux), dtype=np.int16)
+    entoure[1:, 1:] = pixels
+    return entoure[1:, :-1], entoure[:-1, 1:], entoure[:-1, :-1]
+
+
+def _numeros_tuiles(hauteur, largeur, taille_tuile):
+    """Numéro de tuile (en ordre de balayage) de chaque pixel."""
+    nb_x = -(-largeur // taille_tuile)
+    return (np.arange(hauteur) // taille_tuile)[:, None] * nb_x + (np.arange(largeur) // taille_tuile)[None, :]
+
+
+def transformer(pixels, selection='ligne', taille_tuile=TAILLE_TUILE_PREDICTION):
+    """
+    Calcule les résidus de prédiction modulo 256 d'une image 8 bits.
+
+    Args:
+        pixels: Pixels uint8 (hauteur x largeur, ou hauteur x largeur x canaux)
+        selection: Nom d'un prédicteur (appliqué à toute l'image), 'ligne' ou 'tuile'
+                   pour choisir le meilleur prédicteur de chaque ligne ou de chaque tuile
+        taille_tuile: Côté des tuiles pour selection='tuile'
+
+    Returns:
+        tuple: (résidus uint8 de même forme que pixels, choix) où choix est un dict
+               avec 'selection', 'taille_tuile' et 'predicteurs' (np.ndarray de uint8,
+               un numéro de prédicteur par unité: image, ligne ou tuile)
+    """
+    if pixels.dtype != np.uint8:
+        raise ValueError(f"La prédiction demande des échantillons sur 8 bits, pas {pixels.dtype}")
+    pixels_3d = _en_3d(pixels)
+    hauteur, largeur, _ = pixels_3d.shape
+    a, b, c = _voisins(pixels_3d)
+
+    if selection in PREDICTEURS:
+        predicteurs = np.array([PREDICTEURS.index(selection)], dtype=np.uint8)
+        carte = np.full((hauteur, largeur), predicteurs[0], dtype=np.int64)
+    elif selection in ('ligne', 'tuile'):
+        if selection == 'ligne':
+            unites = np.broadcast_to(np.arange(hauteur)[:, None], (hauteur, largeur))
+        else:
+            unites = _numeros_tuiles(hauteur, largeur, taille_tuile)
+        nb_unites = int(unites.max()) + 1 if unites.size else 0
+
+        # Coût de chaque prédicteur sur chaque unité: somme des |résidus signés|.
+        # Un prédicteur à la fois, pour ne garder qu'un tableau de résidus en mémoire.
+        couts = np.empty((len(PREDICTEURS), nb_unites))
+        for numero in range(len(PREDICTEURS)):
+            residus = (pixels_3d - _predire(numero, a, b, c)).astype(np.int8)
+            cout_pixels = np.abs(residus.astype(np.int16)).sum(axis=2)
+            couts[numero] = np.bincount(unites.reshape(-1), weights=cout_pixels.reshape(-1), minlength=nb_unites)
+        predicteurs = np.argmin(couts, axis=0).astype(np.uint8)
+        carte = predicteurs[unites]
+    else:
+        raise ValueError(f"Prédiction inconnue: {selection} (choix: {', '.join(PREDICTEURS + SELECTIONS[1:])})")
+
+    prediction = np.zeros_like(a)
+    for numero in np.unique(predicteurs).tolist():
+        masque = carte == numero
+        prediction[masque] = _predire(numero, a, b, c)[masque]
+
+    residus = (pixels_3d - prediction).astype(np.uint8).reshape(pixels.shape)
+    choix = {
+        'selection': selection if selection in SELECTIONS else 'image',
+        'taille_tuile': taille_tuile if selection == 'tuile' else 0,
+        'predicteurs': predicteurs,
+    }
+    return residus, choix
+
+
+def _carte(choix, hauteur, largeur):
+    """Numéro du prédicteur de chaque pixel."""
+    predicteurs = choix['predicteurs'].astype(np.int64)
+    if choix['selection'] == 'ligne':
+        return np.broadcast_to(predicteurs[:, None], (hauteur, largeur))
+    if choix['selection'] == 'tuile':
+        return predicteurs[_numeros_tuiles(hauteur, largeur, choix['taille_tuile'])]
+    return np.full((hauteur, largeur), predicteurs[0])
+
+
+def inverser(residus, choix):
+    """
+    Reconstruit exactement les pixels à partir des résidus produits par transformer().
+
+    Args:
+        residus: Résidus (hauteur x largeur, ou hauteur x largeur x canaux), valeurs 0..255
+        choix: dict 'choix' retourné par transformer() (ou relu par lire_choix)
+
+    Returns:
+        np.ndarray: Pixels uint8, de même forme que residus
+    """
+    residus_3d = _en_3d(residus).astype(np.int16)
+    hauteur, largeur, canaux = residus_3d.shape
+    carte = _carte(choix, hauteur, largeur)
+    numeros = np.unique(choix['predicteurs']).tolist()
+
+    # Pixels reconstruits, entourés d'une ligne et d'une colonne de zéros (voisins hors image)
+    pixels = np.zeros((hauteur + 1, largeur + 1, canaux), dtype=np.int16)
+    for diagonale in range(hauteur + largeur - 1):
+        ys = np.arange(max(0, diagonale - largeur + 1), min(diagonale, hauteur - 1) + 1)
+        xs = diagonale - ys
+        a, b, c = pixels[ys + 1, xs], pixels[ys, xs + 1], pixels[ys, xs]
+        if len(numeros) == 1:
+            prediction = _predire(numeros[0], a, b, c)
+        else:
+            prediction = np.zeros_like(a)
+            predicteurs = carte[ys, xs]
+            for numero in numeros:
+                masque = predicteurs == numero
+                if masque.any():
+                    prediction[masque] = _predire(numero, a[masque], b[masque], c[masque])
+        pixels[ys + 1, xs + 1] = (residus_3d[ys, xs] + prediction) & 0xFF
+
+    return pixels[1:, 1:].astype(np.uint8).reshape(residus.shape)
+
+
+def serialiser_choix(choix):
+    """
+    Sérialise le choix des prédicteurs: unité de sélection (1 octet), côté des
+    tuiles (varint), nombre d'unités (varint), puis un octet par unité.
+
+    Returns:
+        bytes: Section SECTION_PREDICTION
+    """
+    sortie = bytearray()
+    sortie.append(SELECTIONS.index(choix['selection']))
+    ecrire_varint(choix['taille_tuile'], sortie)
+    ecrire_varint(len(choix['predicteurs']), sortie)
+    sortie += choix['predicteurs'].tobytes()
+    return bytes(sortie)
+
+
+def lire_choix(donnees, position=0):
+    """Relit une section produite par serialiser_choix. Retourne le dict choix."""
+    selection = SELECTIONS[donnees[position]]
+    taille_tuile, position = lire_varint(donnees, position + 1)
+    nb_unites, position = lire_varint(donnees, position)
+    predicteurs = np.frombuffer(bytes(donnees[position:position + nb_unites]), dtype=np.uint8)
+    return {'selection': selection, 'taille_tuile': taille_tuile, 'predicteurs': predicteurs}
+
+
+def resume_choix(choix):
+    """Description courte du choix des prédicteurs (ex.: 'ligne (paeth: 300, haut: 127)')."""
+    if choix['selection'] == 'image':
+        return PREDICTEURS[int(choix['predicteurs'][0])]
+    occurrences = np.bincount(choix['predicteurs'], minlength=len(PREDICTEURS))
+    details = ', '.join(f"{PREDICTEURS[numero]}: {occurrences[numero]}"
+                        for numero in np.argsort(-occurrences, kind='stable') if occurrences[numero])
+    return f"{choix['selection']} ({details})"
@@ -0,0 +1,217 @@
+"""
+Codage entropique rANS entrelacé, second codeur du conteneur .huf
+
+rANS (range Asymmetric Numeral Systems, J. Duda) code chaque symbole avec
+log2(M / f) bits, où f est sa fréquence normalisée sur M = 2^PRECISION: le débit
+s'approche de l'entropie, sans le plancher de 1 bit par symbole de Huffman.
+
+L'état x de chaque voie est un entier dans [2^16, 2^32). Coder un symbole de
+fréquence f et de cumul c:
+
+    si x >= f * 2^(32 - PRECISION): émettre les 16 bits bas de x, x >>= 16
+    x = (x // f) * M + x % f + c
+
+Le décodeur fait l'inverse (en ordre inverse): le symbole est celui dont
+l'intervalle [c, c + f) contient x % M, puis x = f * (x // M) + x % M - c, et
+s'il retombe sous 2^16 il relit un mot de 16 bits.
+
+Entrelacement: le symbole i est codé par la voie i % nb_voies. Toutes les voies
+avancent ensemble (une étape = un symbole par voie), ce qui vectorise le codeur
+et le décodeur avec NumPy. Les mots émis forment un seul flux, rangé dans l'ordre
+où le décodeur les lit (étapes croissantes, puis voies croissantes): aucune
+position par voie n'est à stocker.
+
+Bloc codé: nb_voies (varint), état final de chaque voie (4 octets), puis les mots
+(2 octets, little-endian).
+"""
+
+import numpy as np
+
+from huf_container import ecrire_varint, lire_varint
+
+PRECISION = 15
+M = 1 << PRECISION
+BAS = 1 << 16  # borne inférieure de l'état
+
+# Nombre de voies: assez pour vectoriser, mais les états finaux (4 octets par voie)
+# doivent rester négligeables devant la taille du bloc codé. Une voie pour
+# OCTETS_PAR_VOIE octets estimés borne les états à 0,1 % du bloc (128 voies pour
+# 2^20 octets estimés): au-delà, le surcoût annule le gain sur Huffman. Un bloc peu
+# entropique coderait alors presque voie par voie: une voie pour SYMBOLES_PAR_VOIE
+# symboles garde la largeur vectorielle (256 voies pour 2^20 symboles, 64 pour 2^18),
+# au prix d'états plus lourds relativement au bloc.
+NB_VOIES_MIN = 16
+NB_VOIES_MAX = 1024
+OCTETS_PAR_VOIE = 4096
+SYMBOLES_PAR_VOIE = 4096
+
+
+def normaliser_frequences(counts, precision=PRECISION):
+    """
+    Ramène des occurrences à des fréquences entières de somme 2^precision,
+    chaque symbole présent gardant une fréquence d'au moins 1.
+
+    Args:
+        counts: Occurrences de chaque valeur de symbole
+        precision: Nombre de bits des fréquences
+
+    Returns:
+        np.ndarray: Fréquences normalisées (int64), même taille que counts
+    """
+    counts = np.asarray(counts, dtype=np.int64)
+    total_cible = 1 << precision
+    presents = np.flatnonzero(counts)
+    if len(presents) > total_cible:
+        raise ValueError(f"{len(presents)} symboles: trop pour des fréquences sur {precision} bits")
+
+    frequences = np.zeros(len(counts), dtype=np.int64)
+    frequences[presents] = np.maximum(1, np.round(counts[presents] * total_cible / counts.sum()).astype(np.int64))
+
+    # Correction de l'arrondi: l'écart est reporté sur les symboles les plus fréquents,
+    # où il coûte le moins
+    ecart = total_cible - int(frequences.sum())
+    ordre = presents[np.argsort(-frequences[presents], kind='stable')]
+    if ecart > 0:
+        frequences[ordre[0]] += ecart
+    for symbole in ordre:
+        if ecart >= 0:
+            break
+        retrait = min(-ecart, int(frequences[symbole]) - 1)
+        frequences[symbole] -= retrait
+        ecart += retrait
+    return frequences
+
+
+def serialiser_frequences(frequences):
+    """
+    Sérialise une table de fréquences: taille de l'alphabet, nombre de symboles
+    présents, puis pour chacun l'écart avec le précédent et la fréquence (varints).
+    """
+    sortie = bytearray()
+    presents = np.flatnonzero(frequences)
+    ecrire_varint(len(frequences), sortie)
+    ecrire_varint(len(presents), sortie)
+    precedent = 0
+    for symbole, frequence in zip(presents.tolist(), frequences[presents].tolist()):
+        ecrire_varint(symbole - precedent, sortie)
+        ecrire_varint(frequence, sortie)
+        precedent = symbole
+    return bytes(sortie)
+
+
+def lire_frequences(donnees, position=0):
+    """Relit une table produite par serialiser_frequences. Retourne (fréquences, position)."""
+    taille, position = lire_varint(donnees, position)
+    nb_presents, position = lire_varint(donnees, position)
+    frequences = np.zeros(taille, dtype=np.int64)
+    symbole = 0
+    for _ in range(nb_presents):
+        ecart, position = lire_varint(donnees, position)
+        symbole += ecart
+        frequences[symbole], position = lire_varint(donnees, position)
+    return frequences, position
+
+
+def _nb_voies(symboles, frequences):
+    """
+    Nombre de voies (puissance de 2) selon la taille estimée du bloc codé, et au moins
+    une voie pour SYMBOLES_PAR_VOIE symboles.
+    """
+    octets_estimes = float(np.sum(PRECISION - np.log2(frequences[symboles]))) / 8
+    nb_voies = NB_VOIES_MIN
+    while nb_voies < NB_VOIES_MAX and (nb_voies * 2 * OCTETS_PAR_VOIE < octets_estimes
+                                       or nb_voies * 2 * SYMBOLES_PAR_VOIE <= len(symboles)):
+        nb_voies *= 2
+    # Pas plus de voies que de symboles (petits blocs)
+    return max(1, min(nb_voies, len(symboles)))
+
+
+def encoder_rans(symboles, frequences, nb_voies=None):
+    """
+    Code une suite de symboles avec rANS entrelacé.
+
+    Args:
+        symboles: Valeurs des symboles (entiers, fréquence non nulle)
+        frequences: Fréquences normalisées (normaliser_frequences)
+        nb_voies: Nombre de voies (par défaut selon la taille estimée du bloc)
+
+    Returns:
+        bytes: Bloc codé
+    """
+    symboles = np.asarray(symboles, dtype=np.int64)
+    if nb_voies is None:
+        nb_voies = _nb_voies(symboles, frequences)
+    cumuls = np.concatenate(([0], np.cumsum(frequences)[:-1])).astype(np.uint64)
+    frequences_u = frequences.astype(np.uint64)
+
+    etats = np.full(nb_voies, BAS, dtype=np.uint64)
+    mots_par_etape = []
+    nb_etapes = -(-len(symboles) // nb_voies)
+    # rANS code à rebours: dernière étape d'abord
+    for etape in range(nb_etapes - 1, -1, -1):
+        bloc = symboles[etape * nb_voies:(etape + 1) * nb_voies]
+        k = len(bloc)
+        f = frequences_u[bloc]
+        x = etats[:k]
+        emet = x >= (f << np.uint64(32 - PRECISION))
+        mots_par_etape.append((x[emet] & np.uint64(0xFFFF)).astype('<u2'))
+        x = np.where(emet, x >> np.uint64(16), x)
+        etats[:k] = ((x // f) << np.uint64(PRECISION)) + x % f + cumuls[bloc]
+
+    sortie = bytearray()
+    ecrire_varint(nb_voies, sortie)
+    sortie += etats.astype('<u4').tobytes()
+    # Le décodeur lit les étapes dans l'ordre croissant
+    for mots in reversed(mots_par_etape):
+        sortie += mots.tobytes()
+    return bytes(sortie)
+
+
+def preparer_decodage_rans(frequences):
+    """Tables du décodeur: symbole de chaque valeur de x % M, fréquences et cumuls."""
+    return {
+        'symbole_de': np.repeat(np.arange(len(frequences)), frequences),
+        'frequences': frequences.astype(np.uint64),
+        'cumuls': np.concatenate(([0], np.cumsum(frequences)[:-1])).astype(np.uint64),
+    }
+
+
+def decoder_rans(donnees, nb_symboles, frequences=None, decodeur=None):
+    """
+    Décode un bloc produit par encoder_rans.
+
+    Args:
+        donnees: Octets du bloc (bytes, memoryview ou np.ndarray)
+        nb_symboles: Nombre de symboles à décoder
+        frequences: Fréquences normalisées (ignorées si decodeur est donné)
+        decodeur: Résultat de preparer_decodage_rans, réutilisable entre blocs
+
+    Returns:
+        np.ndarray: Symboles décodés (int64)
+    """
+    if decodeur is None:
+        decodeur = preparer_decodage_rans(frequences)
+    symbole_de, frequences_u, cumuls = decodeur['symbole_de'], decodeur['frequences'], decodeur['cumuls']
+
+    octets = np.frombuffer(donnees, dtype=np.uint8)
+    nb_voies, position = lire_varint(bytes(octets[:10]), 0)
+    etats = octets[position:position + 4 * nb_voies].view('<u4').astype(np.uint64)
+    position += 4 * nb_voies
+    mots = octets[position:position + (len(octets) - position) // 2 * 2].view('<u2').astype(np.uint64)
+
+    resultat = np.empty(nb_symboles, dtype=np.int64)
+    lus = 0
+    masque = np.uint64(M - 1)
+    for debut in range(0, nb_symboles, nb_voies):
+        k = min(nb_voies, nb_symboles - debut)
+        x = etats[:k]
+        fente = x & masque
+        symboles = symbole_de[fente]
+        x = frequences_u[symboles] * (x >> np.uint64(PRECISION)) + fente - cumuls[symboles]
+        relit = np.flatnonzero(x < BAS)
+        if len(relit):
+            x[relit] = (x[relit] << np.uint64(16)) | mots[lus:lus + len(relit)]
+            lus += len(relit)
+        etats[:k] = x
+        resultat[debut:debut + k] = symboles
+    return resultat
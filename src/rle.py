@@ -0,0 +1,124 @@
+"""
+Codage par plages (RLE) en amont du codage de Huffman
+
+Les échantillons (aplatis en 1D) sont découpés en plages maximales de valeurs
+identiques, détectées en une passe vectorisée (np.diff / np.flatnonzero). Les
+longueurs des plages sont ensuite codées par Huffman, ce qui permet de descendre
+sous 1 bit par échantillon quand les plages sont longues (images binaires,
+images synthétiques à grands aplats).
+
+Les longueurs sont bornées par LONGUEUR_MAX_PLAGE pour garder un alphabet de
+taille fixe: une plage plus longue est découpée en morceaux.
+
+Deux représentations:
+    alternance  au plus deux valeurs distinctes: les plages alternent forcément entre
+                les deux valeurs, seules les longueurs sont codées. Les morceaux d'une
+                plage trop longue sont séparés par des plages de longueur 0 de l'autre
+                valeur (comme les codes de complément des télécopieurs).
+    valeurs     sinon: la valeur de chaque plage est codée aussi, dans un flux à part.
+"""
+
+import numpy as np
+
+LONGUEUR_MAX_PLAGE = 4096
+
+# En dessous de cette longueur moyenne des plages, le RLE n'est même pas évalué
+LONGUEUR_MOYENNE_MIN = 2.0
+
+
+def longueur_moyenne_plages(echantillons):
+    """Longueur moyenne des plages, sans construire les plages."""
+    if len(echantillons) == 0:
+        return 0.0
+    return len(echantillons) / (np.count_nonzero(np.diff(echantillons)) + 1)
+
+
+def plages(echantillons):
+    """
+    Découpe les échantillons en plages maximales de valeurs identiques.
+
+    Args:
+        echantillons: Tableau 1D
+
+    Returns:
+        tuple: (valeur de chaque plage, longueur de chaque plage)
+    """
+    echantillons = np.asarray(echantillons)
+    if len(echantillons) == 0:
+        return echantillons, np.zeros(0, dtype=np.int64)
+    debuts = np.concatenate(([0], np.flatnonzero(np.diff(echantillons)) + 1))
+    longueurs = np.diff(np.append(debuts, len(echantillons)))
+    return echantillons[debuts], longueurs
+
+
+def encoder_plages(echantillons, longueur_max=LONGUEUR_MAX_PLAGE):
+    """
+    Représentation par plages des échantillons, longueurs bornées par longueur_max.
+
+    Args:
+        echantillons: Tableau 1D d'entiers non négatifs
+        longueur_max: Longueur maximale d'une plage
+
+    Returns:
+        dict: 'longueurs' (np.ndarray d'entiers 0..longueur_max), 'valeurs' (valeur de
+              chaque plage, ou None en alternance) et 'valeurs_alternees' ((v0, v1) en
+              alternance, la première plage ayant la valeur v0, sinon None)
+    """
+    valeurs, longueurs = plages(echantillons)
+    alternance = len(np.unique(valeurs)) <= 2
+
+    # Morceaux supplémentaires de chaque plage trop longue, découpage vectorisé:
+    # chaque plage devient un groupe de morceaux de longueur_max suivi du reste
+    supplementaires = np.maximum(longueurs - 1, 0) // longueur_max
+    tailles_groupes = 2 * supplementaires + 1 if alternance else supplementaires + 1
+    debuts_groupes = np.concatenate(([0], np.cumsum(tailles_groupes)[:-1]))
+    groupes = np.repeat(np.arange(len(longueurs)), tailles_groupes)
+    decalages = np.arange(len(groupes)) - debuts_groupes[groupes]
+
+    if alternance:
+        # longueur_max, 0, longueur_max, 0, ..., reste
+        sortie = np.where(decalages % 2 == 0, longueur_max, 0)
+        sortie[debuts_groupes + 2 * supplementaires] = longueurs - supplementaires * longueur_max
+        v0 = int(valeurs[0]) if len(valeurs) else 0
+        v1 = int(valeurs[1]) if len(valeurs) > 1 else v0
+        return {'longueurs': sortie, 'valeurs': None, 'valeurs_alternees': (v0, v1)}
+
+    sortie = np.full(len(groupes), longueur_max, dtype=np.int64)
+    sortie[debuts_groupes + supplementaires] = longueurs - supplementaires * longueur_max
+    return {'longueurs': sortie, 'valeurs': valeurs[groupes], 'valeurs_alternees': None}
+
+
+def developper_plages(blocs, nb_plages, valeurs_alternees=None):
+    """
+    Inverse de encoder_plages, à partir des blocs décodés du fichier .huf.
+
+    Hors alternance, les blocs des valeurs (nb_plages symboles au total) précèdent
+    ceux des longueurs: les valeurs sont relues d'abord, puis chaque bloc de
+    longueurs est développé dès qu'il est décodé.
+
+    Args:
+        blocs: Itérateur sur les blocs décodés (np.ndarray)
+        nb_plages: Nombre de plages
+        valeurs_alternees: (v0, v1) en alternance, sinon None
+
+    Yields:
+        np.ndarray: Échantillons de chaque bloc de longueurs
+    """
+    blocs = iter(blocs)
+    if valeurs_alternees is None:
+        morceaux = []
+        nb_valeurs = 0
+        while nb_valeurs < nb_plages:
+            morceaux.append(next(blocs))
+            nb_valeurs += len(morceaux[-1])
+        valeurs = np.concatenate(morceaux) if morceaux else np.zeros(0, dtype=np.int64)
+
+    debut = 0
+    for longueurs in blocs:
+        if valeurs_alternees is None:
+            valeurs_bloc = valeurs[debut:debut + len(longueurs)]
+        else:
+            v0, v1 = valeurs_alternees
+            valeurs_bloc = np.where(np.arange(debut, debut + len(longueurs)) % 2 == 0, v0, v1)
+        yield np.repeat(valeurs_bloc, longueurs)
+        debut += len(longueurs)
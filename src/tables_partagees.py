@@ -0,0 +1,107 @@
+"""
+Registre de tables de codes pré-entraînées, partagées par un corpus d'images
+
+Pour de petites images, la table des longueurs embarquée dans chaque fichier .huf
+pèse lourd devant le message. Une table entraînée sur l'histogramme cumulé d'un
+corpus d'images semblables (huffman_coding.entrainer_table) est rangée une fois
+dans le registre; chaque fichier .huf qui l'utilise ne contient que son
+identifiant (section SECTION_TABLE_PARTAGEE), et le décodeur la relit ici.
+
+L'identifiant est un hash de la table elle-même: deux entraînements qui donnent
+la même table ont le même identifiant, et un fichier ne peut pas être décodé
+avec une autre table que celle de l'encodage.
+
+Chaque table est un fichier <identifiant>.npy (longueurs des codes, int64).
+"""
+
+import hashlib
+import os
+import tempfile
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPERTOIRE_TABLES = os.path.join(os.path.dirname(SCRIPT_DIR), ".cache", "tables")
+
+# Taille de l'identifiant d'une table, en octets (16 caractères hexadécimaux)
+TAILLE_IDENTIFIANT = 8
+
+
+def identifiant_table(table_longueurs):
+    """Identifiant (hexadécimal) d'une table de longueurs: hash de son contenu."""
+    table = np.trim_zeros(np.asarray(table_longueurs, dtype='<i8'), 'b')
+    return hashlib.blake2b(table.tobytes(), digest_size=TAILLE_IDENTIFIANT).hexdigest()
+
+
+class RegistreTables:
+    """
+    Tables de longueurs partagées, rangées sur disque par identifiant.
+
+    Args:
+        repertoire: Répertoire du registre
+    """
+
+    def __init__(self, repertoire=REPERTOIRE_TABLES):
+        self.repertoire = repertoire
+        os.makedirs(repertoire, exist_ok=True)
+
+    def _chemin(self, identifiant):
+        return os.path.join(self.repertoire, f"{identifiant}.npy")
+
+    def enregistrer(self, table_longueurs):
+        """
+        Range une table dans le registre (sans effet si elle y est déjà).
+
+        Args:
+            table_longueurs: Longueur du code pour chaque valeur de symbole
+
+        Returns:
+            str: Identifiant de la table
+        """
+        table = np.trim_zeros(np.asarray(table_longueurs, dtype=np.int64), 'b')
+        identifiant = identifiant_table(table)
+        chemin = self._chemin(identifiant)
+        if not os.path.exists(chemin):
+            # Écriture dans un fichier temporaire puis renommage: une table est complète ou absente
+            descripteur, temporaire = tempfile.mkstemp(dir=self.repertoire, prefix=".tmp_", suffix=".npy")
+            try:
+                with os.fdopen(descripteur, 'wb') as f:
+                    np.save(f, table)
+                os.replace(temporaire, chemin)
+            except Exception:
+                os.unlink(temporaire)
+                raise
+        return identifiant
+
+    def charger(self, identifiant):
+        """
+        Relit une table du registre.
+
+        Raises:
+            KeyError: Si la table est absente du registre
+
+        Returns:
+            np.ndarray: Table des longueurs (int64)
+        """
+        try:
+            table = np.load(self._chemin(identifiant))
+        except OSError:
+            raise KeyError(f"Table partagée absente du registre {self.repertoire}: {identifiant}") from None
+        if identifiant_table(table) != identifiant:
+            raise ValueError(f"Table partagée corrompue: {identifiant}")
+        return table
+
+    def identifiants(self):
+        """Identifiants des tables du registre, triés."""
+        return sorted(nom[:-4] for nom in os.listdir(self.repertoire)
+                      if nom.endswith(".npy") and not nom.startswith(".tmp_"))
+
+
+def serialiser_identifiant(identifiant):
+    """Section SECTION_TABLE_PARTAGEE: l'identifiant de la table, en binaire."""
+    return bytes.fromhex(identifiant)
+
+
+def lire_identifiant(donnees):
+    """Relit une section produite par serialiser_identifiant."""
+    return bytes(donnees[:TAILLE_IDENTIFIANT]).hex()
@@ -0,0 +1,85 @@
+import math
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from apercu import echantillonner_paires, estimer, estimer_correlation, estimer_entropie, reduire
+
+
+def test_entropie_uniforme_exacte():
+    # Distribution empirique uniforme sur 4 valeurs: entropie directe 2 bits, variance nulle
+    estimation, basse, haute = estimer_entropie(np.array([25, 25, 25, 25, 0]))
+    assert estimation == pytest.approx(2 + 3 / (2 * 100 * math.log(2)))
+    assert basse == haute == estimation
+
+
+def test_entropie_une_valeur_et_vide():
+    assert estimer_entropie(np.array([0, 40, 0])) == (0.0, 0.0, 0.0)
+    assert all(math.isnan(valeur) for valeur in estimer_entropie(np.zeros(3)))
+
+
+@pytest.mark.parametrize("probabilites", [np.full(16, 1 / 16), np.array([0.5, 0.25, 0.125, 0.0625, 0.0625])],
+                         ids=["uniforme16", "dyadique"])
+def test_miller_madow_corrige_le_biais(probabilites):
+    entropie = float(-np.sum(probabilites * np.log2(probabilites)))
+    generateur = np.random.default_rng(0)
+    n = 40
+    estimations, directes, couvertures = [], [], 0
+    for _ in range(400):
+        counts = np.bincount(generateur.choice(len(probabilites), n, p=probabilites), minlength=len(probabilites))
+        estimation, basse, haute = estimer_entropie(counts)
+        p = counts[counts > 0] / n
+        estimations.append(estimation)
+        directes.append(float(-np.sum(p * np.log2(p))))
+        couvertures += basse <= entropie <= haute
+    # L'estimation directe sous-estime l'entropie; Miller-Madow réduit nettement ce biais
+    assert np.mean(directes) < entropie
+    assert abs(np.mean(estimations) - entropie) < abs(np.mean(directes) - entropie) / 2
+    # Intervalle à 95 % (méthode delta, approché sur 40 échantillons)
+    assert couvertures / 400 > 0.8
+
+
+def test_correlation_connue():
+    generateur = np.random.default_rng(1)
+    x = generateur.normal(size=5000)
+    y = 0.6 * x + 0.8 * generateur.normal(size=5000)  # corrélation 0.6
+    estimation, basse, haute = estimer_correlation(x, y)
+    assert basse < 0.6 < haute
+    assert basse < estimation < haute
+    assert estimer_correlation(x, 2 * x + 1)[0] == pytest.approx(1)
+    assert math.isnan(estimer_correlation(x, np.ones(5000))[0])
+
+
+@pytest.mark.parametrize("echantillonnage", ["aleatoire", "pas"])
+def test_echantillonner_paires_voisines(echantillonnage):
+    # Chaque pixel vaut son numéro de colonne: le voisin de droite vaut un de plus
+    pixels = np.broadcast_to(np.arange(200, dtype=np.int64), (150, 200))
+    gauche, droite = echantillonner_paires(pixels, budget=1000, echantillonnage=echantillonnage)
+    assert 0 < len(gauche) <= 1000
+    assert np.array_equal(droite, gauche + 1)
+
+
+def test_echantillonner_paires_couleur_et_bords():
+    pixels = np.zeros((10, 12, 3), dtype=np.uint8)
+    gauche, droite = echantillonner_paires(pixels, budget=20, echantillonnage='pas')
+    assert gauche.shape[1:] == (3,) and gauche.shape == droite.shape
+    gauche, _ = echantillonner_paires(np.zeros((10, 1), dtype=np.uint8))
+    assert len(gauche) == 0
+    with pytest.raises(ValueError):
+        echantillonner_paires(pixels, echantillonnage='inconnu')
+    with pytest.raises(ValueError):
+        echantillonner_paires(pixels, budget=0)
+
+
+def test_estimer():
+    gauche = np.array([0, 0, 255, 255, 7])
+    resultat = estimer(gauche, gauche)
+    assert resultat['nb_echantillons'] == 5
+    assert resultat['histogramme'][255] == 2
+    assert resultat['correlation'][0] == pytest.approx(1)
+
+
+def test_reduire():
+    assert reduire(Image.new('L', (3000, 500)), taille=1024).size == (1000, 167)
+    assert reduire(Image.new('L', (300, 500)), taille=1024).size == (300, 500)
@@ -0,0 +1,25 @@
+from bench import comparer
+
+
+def _banc(**indicateurs):
+    resultat = {'nom': 'huffman/L/bruit', 'duree': 1.0, 'dispersion': None, 'debit': 100.0, 'ratio': 1.5,
+                'pic_memoire': 1000}
+    resultat.update(indicateurs)
+    return {'resultats': [resultat]}
+
+
+def test_regression_detectee():
+    regressions = comparer(_banc(debit=80.0, ratio=1.2), _banc())
+    assert {regression['indicateur'] for regression in regressions} == {'debit', 'ratio'}
+
+
+def test_duree_ignoree_avec_debit():
+    assert comparer(_banc(duree=2.0), _banc()) == []
+
+
+def test_seuil_releve_par_la_dispersion():
+    # 15 % plus lent: régression sans dispersion connue, bruit avec 10 % de dispersion
+    assert len(comparer(_banc(debit=85.0), _banc())) == 1
+    assert comparer(_banc(debit=85.0, dispersion=0.10), _banc()) == []
+    # La dispersion ne relève pas le seuil des indicateurs déterministes
+    assert len(comparer(_banc(ratio=1.2, dispersion=0.5), _banc())) == 1
@@ -0,0 +1,75 @@
+import os
+
+import numpy as np
+import pytest
+
+from cache_resultats import CacheResultats
+
+
+@pytest.fixture
+def fichiers(tmp_path):
+    """Fichier de métriques (100 octets) et fichier .huf (1000 octets) à mettre en cache."""
+    metrics_txt = tmp_path / "image_metrics.txt"
+    metrics_txt.write_bytes(b"m" * 100)
+    huf = tmp_path / "image.huf"
+    huf.write_bytes(b"h" * 1000)
+    return str(metrics_txt), str(huf)
+
+
+def _cle(cache, valeur, configuration=None):
+    return cache.cle([np.full(10, valeur, dtype=np.uint8)], {'size': (10, 1), 'mode': 'L'}, configuration or {})
+
+
+def test_cle(tmp_path):
+    cache = CacheResultats(str(tmp_path / "cache"))
+    assert _cle(cache, 1) == _cle(cache, 1)
+    assert _cle(cache, 1) != _cle(cache, 2)
+    assert _cle(cache, 1) != _cle(cache, 1, {'rle': True})
+
+
+def test_ecrire_lire(tmp_path, fichiers):
+    cache = CacheResultats(str(tmp_path / "cache"))
+    cle = _cle(cache, 1)
+    assert cache.lire(cle) is None
+    cache.ecrire(cle, {'ratio': np.float64(2.5), 'nb': np.int64(3)}, *fichiers)
+    entree = cache.lire(cle)
+    assert entree['metrics'] == {'ratio': 2.5, 'nb': 3}
+    with open(entree['metrics_txt'], 'rb') as f:
+        assert f.read() == b"m" * 100
+    assert os.path.getsize(entree['flux']) == 1000
+
+
+def test_sans_flux(tmp_path, fichiers):
+    cache = CacheResultats(str(tmp_path / "cache"), garder_flux=False)
+    cache.ecrire("a", {}, *fichiers)
+    assert cache.lire("a")['flux'] is None
+
+
+def test_eviction_lru(tmp_path, fichiers):
+    # Une entrée fait ~1100 octets (plus metrics.json): deux tiennent, pas trois
+    cache = CacheResultats(str(tmp_path / "cache"), taille_max=2500)
+    cache.ecrire("a", {}, *fichiers)
+    cache.ecrire("b", {}, *fichiers)
+    # Horodatages explicites: 'a' lu après 'b', donc le plus récemment utilisé
+    os.utime(os.path.join(cache.repertoire, "b", "metrics.json"), (1000, 1000))
+    os.utime(os.path.join(cache.repertoire, "a", "metrics.json"), (2000, 2000))
+    cache.ecrire("c", {}, *fichiers)
+    assert cache.lire("b") is None
+    assert cache.lire("a") is not None and cache.lire("c") is not None
+
+
+def test_lecture_rafraichit_horodatage(tmp_path, fichiers):
+    cache = CacheResultats(str(tmp_path / "cache"))
+    cache.ecrire("a", {}, *fichiers)
+    chemin_json = os.path.join(cache.repertoire, "a", "metrics.json")
+    os.utime(chemin_json, (1000, 1000))
+    cache.lire("a")
+    assert os.stat(chemin_json).st_mtime > 1000
+
+
+def test_vider(tmp_path, fichiers):
+    cache = CacheResultats(str(tmp_path / "cache"))
+    cache.ecrire("a", {}, *fichiers)
+    cache.vider()
+    assert cache.lire("a") is None
+    assert os.listdir(cache.repertoire) == []
@@ -0,0 +1,69 @@
+import math
+
+import numpy as np
+import pytest
+
+import correlation_spatiale
+from correlation_spatiale import DIRECTIONS, POIDS_LUMINANCE, correlations_spatiales
+
+
+def _reference(plan, dy, dx):
+    """Corrélation de Pearson directe entre chaque pixel et son voisin à (dy, dx)."""
+    hauteur, largeur = plan.shape
+    colonnes = slice(max(0, -dx), largeur - max(0, dx))
+    voisins = slice(max(0, dx), largeur + min(0, dx))
+    a = plan[:hauteur - dy, colonnes].ravel()
+    b = plan[dy:, voisins].ravel()
+    return np.corrcoef(a, b)[0, 1]
+
+
+@pytest.fixture
+def pixels():
+    generateur = np.random.default_rng(0)
+    lignes, colonnes = np.mgrid[0:23, 0:17]
+    base = np.stack((lignes * 11, colonnes * 5 + lignes, lignes * colonnes % 97), axis=-1)
+    return (base + generateur.integers(0, 40, base.shape)).astype(np.uint8)
+
+
+@pytest.mark.parametrize("echantillons_par_bande", [1 << 18, 100])
+def test_egale_reference(pixels, monkeypatch, echantillons_par_bande):
+    # Petites bandes: les paires qui enjambent deux bandes doivent être comptées aussi
+    monkeypatch.setattr(correlation_spatiale, "ECHANTILLONS_PAR_BANDE", echantillons_par_bande)
+    resultat = correlations_spatiales(pixels, decalage_max=3)
+    assert resultat['canaux'] == ('R', 'G', 'B')
+    luminance = pixels.astype(np.float64) @ np.array(POIDS_LUMINANCE)
+    for direction, (dy, dx) in DIRECTIONS.items():
+        mesures = resultat['directions'][direction]
+        for i, k in enumerate(resultat['decalages']):
+            hauteur, largeur = pixels.shape[:2]
+            assert mesures['nb_paires'][i] == (hauteur - dy * k) * (largeur - abs(dx) * k)
+            for c, canal in enumerate('RGB'):
+                assert mesures[canal][i] == pytest.approx(_reference(pixels[:, :, c].astype(float), dy * k, dx * k))
+            assert mesures['luminance'][i] == pytest.approx(_reference(luminance, dy * k, dx * k))
+
+
+def test_niveaux_de_gris_16_bits():
+    generateur = np.random.default_rng(1)
+    plan = np.cumsum(generateur.integers(0, 300, (12, 30)), axis=1).astype(np.uint16)
+    resultat = correlations_spatiales(plan, decalage_max=2)
+    assert resultat['canaux'] == ('L',)
+    horizontale = resultat['directions']['horizontale']
+    assert horizontale['L'][1] == pytest.approx(_reference(plan.astype(float), 0, 2))
+    assert horizontale['luminance'] == horizontale['L']
+
+
+def test_indefinie():
+    # Image constante: variance nulle; décalage plus grand que l'image: aucune paire
+    resultat = correlations_spatiales(np.full((4, 4), 9, dtype=np.uint8), decalage_max=5)
+    verticale = resultat['directions']['verticale']
+    assert math.isnan(verticale['L'][0])
+    assert verticale['nb_paires'][4] == 0 and math.isnan(verticale['L'][4])
+
+
+def test_erreurs():
+    with pytest.raises(ValueError):
+        correlations_spatiales(np.zeros((4, 4), dtype=np.uint8), decalage_max=0)
+    with pytest.raises(ValueError):
+        correlations_spatiales(np.zeros((4, 4), dtype=np.float32))
+    with pytest.raises(ValueError):
+        correlations_spatiales(np.zeros((4, 4), dtype=np.uint8), directions={'haut': (-1, 0)})
@@ -0,0 +1,109 @@
+import itertools
+
+import numpy as np
+import pytest
+from PIL import Image
+
+import huffman_coding
+from cache_resultats import CacheResultats
+from huffman_coding import decompress, entrainer_table, huffman, longueurs_codes, longueurs_limitees
+from tables_partagees import RegistreTables
+
+
+def _cout_optimal(counts, longueur_max):
+    """Coût minimal sum(counts * longueurs) par énumération des longueurs respectant Kraft."""
+    meilleur = None
+    for longueurs in itertools.product(range(1, longueur_max + 1), repeat=len(counts)):
+        if sum(2.0 ** -l for l in longueurs) <= 1:
+            cout = sum(c * l for c, l in zip(counts, longueurs))
+            meilleur = cout if meilleur is None else min(meilleur, cout)
+    return meilleur
+
+
+@pytest.mark.parametrize("graine", range(20))
+def test_longueurs_limitees_optimal(graine):
+    generateur = np.random.default_rng(graine)
+    n = int(generateur.integers(2, 7))
+    # Occurrences très inégales: le code de Huffman dépasse souvent la limite
+    counts = generateur.geometric(0.3, n) ** 3
+    for longueur_max in range(int(np.ceil(np.log2(n))), n):
+        longueurs = longueurs_limitees(counts, longueur_max)
+        assert longueurs.max() <= longueur_max
+        assert np.sum(2.0 ** -longueurs) <= 1
+        assert int(np.sum(counts * longueurs)) == _cout_optimal(counts.tolist(), longueur_max)
+
+
+def test_longueurs_limitees_sans_contrainte_egale_huffman():
+    counts = np.array([40, 30, 12, 9, 5, 3, 1])
+    longueurs = longueurs_limitees(counts, len(counts) - 1)
+    assert np.sum(counts * longueurs) == np.sum(counts * longueurs_codes(counts))
+
+
+@pytest.fixture
+def sortie(tmp_path, monkeypatch):
+    monkeypatch.setattr(huffman_coding, "OUTPUT_DIR", str(tmp_path / "output"))
+    (tmp_path / "output").mkdir()
+    return tmp_path
+
+
+@pytest.fixture
+def image_test(sortie):
+    """Image RGB 64 x 48: dégradé bruité, avec une bande uniforme (plages)."""
+    generateur = np.random.default_rng(0)
+    lignes, colonnes = np.mgrid[0:48, 0:64]
+    pixels = np.stack((lignes * 4, colonnes * 3, (lignes + colonnes) * 2), axis=-1)
+    pixels = pixels + generateur.integers(0, 6, pixels.shape)
+    pixels[:12] = (200, 30, 90)
+    chemin = sortie / "test.png"
+    Image.fromarray(pixels.astype(np.uint8)).save(chemin)
+    return str(chemin)
+
+
+def _aller_retour(chemin, **options):
+    metrics = huffman(chemin, symboles_par_bloc=1 << 12, **options)
+    assert metrics['fichier_compresse'] is not None
+    registre = options.get('registre')
+    attendu = np.array(Image.open(chemin))
+    assert np.array_equal(np.array(decompress(metrics['fichier_compresse'], registre=registre)), attendu)
+    return metrics
+
+
+@pytest.mark.parametrize("options", [
+    {'rle': False},
+    {'hauteur_bande': 16},
+    {'taille_tuile': 16},
+    {'prediction': 'ligne'},
+    {'prediction': 'tuile', 'taille_tuile': 16},
+    {'rle': True},
+    {'taille_tuple': 2},
+    {'codeur': 'rans'},
+    {'longueur_max': 9},
+    {'threads': 2},
+], ids=lambda options: ",".join(f"{cle}={valeur}" for cle, valeur in options.items()))
+def test_aller_retour(image_test, options):
+    _aller_retour(image_test, **options)
+
+
+def test_aller_retour_table_partagee(image_test, sortie):
+    registre = RegistreTables(str(sortie / "tables"))
+    histogramme = np.bincount(np.array(Image.open(image_test)).reshape(-1), minlength=256)
+    identifiant = registre.enregistrer(entrainer_table([histogramme]))
+    metrics = _aller_retour(image_test, table_partagee=identifiant, registre=registre)
+    assert metrics['table_partagee'] == identifiant
+
+
+@pytest.mark.parametrize("processus", [False, True])
+def test_decompress_parallele(image_test, processus):
+    metrics = huffman(image_test, symboles_par_bloc=1 << 10, verifier=False)
+    decode = decompress(metrics['fichier_compresse'], threads=2, processus=processus)
+    assert np.array_equal(np.array(decode), np.array(Image.open(image_test)))
+
+
+def test_cache_ne_rapporte_pas_les_anciens_temps(image_test, sortie):
+    cache = CacheResultats(str(sortie / "cache"))
+    premier = huffman(image_test, cache=cache)
+    assert 'encodage' in premier['etapes']
+    second = huffman(image_test, cache=cache)
+    assert second['cache'] is True
+    assert list(second['etapes']) == ['chargement', 'cache']
+    assert second['ratio_compression'] == premier['ratio_compression']
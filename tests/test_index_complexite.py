@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from index_complexite import IndexComplexite, table_sommes
+
+
+@pytest.fixture
+def image():
+    generateur = np.random.default_rng(0)
+    pixels = generateur.integers(0, 256, (21, 30))
+    pixels[:, :10] = 128  # zone plate à gauche
+    carte = generateur.integers(0, 50, pixels.shape).astype(np.float64)
+    carte[:, :10] = 0
+    return pixels, carte
+
+
+def test_table_sommes():
+    valeurs = np.arange(12).reshape(3, 4)
+    table = table_sommes(valeurs)
+    assert table.shape == (4, 5)
+    assert table[0].sum() == 0 and table[:, 0].sum() == 0
+    assert table[2, 3] == valeurs[:2, :3].sum()
+    assert table[-1, -1] == valeurs.sum()
+
+
+@pytest.mark.parametrize("rectangle", [(0, 21, 0, 30), (3, 4, 5, 6), (5, 17, 2, 29)])
+def test_rectangle_egale_calcul_direct(image, rectangle):
+    pixels, carte = image
+    l0, l1, c0, c1 = rectangle
+    statistiques = IndexComplexite(pixels, carte).rectangle(*rectangle)
+    region = pixels[l0:l1, c0:c1]
+    assert statistiques['moyenne'] == pytest.approx(region.mean())
+    assert statistiques['variance'] == pytest.approx(region.var())
+    assert statistiques['complexite'] == pytest.approx(carte[l0:l1, c0:c1].mean())
+
+
+def test_carte_tuiles(image):
+    pixels, carte = image
+    tuiles = IndexComplexite(pixels, carte).carte_tuiles(8)
+    # Tuiles de bord tronquées: 21 x 30 pixels -> 3 x 4 tuiles
+    assert tuiles['complexite'].shape == (3, 4)
+    assert tuiles['complexite'][2, 3] == pytest.approx(carte[16:, 24:].mean())
+    assert tuiles['moyenne'][0, 0] == 128 and tuiles['variance'][0, 0] == 0
+    # Rang 0: la tuile la plus complexe, et ordre donne son origine en pixels
+    ligne, colonne = np.unravel_index(np.argmax(tuiles['complexite']), (3, 4))
+    assert tuiles['rang'][ligne, colonne] == 0
+    assert tuiles['ordre'][0].tolist() == [ligne * 8, colonne * 8]
+    assert sorted(tuiles['rang'].ravel().tolist()) == list(range(12))
+
+
+def test_carte_multi_echelles(image):
+    cartes = IndexComplexite(*image).carte_multi_echelles((4, 64))
+    assert set(cartes) == {4, 64}
+    assert cartes[64]['complexite'].shape == (1, 1)
+
+
+def test_erreurs(image):
+    pixels, carte = image
+    with pytest.raises(ValueError):
+        IndexComplexite(pixels, carte[:, 1:])
+    index = IndexComplexite(pixels, carte)
+    with pytest.raises(ValueError):
+        index.rectangle(0, 22, 0, 5)
+    with pytest.raises(ValueError):
+        index.rectangle(4, 4, 0, 5)
+    with pytest.raises(ValueError):
+        index.carte_tuiles(0)
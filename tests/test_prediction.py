@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from prediction import PREDICTEURS, inverser, lire_choix, resume_choix, serialiser_choix, transformer
+
+
+@pytest.fixture
+def pixels():
+    """Image RGB 20 x 27 bruitée (27 n'est pas multiple de la taille des tuiles)."""
+    generateur = np.random.default_rng(0)
+    lignes, colonnes = np.mgrid[0:20, 0:27]
+    base = np.stack((lignes * 9, colonnes * 7, lignes * colonnes), axis=-1)
+    return ((base + generateur.integers(0, 20, base.shape)) % 256).astype(np.uint8)
+
+
+@pytest.mark.parametrize("selection", PREDICTEURS + ('ligne', 'tuile'))
+def test_aller_retour(pixels, selection):
+    residus, choix = transformer(pixels, selection, taille_tuile=8)
+    assert residus.shape == pixels.shape and residus.dtype == np.uint8
+    assert np.array_equal(inverser(residus, lire_choix(serialiser_choix(choix))), pixels)
+
+
+def test_aller_retour_niveaux_de_gris(pixels):
+    gris = pixels[:, :, 0]
+    residus, choix = transformer(gris, 'tuile', taille_tuile=8)
+    assert np.array_equal(inverser(residus, choix), gris)
+
+
+def test_residus_connus():
+    pixels = np.array([[10, 12, 15], [11, 13, 20]], dtype=np.uint8)
+    residus, _ = transformer(pixels, 'gauche')
+    assert residus.tolist() == [[10, 2, 3], [11, 2, 7]]
+    residus, _ = transformer(pixels, 'haut')
+    assert residus.tolist() == [[10, 12, 15], [1, 1, 5]]
+    # Résidu négatif modulo 256
+    residus, _ = transformer(np.array([[200, 100]], dtype=np.uint8), 'gauche')
+    assert residus.tolist() == [[200, 156]]
+
+
+def test_selection_par_ligne():
+    # Lignes constantes: le prédicteur de chaque ligne annule ses résidus après le premier pixel
+    pixels = np.repeat(np.arange(0, 240, 40, dtype=np.uint8)[:, None], 16, axis=1)
+    residus, choix = transformer(pixels, 'ligne')
+    assert len(choix['predicteurs']) == pixels.shape[0]
+    assert np.count_nonzero(residus[:, 1:]) == 0
+    assert resume_choix(choix).startswith('ligne (')
+
+
+def test_erreurs():
+    with pytest.raises(ValueError):
+        transformer(np.zeros((4, 4), dtype=np.uint16))
+    with pytest.raises(ValueError):
+        transformer(np.zeros((4, 4), dtype=np.uint8), 'inconnu')
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+from rans import (M, NB_VOIES_MAX, NB_VOIES_MIN, SYMBOLES_PAR_VOIE, _nb_voies, decoder_rans, encoder_rans,
+                  lire_frequences, normaliser_frequences, preparer_decodage_rans, serialiser_frequences)
+
+
+def _aller_retour(symboles, nb_voies=None):
+    frequences = normaliser_frequences(np.bincount(symboles))
+    bloc = encoder_rans(symboles, frequences, nb_voies)
+    decodes = decoder_rans(bloc, len(symboles), frequences)
+    assert np.array_equal(decodes, symboles)
+    return bloc
+
+
+def test_normaliser_frequences_somme_et_presence():
+    counts = np.array([1000000, 0, 1, 3, 0, 50])
+    frequences = normaliser_frequences(counts)
+    assert frequences.sum() == M
+    assert np.array_equal(frequences > 0, counts > 0)
+
+
+def test_normaliser_frequences_trop_de_symboles():
+    with pytest.raises(ValueError):
+        normaliser_frequences(np.ones(M + 1, dtype=np.int64))
+
+
+def test_serialisation_frequences():
+    frequences = normaliser_frequences(np.array([0, 7, 0, 0, 120, 3]))
+    relues, position = lire_frequences(serialiser_frequences(frequences))
+    assert np.array_equal(relues, frequences)
+    assert position == len(serialiser_frequences(frequences))
+
+
+@pytest.mark.parametrize("nb_voies", [None, 1, 16, 1024])
+def test_aller_retour(nb_voies):
+    generateur = np.random.default_rng(0)
+    _aller_retour(generateur.geometric(0.2, 20000) - 1, nb_voies)
+
+
+def test_bloc_un_seul_symbole():
+    # Fréquence M: aucun bit émis, les états finaux suffisent
+    symboles = np.full(5000, 7)
+    bloc = _aller_retour(symboles)
+    assert len(bloc) < 4 * NB_VOIES_MAX
+    _aller_retour(np.array([3]))
+
+
+def test_decodeur_reutilisable():
+    generateur = np.random.default_rng(1)
+    frequences = normaliser_frequences(np.full(16, 10))
+    decodeur = preparer_decodage_rans(frequences)
+    for _ in range(3):
+        symboles = generateur.integers(0, 16, 3000)
+        bloc = encoder_rans(symboles, frequences)
+        assert np.array_equal(decoder_rans(bloc, len(symboles), decodeur=decodeur), symboles)
+
+
+def test_nb_voies_plancher_symboles():
+    # Bloc peu entropique: le nombre de voies suit le nombre de symboles, pas la taille estimée
+    frequences = normaliser_frequences(np.array([1000, 1]))
+    assert _nb_voies(np.zeros(1 << 20, dtype=np.int64), frequences) == (1 << 20) // SYMBOLES_PAR_VOIE
+    assert _nb_voies(np.zeros(100, dtype=np.int64), frequences) == NB_VOIES_MIN
+    assert _nb_voies(np.zeros(5, dtype=np.int64), frequences) == 5
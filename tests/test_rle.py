@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from rle import developper_plages, encoder_plages, longueur_moyenne_plages, plages
+
+
+def _developper(encode, taille_bloc=7):
+    """Développe une représentation encoder_plages, découpée en blocs comme dans un fichier .huf."""
+    longueurs = encode['longueurs']
+    blocs = [longueurs[debut:debut + taille_bloc] for debut in range(0, len(longueurs), taille_bloc)]
+    nb_plages = len(longueurs)
+    if encode['valeurs'] is not None:
+        valeurs = encode['valeurs']
+        blocs = [valeurs[debut:debut + taille_bloc] for debut in range(0, len(valeurs), taille_bloc)] + blocs
+    morceaux = list(developper_plages(blocs, nb_plages, encode['valeurs_alternees']))
+    return np.concatenate(morceaux) if morceaux else np.zeros(0, dtype=np.int64)
+
+
+def test_plages():
+    valeurs, longueurs = plages(np.array([5, 5, 1, 1, 1, 5, 9]))
+    assert valeurs.tolist() == [5, 1, 5, 9]
+    assert longueurs.tolist() == [2, 3, 1, 1]
+
+
+def test_plages_vide():
+    valeurs, longueurs = plages([])
+    assert len(valeurs) == 0 and len(longueurs) == 0
+    encode = encoder_plages(np.zeros(0, dtype=np.int64))
+    assert len(encode['longueurs']) == 0
+    assert len(_developper(encode)) == 0
+    assert longueur_moyenne_plages(np.zeros(0)) == 0.0
+
+
+def test_longueur_moyenne_plages():
+    assert longueur_moyenne_plages(np.array([0, 0, 0, 1, 1, 2])) == 2.0
+
+
+@pytest.mark.parametrize("echantillons", [
+    np.array([0] * 10 + [1] * 3 + [0] * 25),
+    np.array([255] * 50),
+    np.array([1, 0] * 20),
+], ids=["binaire", "uniforme", "alterne"])
+def test_alternance_aller_retour(echantillons):
+    encode = encoder_plages(echantillons, longueur_max=8)
+    assert encode['valeurs'] is None
+    assert encode['longueurs'].max() <= 8
+    assert np.array_equal(_developper(encode), echantillons)
+
+
+def test_valeurs_aller_retour():
+    generateur = np.random.default_rng(0)
+    echantillons = np.repeat(generateur.integers(0, 5, 200), generateur.integers(1, 30, 200))
+    encode = encoder_plages(echantillons, longueur_max=8)
+    assert encode['valeurs_alternees'] is None
+    assert encode['longueurs'].max() <= 8 and encode['longueurs'].min() >= 1
+    assert np.array_equal(_developper(encode), echantillons)
+
+
+def test_plage_longue_decoupee():
+    # Alternance: 20 = 8 + 0 + 8 + 0 + 4, les longueurs 0 étant des plages vides de l'autre valeur
+    encode = encoder_plages(np.array([3] * 20 + [4] * 2), longueur_max=8)
+    assert encode['longueurs'].tolist() == [8, 0, 8, 0, 4, 2]
+    assert encode['valeurs_alternees'] == (3, 4)